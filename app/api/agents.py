@@ -1,11 +1,20 @@
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
 from ..db import get_db
 from ..models import Agent, Interaction, Space
-from ..services.agent_interaction import execute_agent_interaction
+from ..services.agent_interaction import (
+    ClientDisconnected,
+    cancel_on_disconnect,
+    error_status,
+    execute_agent_interaction,
+    record_cancelled_interaction,
+    served_by,
+)
+from ..services.usage import BudgetExceeded, apply_usage
+from ..shared_state import RateLimited
 from ..schemas import (
     AgentCreate,
     AgentInteractionRequest,
@@ -82,6 +91,7 @@ def delete_agent(agent_id: int, db: Session = Depends(get_db)) -> None:
     status_code=status.HTTP_200_OK,
 )
 async def interact_with_agent(
+    request: Request,
     agent_id: int,
     payload: AgentInteractionRequest,
     db: Session = Depends(get_db),
@@ -91,24 +101,28 @@ async def interact_with_agent(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
 
     try:
-        output, metadata, artifacts_ctx, history_ctx, system_prompt_used = await execute_agent_interaction(
-            agent, payload, db
+        output, metadata, artifacts_ctx, history_ctx, system_prompt_used = await cancel_on_disconnect(
+            request.receive, execute_agent_interaction(agent, payload, db)
         )
+    except ClientDisconnected:
+        record_cancelled_interaction(db, agent, payload.prompt)
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except (BudgetExceeded, RateLimited) as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc))
     except RuntimeError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(exc),
-        )
+        raise HTTPException(status_code=error_status(exc), detail=str(exc))
 
+    provider, model = served_by(metadata, agent)
     interaction = Interaction(
         agent_id=agent.id,
         space_id=agent.space_id,
         prompt=payload.prompt,
         system_prompt=system_prompt_used,
         response=output,
-        provider=agent.provider,
-        model=agent.model,
+        provider=provider,
+        model=model,
     )
+    apply_usage(interaction, metadata)
     interaction.context = {
         "artifacts": artifacts_ctx,
         "history": history_ctx,
@@ -121,7 +135,7 @@ async def interact_with_agent(
     return AgentInteractionResponse(
         output=output,
         metadata=metadata,
-        provider=agent.provider,
+        provider=provider,
         context={
             "artifacts": artifacts_ctx,
             "history": history_ctx,
@@ -131,14 +145,21 @@ async def interact_with_agent(
 
 
 @router.get("/{agent_id}/interactions", response_model=List[InteractionRead])
-def list_agent_interactions(agent_id: int, db: Session = Depends(get_db)) -> List[Interaction]:
+def list_agent_interactions(
+    agent_id: int,
+    before: Optional[int] = Query(default=None, description="Only interactions with a smaller id."),
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    db: Session = Depends(get_db),
+) -> List[Interaction]:
+    """Newest-first interactions; page with ``limit`` and the last id seen as ``before``."""
     agent = db.query(Agent).filter(Agent.id == agent_id).first()
     if agent is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
 
-    return (
-        db.query(Interaction)
-        .filter(Interaction.agent_id == agent_id)
-        .order_by(Interaction.created_at.desc())
-        .all()
-    )
+    query = db.query(Interaction).filter(Interaction.agent_id == agent_id)
+    if before is not None:
+        query = query.filter(Interaction.id < before)
+    query = query.order_by(Interaction.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
 from sqlalchemy import or_
@@ -6,31 +6,41 @@ from sqlalchemy.orm import Session
 
 from ..db import get_db
 from ..models import Artifact, Space
-from ..nlp_utils import build_summary_and_tags
-from ..schemas import ArtifactCreate, ArtifactRead, ArtifactUpdate
+from ..schemas import ArtifactCreate, ArtifactCreated, ArtifactRead, ArtifactUpdate, PassageRead
+from ..services.embeddings import search_passages, similar_artifacts
+from ..services.enrichment import discard_artifact, enrich_artifact
+from ..services.tags import filter_by_tags
+from ..services.temperature import access_tracker
 from ..storage import remove_upload, save_upload
 
 router = APIRouter(prefix="/artifacts", tags=["artifacts"])
 
 
-def _apply_nlp_enrichment(artifact: Artifact) -> None:
-    summary, tags = build_summary_and_tags(artifact.title, artifact.content or "")
-    artifact.summary = summary or None
-    artifact.tags = tags
+def _apply_nlp_enrichment(artifact: Artifact, db: Session) -> None:
+    enrich_artifact(artifact, db)
 
 
 @router.get("/", response_model=List[ArtifactRead])
 def list_artifacts(
     space_id: Optional[int] = Query(default=None),
+    tags: List[str] = Query(default=[], alias="tag"),
+    tag_mode: Literal["all", "any"] = Query(default="all"),
     db: Session = Depends(get_db),
 ) -> List[Artifact]:
     query = db.query(Artifact)
     if space_id is not None:
         query = query.filter(Artifact.space_id == space_id)
+    if tags:
+        try:
+            query = filter_by_tags(query, tags, match_all=tag_mode == "all")
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+            )
     return query.order_by(Artifact.created_at.desc()).all()
 
 
-@router.post("/", response_model=ArtifactRead, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=ArtifactCreated, status_code=status.HTTP_201_CREATED)
 def create_artifact(artifact_in: ArtifactCreate, db: Session = Depends(get_db)) -> Artifact:
     space_exists = db.query(Space.id).filter(Space.id == artifact_in.space_id).first()
     if space_exists is None:
@@ -38,7 +48,7 @@ def create_artifact(artifact_in: ArtifactCreate, db: Session = Depends(get_db))
 
     payload = artifact_in.model_dump(exclude={"file_path"})
     artifact = Artifact(**payload)
-    _apply_nlp_enrichment(artifact)
+    _apply_nlp_enrichment(artifact, db)
     db.add(artifact)
     db.commit()
     db.refresh(artifact)
@@ -67,7 +77,43 @@ def search_artifacts(
     return query.order_by(Artifact.created_at.desc()).limit(limit).all()
 
 
-@router.post("/upload", response_model=ArtifactRead, status_code=status.HTTP_201_CREATED)
+@router.get("/similar", response_model=List[ArtifactRead])
+async def search_similar_artifacts(
+    q: str = Query(..., min_length=1),
+    space_id: Optional[int] = Query(default=None),
+    limit: int = Query(default=20, le=100),
+    db: Session = Depends(get_db),
+) -> List[Artifact]:
+    """Artifacts closest in meaning to ``q``, by embedding similarity."""
+    ranked = await similar_artifacts(db, q, space_id, limit)
+    db.commit()  # keep the vectors embedded for this search
+    return [artifact for artifact, _ in ranked]
+
+
+@router.get("/passages", response_model=List[PassageRead])
+async def search_artifact_passages(
+    q: str = Query(..., min_length=1),
+    space_id: Optional[int] = Query(default=None),
+    limit: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> List[PassageRead]:
+    """Passages of artifacts closest in meaning to ``q``, best first."""
+    ranked = await search_passages(db, q, space_id, limit=limit)
+    db.commit()  # keep the vectors embedded for this search
+    return [
+        PassageRead(
+            artifact_id=chunk.artifact_id,
+            position=chunk.position,
+            start=chunk.start,
+            end=chunk.end,
+            text=chunk.text,
+            score=round(score, 4),
+        )
+        for chunk, score in ranked
+    ]
+
+
+@router.post("/upload", response_model=ArtifactCreated, status_code=status.HTTP_201_CREATED)
 async def upload_artifact(
     space_id: int = Form(...),
     file: UploadFile = File(...),
@@ -89,7 +135,7 @@ async def upload_artifact(
         file_path=stored_name,
         mime_type=mime_type,
     )
-    _apply_nlp_enrichment(artifact)
+    _apply_nlp_enrichment(artifact, db)
     db.add(artifact)
     db.commit()
     db.refresh(artifact)
@@ -103,6 +149,7 @@ def get_artifact(artifact_id: int, db: Session = Depends(get_db)) -> Artifact:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Artifact not found"
         )
+    access_tracker.touch(db, [artifact.id])
     return artifact
 
 
@@ -121,7 +168,7 @@ def update_artifact(
         setattr(artifact, field, value)
 
     if {"title", "content"} & updated_data.keys():
-        _apply_nlp_enrichment(artifact)
+        _apply_nlp_enrichment(artifact, db)
 
     db.commit()
     db.refresh(artifact)
@@ -137,5 +184,6 @@ def delete_artifact(artifact_id: int, db: Session = Depends(get_db)) -> None:
         )
 
     remove_upload(artifact.file_path)
+    discard_artifact(artifact, db)
     db.delete(artifact)
     db.commit()
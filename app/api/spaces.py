@@ -1,11 +1,35 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session, selectinload
 
 from ..db import get_db
-from ..models import Space
-from ..schemas import SpaceCreate, SpaceDetail, SpaceRead, SpaceUpdate
+from ..models import Bloom, CrossSpaceBloom, Space, SpaceTerm
+from ..schemas import (
+    BloomRead,
+    CrossSpaceBloomRead,
+    DuplicateGroup,
+    GraphEdge,
+    GraphNode,
+    SpaceCreate,
+    SpaceDetail,
+    SpaceEntropy,
+    SpaceGraph,
+    SpaceRead,
+    SpaceUpdate,
+    SpaceUsage,
+    TagFacet,
+    TopicRead,
+)
+from ..services.connections import space_graph
+from ..services.corpus import top_terms
+from ..services.duplicates import find_duplicate_groups
+from ..services.tags import tag_facets
+from ..services.temperature import refresh_thermal_state
+from ..services.usage import budget_status, spend
+from ..services.versions import etag_matches, space_etag, space_versions
 
 router = APIRouter(prefix="/spaces", tags=["spaces"])
 
@@ -25,7 +49,26 @@ def create_space(space_in: SpaceCreate, db: Session = Depends(get_db)) -> Space:
 
 
 @router.get("/{space_id}", response_model=SpaceDetail)
-def get_space(space_id: int, db: Session = Depends(get_db)) -> Space:
+def get_space(
+    space_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    """Space with its artifacts; revalidate with ``If-None-Match`` for a 304.
+
+    The ETag changes with the space version and, because artifact
+    temperatures decay with time, with the UTC date.
+    """
+    versions = space_versions(db, space_id)
+    if versions is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    etag = space_etag(versions, datetime.now(timezone.utc).date().isoformat())
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
     space = (
         db.query(Space)
         .options(selectinload(Space.artifacts))
@@ -37,6 +80,125 @@ def get_space(space_id: int, db: Session = Depends(get_db)) -> Space:
     return space
 
 
+@router.get("/{space_id}/topics", response_model=List[TopicRead])
+def list_space_topics(
+    space_id: int,
+    limit: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> List[SpaceTerm]:
+    space_exists = db.query(Space.id).filter(Space.id == space_id).first()
+    if space_exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    return top_terms(db, space_id, limit)
+
+
+@router.get("/{space_id}/tags", response_model=List[TagFacet])
+def list_space_tags(
+    space_id: int,
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_db),
+) -> List[TagFacet]:
+    space_exists = db.query(Space.id).filter(Space.id == space_id).first()
+    if space_exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    return [TagFacet(tag=tag, count=count) for tag, count in tag_facets(db, space_id, limit)]
+
+
+@router.get("/{space_id}/graph", response_model=SpaceGraph)
+def get_space_graph(space_id: int, db: Session = Depends(get_db)) -> SpaceGraph:
+    space_exists = db.query(Space.id).filter(Space.id == space_id).first()
+    if space_exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+
+    nodes, edges = space_graph(db, space_id)
+    return SpaceGraph(
+        nodes=[GraphNode(id=node_id, title=title) for node_id, title in nodes],
+        edges=[
+            GraphEdge(
+                source=edge.source_artifact_id,
+                target=edge.target_artifact_id,
+                strength=edge.connection_strength,
+                type=edge.connection_type,
+            )
+            for edge in edges
+        ],
+    )
+
+
+@router.get("/{space_id}/blooms", response_model=List[BloomRead])
+def list_space_blooms(space_id: int, db: Session = Depends(get_db)) -> List[Bloom]:
+    space_exists = db.query(Space.id).filter(Space.id == space_id).first()
+    if space_exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    return (
+        db.query(Bloom)
+        .filter(Bloom.space_id == space_id)
+        .order_by(Bloom.strength.desc())
+        .all()
+    )
+
+
+@router.get("/{space_id}/cross-space-blooms", response_model=List[CrossSpaceBloomRead])
+def list_cross_space_blooms(
+    space_id: int, db: Session = Depends(get_db)
+) -> List[CrossSpaceBloom]:
+    """Blooms from the last cross-space scan that involve this space."""
+    space_exists = db.query(Space.id).filter(Space.id == space_id).first()
+    if space_exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    members = func.json_each(CrossSpaceBloom.space_ids_json).table_valued("value")
+    return (
+        db.query(CrossSpaceBloom)
+        .filter(select(members.c.value).where(members.c.value == space_id).exists())
+        .order_by(CrossSpaceBloom.strength.desc())
+        .all()
+    )
+
+
+@router.get("/{space_id}/duplicates", response_model=List[DuplicateGroup])
+def list_space_duplicates(space_id: int, db: Session = Depends(get_db)) -> List[DuplicateGroup]:
+    space_exists = db.query(Space.id).filter(Space.id == space_id).first()
+    if space_exists is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    return [
+        DuplicateGroup(artifact_ids=artifact_ids, similarity=similarity)
+        for artifact_ids, similarity in find_duplicate_groups(db, space_id)
+    ]
+
+
+@router.get("/{space_id}/entropy", response_model=SpaceEntropy)
+def read_space_entropy(space_id: int, db: Session = Depends(get_db)) -> Space:
+    """Entropy metrics as of the last thermal refresh, computed now if never run."""
+    space = db.query(Space).filter(Space.id == space_id).first()
+    if space is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    if space.entropy_last_calculated is None:
+        refresh_thermal_state(db, space_ids=[space_id])
+        db.refresh(space)
+    return space
+
+
+@router.get("/{space_id}/usage", response_model=SpaceUsage)
+def get_space_usage(
+    space_id: int,
+    days: int = Query(default=7, ge=1, le=366),
+    group_by: Literal["day", "agent", "provider", "model"] = Query(default="day"),
+    db: Session = Depends(get_db),
+) -> dict:
+    """Token usage and cost over the last ``days`` UTC days, plus today's budget.
+
+    Reads the per-day rollups, never the interactions themselves.
+    """
+    space = db.query(Space).filter(Space.id == space_id).first()
+    if space is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    return {
+        "space_id": space_id,
+        **spend(db, space_id, days, group_by),
+        "budget": budget_status(db, space).as_dict(),
+    }
+
+
 @router.put("/{space_id}", response_model=SpaceRead)
 def update_space(
     space_id: int, space_in: SpaceUpdate, db: Session = Depends(get_db)
@@ -1,10 +1,15 @@
+import math
+import os
+import sqlite3
 from collections.abc import Generator
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateColumn
 
-DATABASE_URL = "sqlite:///./thinkspaces.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./thinkspaces.db")
 
 engine = create_engine(
     DATABASE_URL, connect_args={"check_same_thread": False}, future=True
@@ -12,11 +17,67 @@ engine = create_engine(
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
+_JOURNAL_MODES = {"delete", "truncate", "persist", "wal"}
+
+
+@event.listens_for(engine, "connect")
+def _set_journal_mode(dbapi_connection, _connection_record) -> None:
+    """Apply ``SQLITE_JOURNAL_MODE`` (e.g. ``wal``) to the app database.
+
+    WAL lets several worker processes read while one writes. Its ``-wal``
+    and ``-shm`` files sit next to the database, so mount the directory
+    rather than the single file when running in a container.
+    """
+    mode = os.getenv("SQLITE_JOURNAL_MODE", "").lower()
+    if mode in _JOURNAL_MODES and isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute(f"PRAGMA journal_mode={mode}")
+
+
+@event.listens_for(Engine, "connect")
+def _ensure_sqlite_math_functions(dbapi_connection, _connection_record) -> None:
+    """Provide ``exp()`` on SQLite builds compiled without math functions."""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    try:
+        dbapi_connection.execute("SELECT exp(0)")
+    except sqlite3.OperationalError:
+        dbapi_connection.create_function("exp", 1, math.exp, deterministic=True)
+
+
 def create_db_and_tables() -> None:
     """Initialize database tables if they do not already exist."""
     from .models import Base
 
     Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine, Base.metadata)
+    add_missing_indexes(engine, Base.metadata)
+
+
+def add_missing_columns(bind: Engine, metadata) -> None:
+    """Add columns declared on existing tables but missing from the database.
+
+    ``create_all`` never alters tables that already exist, so columns added to
+    the models after a database was created are appended here. New columns
+    must be nullable or carry a ``server_default``.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def add_missing_indexes(bind: Engine, metadata) -> None:
+    """Create indexes declared on tables that existed before the index did."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
 
 
 @contextmanager
@@ -1,24 +1,36 @@
 """LLM provider registry and utilities."""
 
 from .registry import ProviderRegistry, registry
-from .types import CompletionRequest, CompletionResponse, LLMProvider
-# Ensure default providers register on import
-from . import providers  # noqa: F401
+from .types import (
+    CompletionRequest,
+    CompletionResponse,
+    EmbeddingProvider,
+    LLMProvider,
+    ProviderCapabilities,
+)
 
-try:  # noqa: SIM105
-    from . import openai_provider  # noqa: F401
-except Exception:  # pragma: no cover - optional dependency guard
-    pass
-
-try:  # noqa: SIM105
-    from . import ollama_provider  # noqa: F401
-except Exception:  # pragma: no cover - optional dependency guard
-    pass
-
-try:  # noqa: SIM105
-    from . import groq_provider  # noqa: F401
-except Exception:  # pragma: no cover - optional dependency guard
-    pass
+# Built-in providers, imported on first use (see ProviderRegistry). Their
+# capabilities are declared here so they can be compared without loading them.
+# None streams yet: LLMProvider has no streaming method to call.
+BUILTIN_PROVIDERS = {
+    "echo": (f"{__name__}.providers:EchoProvider", ProviderCapabilities()),
+    "simulated": (f"{__name__}.simulated_provider:SimulatedProvider", ProviderCapabilities()),
+    "openai": (
+        f"{__name__}.openai_provider:OpenAIProvider",
+        ProviderCapabilities(embeddings=True, max_context=128_000),
+    ),
+    "ollama": (
+        f"{__name__}.ollama_provider:OllamaProvider",
+        # Ollama's default context window; models can be configured larger.
+        ProviderCapabilities(batching=True, embeddings=True, max_context=4096),
+    ),
+    "groq": (
+        f"{__name__}.groq_provider:GroqProvider",
+        ProviderCapabilities(max_context=131_072),
+    ),
+}
+for _name, (_target, _capabilities) in BUILTIN_PROVIDERS.items():
+    registry.register_lazy(_name, _target, _capabilities)
 
 __all__ = [
     "ProviderRegistry",
@@ -26,4 +38,6 @@ __all__ = [
     "CompletionRequest",
     "CompletionResponse",
     "LLMProvider",
+    "EmbeddingProvider",
+    "ProviderCapabilities",
 ]
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Called with (operation, batch size, seconds the oldest item waited) for every
+# dispatched batch. The app registers its metrics here; this package stays
+# free of app imports.
+BatchListener = Callable[[str, int, float], None]
+_batch_listeners: List[BatchListener] = []
+
+
+def add_batch_listener(listener: BatchListener) -> None:
+    if listener not in _batch_listeners:
+        _batch_listeners.append(listener)
+
+
+_client_sets: "weakref.WeakSet[KeepAliveClients]" = weakref.WeakSet()
+
+
+async def aclose_clients() -> None:
+    """Close every shared client opened on the running loop (app shutdown)."""
+    for client_set in list(_client_sets):
+        await client_set.aclose()
+
+
+@dataclass
+class _Pending(Generic[T, R]):
+    items: List[T] = field(default_factory=list)
+    futures: List["asyncio.Future[R]"] = field(default_factory=list)
+    size: int = 0
+    opened: float = field(default_factory=time.perf_counter)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects concurrent calls for a short window and dispatches them together.
+
+    The first ``submit`` for a key opens a batch. The batch is dispatched
+    ``window_seconds`` later, or as soon as its size reaches ``max_batch``.
+    Each item adds ``weight(item)`` to the size (1 by default), so items
+    that carry several inputs count each of them. An item that would take a
+    batch past ``max_batch`` dispatches it and opens the next one.
+    ``dispatch(key, items)`` must return one result per item, in order. If it
+    raises, every caller in the batch gets the error. Batches are per event
+    loop, because their futures belong to one.
+    """
+
+    def __init__(
+        self,
+        operation: str,
+        dispatch: Callable[[Hashable, List[T]], Awaitable[List[R]]],
+        window_seconds: float = 0.005,
+        max_batch: int = 32,
+        weight: Optional[Callable[[T], int]] = None,
+    ) -> None:
+        self.operation = operation
+        self.dispatch = dispatch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.weight = weight or (lambda _item: 1)
+        self._pending: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Pending[T, R]]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    async def submit(self, key: Hashable, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[R]" = loop.create_future()
+        size = self.weight(item)
+        with self._lock:
+            batches = self._pending.setdefault(loop, {})
+            batch = batches.get(key)
+            previous = None
+            if batch is not None and batch.size + size > self.max_batch:
+                previous, batch = batches.pop(key), None
+            if batch is None:
+                batch = batches[key] = _Pending()
+                if self.max_batch > 1:
+                    batch.timer = loop.call_later(self.window_seconds, self._flush, loop, key, batch)
+            batch.items.append(item)
+            batch.futures.append(future)
+            batch.size += size
+            full = batch.size >= self.max_batch
+        if previous is not None:
+            self._dispatch(loop, key, previous)
+        if full:
+            self._flush(loop, key, batch)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, key: Hashable, batch: _Pending[T, R]) -> None:
+        with self._lock:
+            batches = self._pending.get(loop, {})
+            if batches.get(key) is not batch:
+                return  # already dispatched
+            del batches[key]
+        self._dispatch(loop, key, batch)
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop, key: Hashable, batch: _Pending[T, R]) -> None:
+        if batch.timer is not None:
+            batch.timer.cancel()
+        waited = time.perf_counter() - batch.opened
+        for listener in _batch_listeners:
+            listener(self.operation, batch.size, waited)
+        loop.create_task(self._run(key, batch))
+
+    async def _run(self, key: Hashable, batch: _Pending[T, R]) -> None:
+        try:
+            results = await self.dispatch(key, batch.items)
+            if len(results) != len(batch.items):
+                raise RuntimeError(
+                    f"{self.operation} returned {len(results)} results for {len(batch.items)} inputs"
+                )
+        except Exception as exc:  # noqa: BLE001 - handed to every caller
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():  # the caller may have been cancelled
+                future.set_result(result)
+
+
+class KeepAliveClients:
+    """Shared ``httpx.AsyncClient`` per base URL and event loop.
+
+    The clients reuse a bounded set of keep-alive connections, so repeated
+    calls skip the TCP handshake. Calls beyond ``max_connections`` wait for a
+    free connection and do not open new ones. Clients are tied to the loop
+    that created them, since httpx connections cannot move between loops.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 4,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.transport = transport
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        _client_sets.add(self)
+
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            client = clients.get(base_url)
+            if client is None or client.is_closed:
+                client = clients[base_url] = httpx.AsyncClient(
+                    base_url=base_url,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                    transport=self.transport,
+                )
+            return client
+
+    async def aclose(self) -> None:
+        """Close the running loop's clients."""
+        with self._lock:
+            clients = self._clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
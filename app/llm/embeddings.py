@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional, Protocol, Sequence
+
+from .registry import ProviderRegistry, registry
+from .types import EmbeddingProvider
+
+
+class EmbeddingCache(Protocol):
+    """Vectors keyed by ``content_key``."""
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]: ...
+
+    def put_many(self, vectors: Mapping[str, List[float]]) -> None: ...
+
+
+def content_key(model_id: str, text: str) -> str:
+    """Cache key of ``text`` embedded by ``model_id``; changes with either."""
+    return hashlib.sha256(f"{model_id}\0{text}".encode("utf-8")).hexdigest()
+
+
+class MemoryEmbeddingCache:
+    """In-process LRU ``EmbeddingCache``."""
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self._vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._vectors.get(key)
+                if vector is not None:
+                    self._vectors.move_to_end(key)
+                    found[key] = vector
+        return found
+
+    def put_many(self, vectors: Mapping[str, List[float]]) -> None:
+        with self._lock:
+            self._vectors.update(vectors)
+            for key in vectors:
+                self._vectors.move_to_end(key)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors.clear()
+
+
+class Embedder:
+    """Embeds any number of texts through an ``EmbeddingProvider``.
+
+    Texts already in the cache are not sent again, and neither are repeats
+    within one call. The rest is split into slices of the provider's
+    ``max_batch``, with at most ``max_concurrency`` slices in flight at once.
+    """
+
+    def __init__(
+        self,
+        provider: EmbeddingProvider,
+        cache: Optional[EmbeddingCache] = None,
+        max_concurrency: int = 4,
+    ) -> None:
+        self.provider = provider
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.provider.name}:{self.provider.embedding_model}"
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def embed(
+        self, texts: Sequence[str], cache: Optional[EmbeddingCache] = None
+    ) -> List[List[float]]:
+        """One vector per text. ``cache`` overrides the embedder's own cache."""
+        cache = cache if cache is not None else self.cache
+        keys = [content_key(self.model_id, text) for text in texts]
+        vectors = cache.get_many(keys) if cache is not None else {}
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            pending = list(missing.items())
+            size = max(1, self.provider.max_batch)
+            slices = [pending[start : start + size] for start in range(0, len(pending), size)]
+            semaphore = self._semaphore()
+
+            async def run(batch):
+                async with semaphore:
+                    return await self.provider.embed([text for _, text in batch])
+
+            fresh = {}
+            for batch, result in zip(slices, await asyncio.gather(*map(run, slices))):
+                if len(result) != len(batch):
+                    raise RuntimeError(
+                        f"{self.provider.name} returned {len(result)} embeddings for {len(batch)} texts"
+                    )
+                fresh.update((key, vector) for (key, _), vector in zip(batch, result))
+            if cache is not None:
+                cache.put_many(fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
+
+
+def create_embedding_provider(
+    name: str, model: Optional[str] = None, providers: ProviderRegistry = registry
+) -> EmbeddingProvider:
+    """Embedding provider called ``name``: ``hashing`` or a registered provider that embeds."""
+    if name == "hashing":
+        from .hashing_embedder import HashingEmbedder
+
+        return HashingEmbedder()
+    provider_cls = providers.get(name)
+    if provider_cls is None or not issubclass(provider_cls, EmbeddingProvider):
+        raise RuntimeError(f"Provider '{name}' does not support embeddings")
+    provider = provider_cls()
+    if model:
+        provider.embedding_model = model
+    return provider
@@ -4,7 +4,9 @@ import os
 from dataclasses import dataclass, field
 from typing import Optional
 
+from .prompting import chat_messages
 from .registry import registry
+from .timeouts import provider_timeouts
 from .types import CompletionRequest, CompletionResponse, LLMProvider
 
 try:
@@ -51,23 +53,15 @@ class GroqProvider(LLMProvider):
 
         self._client = AsyncOpenAI(
             api_key=self.api_key,
-            base_url="https://api.groq.com/openai/v1"
+            base_url="https://api.groq.com/openai/v1",
+            timeout=provider_timeouts(self.name).httpx(),
         )
 
     async def generate(self, request: CompletionRequest) -> CompletionResponse:
         model_name = request.options.get("model") if request.options else None
         model = model_name or self.model
 
-        messages = []
-        if request.system:
-            messages.append({"role": "system", "content": request.system})
-
-        if request.context:
-            context_text = "\n".join(request.context)
-            messages.append({"role": "system", "content": f"Context:\n{context_text}"})
-
-        messages.append({"role": "user", "content": request.prompt})
-
+        messages = chat_messages(request)
         completion = await self._client.chat.completions.create(
             model=model,
             messages=messages,
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Sequence
+
+from .types import EmbeddingProvider
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class HashingEmbedder(EmbeddingProvider):
+    """Deterministic local embedder using the hashing trick.
+
+    Each word and adjacent word pair is hashed to a signed slot of a fixed
+    size vector, which is then L2-normalised. Texts sharing vocabulary end
+    up close under cosine similarity. There is no model to download and no
+    network call, and the same text always yields the same vector. That
+    makes it the default for tests and offline installs.
+    """
+
+    name: str = "hashing"
+    embedding_model: str = "hashing"
+    dimensions: int = field(
+        default_factory=lambda: int(os.getenv("HASHING_EMBEDDING_DIMENSIONS", "256"))
+    )
+    max_batch = 1024
+
+    def __post_init__(self) -> None:
+        self.embedding_model = f"hashing-{self.dimensions}"
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return [self.vector(text) for text in texts]
+
+    def vector(self, text: str) -> List[float]:
+        values = [0.0] * self.dimensions
+        words = _WORD.findall(text.lower())
+        for feature in (*words, *(f"{a} {b}" for a, b in zip(words, words[1:]))):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            slot = int.from_bytes(digest[:4], "little") % self.dimensions
+            values[slot] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in values))
+        return [value / norm for value in values] if norm else values
@@ -1,24 +1,162 @@
 from __future__ import annotations
 
 import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from typing import Hashable, List, Optional, Sequence, Tuple, Union
 
 import httpx
 
+from .batching import KeepAliveClients, MicroBatcher
+from .prompting import prefix_digest, prompt_text, turn_digest
 from .registry import registry
-from .types import CompletionRequest, CompletionResponse, LLMProvider
+from .timeouts import provider_timeouts
+from .types import CompletionRequest, CompletionResponse, EmbeddingProvider, LLMProvider
 
 
 class OllamaProviderError(RuntimeError):
-    pass
+    def __init__(self, message: str, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        # HTTP status Ollama answered with; None when it was not reached.
+        self.status_code = status_code
+
+
+# One bounded set of keep-alive connections per Ollama instance. Ollama runs
+# OLLAMA_NUM_PARALLEL requests at once and queues the rest, so more
+# connections than that only move the queue from our side to its side.
+connections = KeepAliveClients(max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", "4")))
+
+
+def _keep_alive() -> Union[int, str]:
+    """How long Ollama keeps a model loaded after a call; ``-1`` pins it.
+
+    Bare numbers are sent as JSON numbers (seconds), which is how Ollama
+    expects ``-1``; durations such as ``30m`` are sent as strings.
+    """
+    value = os.getenv("OLLAMA_KEEP_ALIVE", "30m").strip()
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+async def _post(base_url: str, path: str, payload: dict) -> dict:
+    timeouts = provider_timeouts("ollama")
+    try:
+        response = await connections.get(base_url).post(
+            path, json=payload, timeout=timeouts.httpx()
+        )
+    except httpx.TimeoutException as exc:
+        raise OllamaProviderError(
+            f"Ollama at {base_url} timed out ({type(exc).__name__})"
+        ) from exc
+    except httpx.HTTPError as exc:  # pragma: no cover - network failure path
+        raise OllamaProviderError(f"Failed to reach Ollama at {base_url}: {exc}") from exc
+
+    if response.status_code != 200:
+        raise OllamaProviderError(
+            f"Ollama returned status {response.status_code}: {response.text}",
+            status_code=response.status_code,
+        )
+    return response.json()
+
+
+async def _embed_batch(key: Hashable, inputs: List[Sequence[str]]) -> List[List[List[float]]]:
+    """Embed several callers' texts with one ``/api/embed`` call."""
+    base_url, model, keep_alive = key
+    texts = [text for item in inputs for text in item]
+    data = await _post(
+        base_url, "/api/embed", {"model": model, "input": texts, "keep_alive": keep_alive}
+    )
+    vectors = data.get("embeddings") or []
+    if len(vectors) != len(texts):
+        raise OllamaProviderError(
+            f"Ollama returned {len(vectors)} embeddings for {len(texts)} inputs"
+        )
+    results, start = [], 0
+    for item in inputs:
+        results.append(vectors[start : start + len(item)])
+        start += len(item)
+    return results
+
+
+# Texts per /api/embed call, summed over the callers batched into it.
+MAX_EMBED_BATCH = int(os.getenv("OLLAMA_MAX_BATCH", "32"))
+
+embed_batcher: MicroBatcher[Sequence[str], List[List[float]]] = MicroBatcher(
+    "ollama.embed",
+    _embed_batch,
+    window_seconds=float(os.getenv("OLLAMA_BATCH_WINDOW_MS", "5")) / 1000,
+    max_batch=MAX_EMBED_BATCH,
+    weight=len,
+)
+
+
+class ContextCache:
+    """Ollama ``context`` tokens from the latest turn of each conversation.
+
+    ``/api/generate`` returns the token state of prompt plus response. If
+    the next call of the same conversation has the same prefix (model,
+    system prompt and space context) and its last history turn is the one
+    that state ended with, only the new user turn is sent along with those
+    tokens. Ollama then skips re-evaluating the conversation so far. States
+    over ``max_tokens`` are dropped, so a long conversation falls back to the
+    windowed full prompt instead of growing without bound.
+    """
+
+    def __init__(self, max_entries: int = 256, max_tokens: int = 4096) -> None:
+        self.max_entries = max_entries
+        self.max_tokens = max_tokens
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, str, List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(
+        self, key: Tuple[str, str], prefix: str, history: Sequence[Tuple[str, str]]
+    ) -> Optional[List[int]]:
+        if not history:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] != prefix or entry[1] != turn_digest(*history[-1]):
+            return None
+        return entry[2]
+
+    def store(
+        self, key: Tuple[str, str], prefix: str, prompt: str, response: str, tokens: List[int]
+    ) -> None:
+        with self._lock:
+            if not tokens or len(tokens) > self.max_tokens:
+                self._entries.pop(key, None)
+                return
+            self._entries[key] = (prefix, turn_digest(prompt, response), tokens)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+contexts = ContextCache(max_tokens=int(os.getenv("OLLAMA_CONTEXT_MAX_TOKENS", "4096")))
 
 
 @dataclass
-class OllamaProvider(LLMProvider):
-    """LLM provider that talks to a local Ollama instance."""
+class OllamaProvider(LLMProvider, EmbeddingProvider):
+    """LLM provider that talks to a local Ollama instance.
+
+    Calls share keep-alive connections and ask Ollama to keep the model loaded
+    (``OLLAMA_KEEP_ALIVE``), so a CPU-only box does not reload weights between
+    requests. Turns of one conversation reuse the previous turn's ``context``
+    tokens (see ``ContextCache``). Concurrent ``embed`` calls are
+    micro-batched into one request.
+    """
 
     name: str = "ollama"
     model: str = "llama3"
+    # No single caller may exceed a whole /api/embed batch.
+    max_batch = MAX_EMBED_BATCH
+    embedding_model: str = field(
+        default_factory=lambda: os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+    )
     base_url: str = field(
         default_factory=lambda: os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     )
@@ -27,40 +165,47 @@ class OllamaProvider(LLMProvider):
         target_model = request.options.get("model") if request.options else None
         model = target_model or self.model
 
-        prompt_parts = []
-        if request.system:
-            prompt_parts.append(f"System:\n{request.system}")
-        if request.context:
-            prompt_parts.append("Context:\n" + "\n".join(request.context))
-        prompt_parts.append(request.prompt)
-        prompt = "\n\n".join(prompt_parts)
-
         payload = {
             "model": model,
-            "prompt": prompt,
+            "prompt": prompt_text(request),
             "stream": False,
+            "keep_alive": _keep_alive(),
         }
+        cache_key = prefix = None
+        reused: List[int] = []
+        if request.conversation:
+            cache_key = (self.base_url, request.conversation)
+            prefix = prefix_digest(request, model)
+            reused = contexts.lookup(cache_key, prefix, request.history) or []
+            if reused:
+                payload["prompt"] = request.prompt
+                payload["context"] = reused
+        data = await _post(self.base_url, "/api/generate", payload)
 
-        try:
-            async with httpx.AsyncClient(base_url=self.base_url, timeout=30) as client:
-                response = await client.post("/api/generate", json=payload)
-        except httpx.HTTPError as exc:  # pragma: no cover - network failure path
-            raise OllamaProviderError(
-                f"Failed to reach Ollama at {self.base_url}: {exc}"
-            ) from exc
-
-        if response.status_code != 200:
-            raise OllamaProviderError(
-                f"Ollama returned status {response.status_code}: {response.text}"
-            )
-
-        data = response.json()
         output = data.get("response", "")
+        if cache_key is not None:
+            contexts.store(cache_key, prefix, request.prompt, output, data.get("context") or [])
         metadata = {
             "model": data.get("model", model),
             "created_at": data.get("created_at"),
         }
+        if "prompt_eval_count" in data or "eval_count" in data:
+            evaluated = data.get("prompt_eval_count") or 0
+            metadata["usage"] = {
+                "prompt_tokens": evaluated + len(reused),
+                "completion_tokens": data.get("eval_count") or 0,
+                "prompt_tokens_details": {"cached_tokens": len(reused)},
+            }
         return CompletionResponse(output=output, metadata=metadata)
 
+    async def embed(
+        self, texts: Sequence[str], model: Optional[str] = None
+    ) -> List[List[float]]:
+        """One vector per text; concurrent callers share ``/api/embed`` calls."""
+        if not texts:
+            return []
+        key = (self.base_url, model or self.embedding_model, _keep_alive())
+        return await embed_batcher.submit(key, list(texts))
+
 
 registry.register(OllamaProvider)
@@ -2,10 +2,12 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import List, Optional, Sequence
 
+from .prompting import chat_messages
 from .registry import registry
-from .types import CompletionRequest, CompletionResponse, LLMProvider
+from .timeouts import provider_timeouts
+from .types import CompletionRequest, CompletionResponse, EmbeddingProvider, LLMProvider
 
 try:
     from openai import AsyncOpenAI
@@ -18,12 +20,17 @@ class OpenAIProviderError(RuntimeError):
 
 
 @dataclass
-class OpenAIProvider(LLMProvider):
-    """LLM provider that calls OpenAI's chat completions API."""
+class OpenAIProvider(LLMProvider, EmbeddingProvider):
+    """LLM provider that calls OpenAI's chat completions and embeddings APIs."""
 
     name: str = "openai"
     model: str = "gpt-4o-mini"
+    embedding_model: str = field(
+        default_factory=lambda: os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+    )
     api_key: Optional[str] = field(default=None, repr=False)
+    # Inputs accepted by one embeddings request.
+    max_batch = 2048
 
     def __post_init__(self) -> None:
         if AsyncOpenAI is None:
@@ -39,25 +46,24 @@ class OpenAIProvider(LLMProvider):
                 "OPENAI_API_KEY is not set; configure it to enable the OpenAI provider"
             )
 
-        self._client = AsyncOpenAI(api_key=self.api_key)
+        self._client = AsyncOpenAI(
+            api_key=self.api_key, timeout=provider_timeouts(self.name).httpx()
+        )
 
     async def generate(self, request: CompletionRequest) -> CompletionResponse:
         model_name = request.options.get("model") if request.options else None
         model = model_name or self.model
 
-        messages = []
-        if request.system:
-            messages.append({"role": "system", "content": request.system})
-
-        if request.context:
-            context_text = "\n".join(request.context)
-            messages.append({"role": "system", "content": f"Context:\n{context_text}"})
-
-        messages.append({"role": "user", "content": request.prompt})
+        messages = chat_messages(request)
+        extra = {}
+        if request.conversation:
+            # Steers a conversation's calls to the same prompt-cache shard.
+            extra["extra_body"] = {"prompt_cache_key": request.conversation}
 
         completion = await self._client.chat.completions.create(
             model=model,
             messages=messages,
+            **extra,
         )
 
         choice = completion.choices[0]
@@ -70,5 +76,13 @@ class OpenAIProvider(LLMProvider):
 
         return CompletionResponse(output=output, metadata=metadata)
 
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        response = await self._client.embeddings.create(
+            model=self.embedding_model, input=list(texts)
+        )
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
 
 registry.register(OpenAIProvider)
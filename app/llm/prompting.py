@@ -0,0 +1,64 @@
+"""Canonical prompt layout shared by the providers.
+
+Every provider lays a request out in the same order: the static system
+prompt, then the space context, then earlier turns oldest first, then the
+new user turn. Parts that change least come first, so consecutive calls
+share the longest possible prefix and provider-side prefix caches can reuse
+it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Dict, List
+
+from .types import CompletionRequest
+
+
+def context_block(request: CompletionRequest) -> str:
+    context = list(request.context)
+    return "Context:\n" + "\n".join(context) if context else ""
+
+
+def chat_messages(request: CompletionRequest) -> List[Dict[str, str]]:
+    """Chat-completions messages for ``request`` in canonical order."""
+    messages = []
+    if request.system:
+        messages.append({"role": "system", "content": request.system})
+    context = context_block(request)
+    if context:
+        messages.append({"role": "system", "content": context})
+    for prompt, response in request.history:
+        messages.append({"role": "user", "content": prompt})
+        messages.append({"role": "assistant", "content": response})
+    messages.append({"role": "user", "content": request.prompt})
+    return messages
+
+
+def prompt_text(request: CompletionRequest) -> str:
+    """Single-string prompt for ``request`` in canonical order."""
+    parts = []
+    if request.system:
+        parts.append(f"System:\n{request.system}")
+    context = context_block(request)
+    if context:
+        parts.append(context)
+    for prompt, response in request.history:
+        parts.append(f"User:\n{prompt}\n\nAssistant:\n{response}")
+    parts.append(request.prompt)
+    return "\n\n".join(parts)
+
+
+def prefix_digest(request: CompletionRequest, model: str) -> str:
+    """Fingerprint of the parts that precede the conversation turns."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (model, request.system or "", context_block(request)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def turn_digest(prompt: str, response: str) -> str:
+    return hashlib.blake2b(
+        prompt.encode("utf-8") + b"\0" + response.encode("utf-8"), digest_size=16
+    ).hexdigest()
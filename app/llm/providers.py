@@ -20,6 +20,9 @@ class EchoProvider(LLMProvider):
             for part in (
                 f"[system]\n{request.system}" if request.system else None,
                 combined_context if combined_context else None,
+                # Earlier responses already echo their own history; repeating
+                # them would double the output every turn.
+                *(f"Previous prompt: {prompt}" for prompt, _ in request.history),
                 request.prompt,
             )
             if part
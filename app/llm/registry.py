@@ -1,33 +1,144 @@
 from __future__ import annotations
 
+import importlib
+import logging
+import os
+import threading
+from importlib import metadata
 from typing import Dict, Optional, Type
 
-from .types import LLMProvider
+from .types import LLMProvider, ProviderCapabilities
+
+logger = logging.getLogger(__name__)
+
+# Installed packages add providers under this entry point group, e.g. in
+# pyproject.toml: [project.entry-points."thinkspaces.providers"]
+# mistral = "thinkspaces_mistral:MistralProvider"
+ENTRY_POINT_GROUP = "thinkspaces.providers"
 
 
 class ProviderRegistry:
-    """Runtime registry for provider adapters."""
+    """Runtime registry for provider adapters.
+
+    Providers are either registered as classes or declared lazily as
+    ``"package.module:ClassName"`` targets, the syntax of package entry
+    points. A lazy provider's module is imported on the first ``get`` of its
+    name, so SDKs such as ``openai`` are only loaded by deployments that use
+    them. A target that fails to import is logged and treated as unavailable.
 
-    def __init__(self) -> None:
+    Besides the declared providers, ``discover`` picks up the entry points of
+    ``ENTRY_POINT_GROUP`` and the ``LLM_PROVIDER_MODULES`` list; it runs once,
+    the first time a name is missing or the providers are listed.
+    """
+
+    def __init__(self, discover: bool = False) -> None:
         self._providers: Dict[str, Type[LLMProvider]] = {}
+        self._lazy: Dict[str, str] = {}
+        self._capabilities: Dict[str, ProviderCapabilities] = {}
+        self._discovered = not discover
+        self._lock = threading.RLock()
 
     def register(self, provider_cls: Type[LLMProvider]) -> None:
         key = provider_cls.name.lower()
-        if key in self._providers:
-            raise ValueError(f"Provider '{provider_cls.name}' already registered")
-        self._providers[key] = provider_cls
+        with self._lock:
+            existing = self._providers.get(key)
+            if existing is provider_cls:
+                return
+            if existing is not None:
+                raise ValueError(f"Provider '{provider_cls.name}' already registered")
+            self._lazy.pop(key, None)
+            self._providers[key] = provider_cls
+
+    def register_lazy(
+        self, name: str, target: str, capabilities: Optional[ProviderCapabilities] = None
+    ) -> None:
+        """Declare provider ``name`` as ``target`` (``"module:Class"``) without importing it.
+
+        ``capabilities`` lets callers inspect the provider before it is
+        loaded; without them the class's own ``capabilities`` are used.
+        """
+        key = name.lower()
+        with self._lock:
+            if key in self._providers or key in self._lazy:
+                raise ValueError(f"Provider '{name}' already registered")
+            self._lazy[key] = target
+            if capabilities is not None:
+                self._capabilities[key] = capabilities
+
+    def discover(self) -> None:
+        """Declare providers from package entry points and ``LLM_PROVIDER_MODULES``.
+
+        ``LLM_PROVIDER_MODULES`` is a comma-separated list of
+        ``name=module:Class`` entries, which load lazily, or plain module
+        names, which are imported now and register their own providers.
+        Names that are already registered keep their current provider.
+        """
+        with self._lock:
+            self._discovered = True
+            declared = [(ep.name, ep.value) for ep in metadata.entry_points(group=ENTRY_POINT_GROUP)]
+            for entry in filter(None, (e.strip() for e in os.getenv("LLM_PROVIDER_MODULES", "").split(","))):
+                name, separator, target = entry.partition("=")
+                if separator:
+                    declared.append((name.strip(), target.strip()))
+                    continue
+                try:
+                    importlib.import_module(entry)
+                except Exception:  # noqa: BLE001 - a broken plugin must not stop the app
+                    logger.warning("Could not import LLM provider module %r", entry, exc_info=True)
+            for name, target in declared:
+                if name.lower() not in self._providers and name.lower() not in self._lazy:
+                    self.register_lazy(name, target)
+
+    def _ensure_discovered(self) -> None:
+        if not self._discovered:
+            self.discover()
 
     def create(self, name: str, **kwargs) -> LLMProvider:
-        provider = self._providers.get(name.lower())
+        provider = self.get(name)
         if provider is None:
             raise KeyError(f"No LLM provider registered under name '{name}'")
         return provider(**kwargs)
 
     def get(self, name: str) -> Optional[Type[LLMProvider]]:
-        return self._providers.get(name.lower())
+        key = name.lower()
+        provider = self._providers.get(key)
+        if provider is None and key not in self._lazy:
+            self._ensure_discovered()
+        if provider is None and key in self._lazy:
+            provider = self._load(key)
+        return provider
+
+    def _load(self, key: str) -> Optional[Type[LLMProvider]]:
+        with self._lock:
+            target = self._lazy.pop(key, None)
+            if target is None:  # loaded by another thread meanwhile
+                return self._providers.get(key)
+            module_name, _, attribute = target.partition(":")
+            try:
+                # Importing usually registers the class itself.
+                provider = getattr(importlib.import_module(module_name), attribute)
+            except Exception:  # noqa: BLE001 - optional dependency guard
+                logger.warning("Could not load LLM provider %r from %s", key, target, exc_info=True)
+                self._capabilities.pop(key, None)
+                return None
+            self._providers.setdefault(key, provider)
+            return self._providers[key]
+
+    def capabilities(self, name: str) -> Optional[ProviderCapabilities]:
+        """What provider ``name`` supports, loading it only if nothing was declared."""
+        key = name.lower()
+        declared = self._capabilities.get(key)
+        if declared is not None:
+            return declared
+        provider = self.get(key)
+        return provider.capabilities if provider is not None else None
+
+    def is_loaded(self, name: str) -> bool:
+        return name.lower() in self._providers
 
     def available(self) -> list[str]:
-        return sorted(self._providers.keys())
+        self._ensure_discovered()
+        return sorted({*self._providers, *self._lazy})
 
 
-registry = ProviderRegistry()
+registry = ProviderRegistry(discover=True)
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .registry import ProviderRegistry, registry
+from .timeouts import ProviderTimeouts, provider_timeouts
+from .types import CompletionRequest, CompletionResponse, LLMProvider
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def parse_chain_entry(entry: str) -> Tuple[str, Optional[str]]:
+    """Split a ``provider`` or ``provider:model`` chain entry."""
+    name, _, model = entry.strip().partition(":")
+    return name.strip().lower(), model.strip() or None
+
+
+def resolve_chain(
+    primary: str,
+    model: Optional[str],
+    fallbacks: Iterable[str] = (),
+    providers: ProviderRegistry = registry,
+) -> List[Tuple[str, Optional[str]]]:
+    """Ordered ``(provider, model)`` links for an agent, skipping unknown providers.
+
+    The primary provider runs the agent's model. A fallback without an explicit
+    model uses its provider's default, since the agent's model name rarely
+    means anything to another backend.
+    """
+    chain: List[Tuple[str, Optional[str]]] = []
+    for name, link_model in [(primary.lower(), model), *map(parse_chain_entry, fallbacks)]:
+        if providers.get(name) is not None and (name, link_model) not in chain:
+            chain.append((name, link_model))
+    return chain
+
+
+class CircuitBreaker:
+    """Skips a provider after repeated failures, then lets one trial call through.
+
+    ``closed`` passes calls. ``failure_threshold`` consecutive failures open
+    the breaker for ``cooldown_seconds``. After that it is ``half_open``: one
+    call is let through, and its outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give back a trial slot whose call was cancelled without an outcome."""
+        self._trial_in_flight = False
+
+
+@dataclass
+class ProviderStats:
+    breaker: CircuitBreaker
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+    successes: int = 0
+    failures: int = 0
+    last_error: Optional[str] = None
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+@dataclass
+class Attempt:
+    provider: str
+    model: Optional[str]
+    outcome: str  # ok, error, timeout, cancelled or skipped
+    seconds: float = 0.0
+    hedge: bool = False
+    error: Optional[str] = None
+    # HTTP status of a provider error that carries one (e.g. 429).
+    status_code: Optional[int] = None
+    started: float = field(default=0.0, repr=False)
+
+
+def is_provider_fault(exc: BaseException) -> bool:
+    """Whether a failed call says the provider is unhealthy.
+
+    Rate limits, 5xx answers and errors without a status (the provider was
+    not reached) count. Other 4xx answers reject one request, such as a
+    prompt that is too long, and say nothing about the provider.
+    """
+    status_code = getattr(exc, "status_code", None)
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+class RoutingError(RuntimeError):
+    """Every link of a provider chain failed or was skipped."""
+
+    def __init__(self, message: str, attempts: List[Attempt]) -> None:
+        super().__init__(message)
+        self.attempts = attempts
+
+    @property
+    def status_code(self) -> int:
+        """HTTP status to answer our own client with.
+
+        Upstream statuses describe the call to the provider, not the client's
+        request, so only a rate limit passes through as 429. An upstream 5xx
+        becomes 502 and a timeout 504. If every link was skipped by an open
+        breaker, the answer is 503. Anything else is 400.
+        """
+        failed = [a for a in self.attempts if a.outcome in ("error", "timeout")]
+        if not failed:
+            skipped = [a for a in self.attempts if a.outcome == "skipped"]
+            return 503 if skipped and len(skipped) == len(self.attempts) else 400
+        last = failed[-1]
+        if last.outcome == "timeout":
+            return 504
+        if last.status_code == 429:
+            return 429
+        if last.status_code is not None and last.status_code >= 500:
+            return 502
+        return 400
+
+
+@dataclass
+class RoutedCompletion:
+    response: CompletionResponse
+    provider: str
+    model: Optional[str]
+    attempts: List[Attempt]
+
+
+class ProviderRouter:
+    """Runs a completion over a provider chain with failover, hedging and breakers.
+
+    Links whose breaker is open are skipped. A failed call moves straight to
+    the next link. If the running call has not answered within its
+    provider's recent p95 latency, the next link is started as a hedge. The
+    first answer wins and the other call is cancelled. Hedging waits until
+    ``hedge_min_samples`` latencies have been seen for the provider. A call
+    running past its provider's total timeout fails like any other error.
+    Only timeouts, rate limits, 5xx answers and unreachable providers count
+    towards a breaker; other 4xx answers fail over without tripping it.
+    """
+
+    def __init__(
+        self,
+        providers: ProviderRegistry = registry,
+        failure_threshold: int = 5,
+        cooldown_seconds: float = 30.0,
+        hedging: bool = True,
+        hedge_min_samples: int = 20,
+        hedge_min_seconds: float = 0.5,
+        timeouts: Callable[[str], ProviderTimeouts] = provider_timeouts,
+    ) -> None:
+        self.providers = providers
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.hedging = hedging
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_seconds = hedge_min_seconds
+        self.timeouts = timeouts
+        self._stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    def stats(self, name: str) -> ProviderStats:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = ProviderStats(
+                    CircuitBreaker(self.failure_threshold, self.cooldown_seconds)
+                )
+            return stats
+
+    def hedge_deadline(self, name: str) -> Optional[float]:
+        if not self.hedging:
+            return None
+        stats = self.stats(name)
+        if len(stats.latencies) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_seconds, stats.p95() or 0.0)
+
+    def fastest(
+        self,
+        operation: str,
+        candidates: Optional[Iterable[str]] = None,
+        min_context: Optional[int] = None,
+    ) -> Optional[str]:
+        """The capable provider with the lowest recent p95 latency.
+
+        Providers whose capabilities lack ``operation``, whose context window
+        is smaller than ``min_context``, or whose breaker is open are left
+        out. Providers with no latency samples yet come after measured ones,
+        in ``candidates`` order.
+        """
+        ranked = []
+        for order, name in enumerate(candidates or self.providers.available()):
+            capabilities = self.providers.capabilities(name)
+            if capabilities is None or not capabilities.supports(operation):
+                continue
+            if min_context and capabilities.max_context and capabilities.max_context < min_context:
+                continue
+            stats = self.stats(name)
+            if stats.breaker.state == "open":
+                continue
+            p95 = stats.p95()
+            ranked.append((p95 is None, p95 or 0.0, order, name))
+        return min(ranked)[3] if ranked else None
+
+    def health(self) -> Dict[str, dict]:
+        """Breaker state, recent latency and capabilities per registered provider."""
+        report = {}
+        for name in self.providers.available():
+            stats = self.stats(name)
+            p95 = stats.p95()
+            capabilities = self.providers.capabilities(name)
+            report[name] = {
+                "state": stats.breaker.state,
+                "consecutive_failures": stats.breaker.consecutive_failures,
+                "successes": stats.successes,
+                "failures": stats.failures,
+                "p95_seconds": round(p95, 4) if p95 is not None else None,
+                "last_error": stats.last_error,
+                "capabilities": dataclasses.asdict(capabilities) if capabilities else None,
+            }
+        return report
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def _create(self, name: str, model: Optional[str]) -> LLMProvider:
+        provider_cls = self.providers.get(name)
+        if provider_cls is None:
+            raise RuntimeError(f"Provider '{name}' is not available")
+        if model is None:
+            return provider_cls()
+        try:
+            return provider_cls(model=model)
+        except TypeError:
+            return provider_cls()
+
+    async def generate(
+        self, chain: Sequence[Tuple[str, Optional[str]]], request: CompletionRequest
+    ) -> RoutedCompletion:
+        attempts: List[Attempt] = []
+        errors: List[str] = []
+        pending = list(chain)
+        running: Dict[asyncio.Task, Attempt] = {}
+
+        def start_next(hedge: bool = False) -> bool:
+            while pending:
+                name, model = pending.pop(0)
+                stats = self.stats(name)
+                if not stats.breaker.allow():
+                    attempts.append(Attempt(name, model, "skipped"))
+                    errors.append(f"{name}: circuit open")
+                    continue
+                try:
+                    provider = self._create(name, model)
+                except RuntimeError as exc:
+                    # Configuration problems say nothing about the backend's health.
+                    stats.breaker.release()
+                    attempts.append(Attempt(name, model, "error", error=str(exc)))
+                    errors.append(str(exc))
+                    continue
+                options = {key: value for key, value in request.options.items() if key != "model"}
+                if model:
+                    options["model"] = model
+                link_request = dataclasses.replace(request, options=options)
+                attempt = Attempt(
+                    name,
+                    model or getattr(provider, "model", None),
+                    "running",
+                    hedge=hedge,
+                    started=time.perf_counter(),
+                )
+                call = asyncio.wait_for(provider.generate(link_request), self.timeouts(name).total)
+                running[asyncio.ensure_future(call)] = attempt
+                return True
+            return False
+
+        start_next()
+        hedged = False
+        try:
+            while running:
+                timeout = None
+                if not hedged and pending and len(running) == 1:
+                    [only] = running.values()
+                    deadline = self.hedge_deadline(only.provider)
+                    if deadline is not None:
+                        timeout = max(0.0, only.started + deadline - time.perf_counter())
+                done, _ = await asyncio.wait(
+                    running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = start_next(hedge=True)
+                    continue
+                for task in done:
+                    attempt = running.pop(task)
+                    attempt.seconds = time.perf_counter() - attempt.started
+                    stats = self.stats(attempt.provider)
+                    exc = task.exception()
+                    if exc is None:
+                        attempt.outcome = "ok"
+                        attempts.append(attempt)
+                        stats.breaker.record_success()
+                        stats.successes += 1
+                        stats.latencies.append(attempt.seconds)
+                        return RoutedCompletion(task.result(), attempt.provider, attempt.model, attempts)
+                    if isinstance(exc, asyncio.TimeoutError):
+                        attempt.outcome = "timeout"
+                        attempt.error = (
+                            f"{attempt.provider} timed out after "
+                            f"{self.timeouts(attempt.provider).total:g}s"
+                        )
+                    else:
+                        attempt.outcome = "error"
+                        attempt.error = str(exc) or type(exc).__name__
+                        attempt.status_code = getattr(exc, "status_code", None)
+                    attempts.append(attempt)
+                    errors.append(attempt.error)
+                    if attempt.outcome == "timeout" or is_provider_fault(exc):
+                        stats.breaker.record_failure()
+                    else:
+                        stats.breaker.release()
+                    stats.failures += 1
+                    stats.last_error = attempt.error
+                if not running:
+                    start_next()
+        finally:
+            for task, attempt in running.items():
+                if task.done() and not task.cancelled():
+                    task.exception()  # finished alongside the winner; nothing to report
+                task.cancel()
+                attempt.outcome = "cancelled"
+                attempt.seconds = time.perf_counter() - attempt.started
+                attempts.append(attempt)
+                self.stats(attempt.provider).breaker.release()
+
+        if len(errors) == 1:
+            raise RoutingError(errors[0], attempts)
+        raise RoutingError("All providers failed: " + "; ".join(errors), attempts)
+
+
+provider_router = ProviderRouter(
+    failure_threshold=int(_env_float("PROVIDER_BREAKER_FAILURES", 5)),
+    cooldown_seconds=_env_float("PROVIDER_BREAKER_COOLDOWN_SECONDS", 30.0),
+    hedging=os.getenv("PROVIDER_HEDGING", "on").lower() not in {"0", "off", "false"},
+    hedge_min_samples=int(_env_float("PROVIDER_HEDGE_MIN_SAMPLES", 20)),
+    hedge_min_seconds=_env_float("PROVIDER_HEDGE_MIN_SECONDS", 0.5),
+)
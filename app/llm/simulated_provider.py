@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .registry import registry
+from .types import CompletionRequest, CompletionResponse, LLMProvider
+
+
+class SimulatedProviderError(RuntimeError):
+    status_code = 502
+
+
+class SimulatedRateLimitError(SimulatedProviderError):
+    status_code = 429
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+_rng = random.Random(os.getenv("SIMULATED_SEED"))
+
+
+@dataclass
+class SimulatedProvider(LLMProvider):
+    """Provider that fakes LLM latency and failures without calling a backend.
+
+    Intended for load tests: every knob can be set through ``SIMULATED_*``
+    environment variables so a running server can be tuned without code changes.
+
+    - ``SIMULATED_TTFT_SECONDS``: delay before the first token (default 0.3)
+    - ``SIMULATED_TOKENS_PER_SECOND``: decode speed (default 60)
+    - ``SIMULATED_OUTPUT_TOKENS``: tokens per completion (default 80)
+    - ``SIMULATED_JITTER``: +/- fraction applied to each delay (default 0.2)
+    - ``SIMULATED_ERROR_RATE``: share of calls failing like a 5xx (default 0)
+    - ``SIMULATED_RATE_LIMIT_RATE``: share of calls rejected like a 429 (default 0)
+    - ``SIMULATED_SEED``: seed for reproducible runs
+    """
+
+    name: str = "simulated"
+    model: str = "simulated"
+    time_to_first_token: float = field(
+        default_factory=lambda: _env_float("SIMULATED_TTFT_SECONDS", 0.3)
+    )
+    tokens_per_second: float = field(
+        default_factory=lambda: _env_float("SIMULATED_TOKENS_PER_SECOND", 60.0)
+    )
+    output_tokens: int = field(
+        default_factory=lambda: int(_env_float("SIMULATED_OUTPUT_TOKENS", 80))
+    )
+    jitter: float = field(default_factory=lambda: _env_float("SIMULATED_JITTER", 0.2))
+    error_rate: float = field(
+        default_factory=lambda: _env_float("SIMULATED_ERROR_RATE", 0.0)
+    )
+    rate_limit_rate: float = field(
+        default_factory=lambda: _env_float("SIMULATED_RATE_LIMIT_RATE", 0.0)
+    )
+    rng: Optional[random.Random] = field(default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.rng is None:
+            self.rng = _rng
+
+    async def generate(self, request: CompletionRequest) -> CompletionResponse:
+        model_name = request.options.get("model") if request.options else None
+        model = model_name or self.model
+
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            # Rate limits are rejected quickly, before any decoding happens.
+            await asyncio.sleep(self._jittered(min(self.time_to_first_token, 0.05)))
+            raise SimulatedRateLimitError("429 Too Many Requests (simulated rate limit)")
+
+        time_to_first_token = self._jittered(self.time_to_first_token)
+        await asyncio.sleep(time_to_first_token)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise SimulatedProviderError("502 Bad Gateway (simulated upstream error)")
+
+        decode_seconds = 0.0
+        if self.tokens_per_second > 0:
+            decode_seconds = self._jittered(self.output_tokens / self.tokens_per_second)
+            await asyncio.sleep(decode_seconds)
+
+        prompt_tokens = sum(
+            len(part.split())
+            for part in (
+                request.system or "",
+                *request.context,
+                *(turn for pair in request.history for turn in pair),
+                request.prompt,
+            )
+        )
+        words = request.prompt.split() or ["simulated"]
+        output = " ".join(words[i % len(words)] for i in range(self.output_tokens))
+        metadata = {
+            "model": model,
+            "provider": self.name,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": self.output_tokens,
+                "total_tokens": prompt_tokens + self.output_tokens,
+            },
+            "timing": {
+                "time_to_first_token": time_to_first_token,
+                "decode_seconds": decode_seconds,
+            },
+        }
+        return CompletionResponse(output=output, metadata=metadata)
+
+    def _jittered(self, seconds: float) -> float:
+        if seconds <= 0:
+            return 0.0
+        spread = seconds * self.jitter
+        return max(0.0, seconds + self.rng.uniform(-spread, spread))
+
+
+registry.register(SimulatedProvider)
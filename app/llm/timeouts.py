@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+DEFAULT_CONNECT_SECONDS = 5.0
+DEFAULT_READ_SECONDS = 60.0
+DEFAULT_TOTAL_SECONDS = 120.0
+
+
+def _seconds(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    if not value:
+        return None
+    seconds = float(value)
+    return seconds if seconds > 0 else None
+
+
+@dataclass(frozen=True)
+class ProviderTimeouts:
+    """How long a provider call may take.
+
+    ``connect`` bounds opening a connection and ``read`` bounds the wait for
+    each chunk of the response; both are enforced by the HTTP client.
+    ``total`` bounds the whole call, including retries inside a provider
+    SDK, and is enforced by the router. ``None`` means no limit.
+    """
+
+    connect: Optional[float] = DEFAULT_CONNECT_SECONDS
+    read: Optional[float] = DEFAULT_READ_SECONDS
+    total: Optional[float] = DEFAULT_TOTAL_SECONDS
+
+    def httpx(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read, connect=self.connect)
+
+
+def provider_timeouts(name: str) -> ProviderTimeouts:
+    """Timeouts for provider ``name``.
+
+    ``<NAME>_CONNECT_TIMEOUT_SECONDS``, ``<NAME>_READ_TIMEOUT_SECONDS`` and
+    ``<NAME>_TOTAL_TIMEOUT_SECONDS`` (e.g. ``OLLAMA_READ_TIMEOUT_SECONDS``)
+    override the ``PROVIDER_*_TIMEOUT_SECONDS`` defaults. ``0`` disables a
+    limit.
+    """
+    values = []
+    for kind, default in (
+        ("CONNECT", DEFAULT_CONNECT_SECONDS),
+        ("READ", DEFAULT_READ_SECONDS),
+        ("TOTAL", DEFAULT_TOTAL_SECONDS),
+    ):
+        value = default
+        for variable in (f"PROVIDER_{kind}_TIMEOUT_SECONDS", f"{name.upper()}_{kind}_TIMEOUT_SECONDS"):
+            if os.getenv(variable):
+                value = _seconds(variable)
+        values.append(value)
+    return ProviderTimeouts(*values)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Iterable, Mapping, Optional
+from typing import Any, ClassVar, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 
 @dataclass(slots=True)
@@ -11,6 +11,11 @@ class CompletionRequest:
     system: Optional[str] = None
     context: Iterable[str] = field(default_factory=tuple)
     options: Mapping[str, Any] = field(default_factory=dict)
+    # Earlier (prompt, response) turns, oldest first.
+    history: Sequence[Tuple[str, str]] = field(default_factory=tuple)
+    # Identifies a conversation whose turns extend one another, so providers
+    # can reuse cached prompt state between them.
+    conversation: Optional[str] = None
 
 
 @dataclass(slots=True)
@@ -19,12 +24,53 @@ class CompletionResponse:
     metadata: Mapping[str, Any] = field(default_factory=dict)
 
 
+@dataclass(frozen=True, slots=True)
+class ProviderCapabilities:
+    """What a provider supports beyond plain completions.
+
+    ``batching`` means concurrent calls are combined into fewer backend
+    requests. ``max_context`` is the largest prompt, in tokens, its default
+    model accepts (``None`` if unknown or unbounded).
+    """
+
+    streaming: bool = False
+    batching: bool = False
+    embeddings: bool = False
+    max_context: Optional[int] = None
+
+    def supports(self, operation: str) -> bool:
+        """Whether ``operation`` (``complete``, ``stream``, ``embed``) is supported."""
+        return {
+            "complete": True,
+            "stream": self.streaming,
+            "embed": self.embeddings,
+        }.get(operation, False)
+
+
 class LLMProvider(ABC):
     """Interface all LLM providers must implement."""
 
     name: str
+    capabilities: ClassVar[ProviderCapabilities] = ProviderCapabilities()
 
     @abstractmethod
     async def generate(self, request: CompletionRequest) -> CompletionResponse:
         """Produce a completion for the given request."""
 
+
+class EmbeddingProvider(ABC):
+    """Interface for providers that turn texts into vectors.
+
+    ``embed`` takes at most ``max_batch`` texts per call; callers that need
+    more go through ``app.llm.embeddings.Embedder``, which splits, caches
+    and bounds concurrency.
+    """
+
+    name: str
+    embedding_model: str
+    max_batch: ClassVar[int] = 64
+
+    @abstractmethod
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """One vector per text, in order."""
+
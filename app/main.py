@@ -1,11 +1,19 @@
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response, status
 from fastapi.staticfiles import StaticFiles
 
+from . import metrics
 from .api import agents, artifacts, spaces
-from .db import create_db_and_tables
+from .db import create_db_and_tables, engine, get_session
+from .llm.batching import aclose_clients, add_batch_listener
+from .llm.routing import provider_router
+from .rendering import warm_templates
+from .shared_state import shared_state
+from .services.blooms import bloom_worker
+from .services.tags import index_artifact_tags
+from .services.temperature import access_tracker
 from .storage import ensure_upload_dir
 from . import web
 
@@ -14,19 +22,46 @@ load_dotenv()
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    """Ensure database tables exist on startup."""
-    create_db_and_tables()
+    """Create tables and load templates on startup; stop workers on shutdown."""
+    # Workers start together; only one of them creates the tables.
+    with shared_state().lock("create-tables"):
+        create_db_and_tables()
+        with get_session() as db:
+            index_artifact_tags(db)
     ensure_upload_dir()
+    warm_templates()
+    bloom_worker.resume(engine)
     yield
+    bloom_worker.stop()
+    access_tracker.stop()
+    await aclose_clients()
+    shared_state().close()
 
 
 app = FastAPI(title="Think Spaces API", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+add_batch_listener(metrics.observe_batch)
 
 
 @app.get("/health")
-def read_health() -> dict[str, str]:
-    """Simple health check endpoint."""
-    return {"status": "ok"}
+def read_health() -> dict[str, object]:
+    """Liveness plus each LLM provider's circuit-breaker state and p95 latency.
+
+    ``status`` stays ``ok`` while providers are failing: the app itself is
+    up, and agents fail over or report the provider error.
+    """
+    return {"status": "ok", "providers": provider_router.health()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics() -> Response:
+    """Prometheus text exposition; enabled with METRICS_ENABLED=1."""
+    if not metrics.is_enabled():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled")
+    return Response(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 @app.get("/")
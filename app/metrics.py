@@ -0,0 +1,396 @@
+"""In-process metrics with Prometheus text exposition.
+
+Collection is off unless ``METRICS_ENABLED`` is set (or :func:`enable` is
+called). While disabled the HTTP middleware passes requests straight through,
+no SQLAlchemy listeners are attached and every ``observe``/``inc`` returns
+after a single flag check.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from collections.abc import Mapping
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = tuple(float(4**power) for power in range(4, 14))
+COUNT_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if not _enabled:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not _enabled:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, **labels: Any) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        series = self._series.get(key)
+        return sum(series[0]) if series else 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(
+                (key, list(counts), total[0]) for key, (counts, total) in self._series.items()
+            )
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Counter | Histogram] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_seconds = registry.histogram(
+    "thinkspaces_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+db_queries_per_request = registry.histogram(
+    "thinkspaces_db_queries_per_request",
+    "SQL statements executed while serving one HTTP request.",
+    ("route",),
+    buckets=COUNT_BUCKETS,
+)
+db_seconds_per_request = registry.histogram(
+    "thinkspaces_db_seconds_per_request",
+    "Time spent executing SQL while serving one HTTP request.",
+    ("route",),
+)
+db_queries_total = registry.counter(
+    "thinkspaces_db_queries_total", "SQL statements executed.", ("operation",)
+)
+provider_call_seconds = registry.histogram(
+    "thinkspaces_provider_call_duration_seconds",
+    "LLM provider call latency.",
+    ("provider", "model", "outcome"),
+)
+provider_tokens_total = registry.counter(
+    "thinkspaces_provider_tokens_total",
+    "Tokens reported in provider usage metadata.",
+    ("provider", "model", "kind"),
+)
+enrichment_seconds = registry.histogram(
+    "thinkspaces_enrichment_duration_seconds", "Artifact NLP enrichment time."
+)
+coalesced_calls_total = registry.counter(
+    "thinkspaces_coalesced_calls_total",
+    "Calls through a single-flight group, by whether they ran, joined a call in flight or hit the cache.",
+    ("operation", "outcome"),
+)
+interactions_cancelled_total = registry.counter(
+    "thinkspaces_interactions_cancelled_total",
+    "Agent interactions abandoned because the client disconnected.",
+    ("provider",),
+)
+budget_exceeded_total = registry.counter(
+    "thinkspaces_budget_exceeded_total",
+    "Interactions started after their space used its daily budget.",
+    ("action",),
+)
+embeddings_total = registry.counter(
+    "thinkspaces_embeddings_total",
+    "Texts looked up for embedding, by whether the cache had them.",
+    ("model", "outcome"),
+)
+space_events_total = registry.counter(
+    "thinkspaces_space_events_total", "Space change events published.", ("type",)
+)
+template_render_seconds = registry.histogram(
+    "thinkspaces_template_render_seconds",
+    "Time spent rendering a page or an uncached fragment.",
+    ("template",),
+)
+fragment_cache_total = registry.counter(
+    "thinkspaces_fragment_cache_total",
+    "Rendered-fragment cache lookups, by hit or miss.",
+    ("template", "outcome"),
+)
+provider_batch_size = registry.histogram(
+    "thinkspaces_provider_batch_size",
+    "Calls dispatched together by a provider micro-batcher.",
+    ("operation",),
+    buckets=COUNT_BUCKETS,
+)
+provider_batch_wait_seconds = registry.histogram(
+    "thinkspaces_provider_batch_wait_seconds",
+    "Time the first call of a micro-batch waited for the batch to fill.",
+    ("operation",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+upload_bytes = registry.histogram(
+    "thinkspaces_upload_bytes", "Size of uploaded files.", buckets=SIZE_BUCKETS
+)
+
+
+class _RequestStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[_RequestStats]] = ContextVar(
+    "thinkspaces_request_stats", default=None
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    db_queries_total.inc(operation=operation)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+
+def _handle_error(context) -> None:
+    started = context.connection.info.get("metrics_started") if context.connection else None
+    if started:
+        started.pop()
+
+
+def enable() -> None:
+    """Start collecting and attach SQLAlchemy listeners to every engine."""
+    global _enabled
+    if _enabled:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop collecting and detach the SQLAlchemy listeners."""
+    global _enabled
+    if not _enabled:
+        return
+    event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.remove(Engine, "handle_error", _handle_error)
+    _enabled = False
+
+
+def observe_usage(provider: str, model: str, metadata: Any) -> None:
+    """Record token counts from a completion's ``usage`` metadata, if present."""
+    if not _enabled or not isinstance(metadata, Mapping):
+        return
+    usage = metadata.get("usage")
+    if not isinstance(usage, Mapping):
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = usage.get(kind)
+        if isinstance(value, (int, float)) and value:
+            provider_tokens_total.inc(value, provider=provider, model=model, kind=kind)
+    cached = cached_tokens(usage)
+    if cached:
+        provider_tokens_total.inc(cached, provider=provider, model=model, kind="cached_tokens")
+
+
+def cached_tokens(usage: Mapping) -> int:
+    """Prompt tokens served from a provider's prefix cache, if it reports them.
+
+    OpenAI (and the providers mirroring it) nest the count under
+    ``prompt_tokens_details``; others report a flat ``cached_tokens``.
+    """
+    details = usage.get("prompt_tokens_details")
+    value = details.get("cached_tokens") if isinstance(details, Mapping) else None
+    if value is None:
+        value = usage.get("cached_tokens")
+    return int(value) if isinstance(value, (int, float)) else 0
+
+
+def observe_batch(operation: str, size: int, waited: float) -> None:
+    """Listener for ``app.llm.batching`` micro-batches."""
+    provider_batch_size.observe(size, operation=operation)
+    provider_batch_wait_seconds.observe(waited, operation=operation)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL counts per route template."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not _enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            http_request_seconds.observe(
+                elapsed,
+                method=scope.get("method", ""),
+                route=route_path,
+                status=status_holder["status"],
+            )
+            db_queries_per_request.observe(stats.queries, route=route_path)
+            db_seconds_per_request.observe(stats.seconds, route=route_path)
+
+
+if os.getenv("METRICS_ENABLED", "").lower() in {"1", "true", "yes", "on"}:
+    enable()
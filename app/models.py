@@ -1,7 +1,24 @@
 import json
+from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, func
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    func,
+)
+from sqlalchemy.orm import declarative_base, object_session, relationship
+
+from .thermal import age_in_days, state_for_age, temperature_for_age
 
 Base = declarative_base()
 
@@ -14,6 +31,23 @@ class Space(Base):
     description = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     memory_summary = Column(Text, nullable=True)
+    document_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Change counters bumped on every ORM write to the space or its
+    # collections; see app/services/versions.py.
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    artifacts_version = Column(Integer, nullable=False, default=0, server_default="0")
+    agents_version = Column(Integer, nullable=False, default=0, server_default="0")
+    interactions_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Per-day spend limits for the space's agents; see app/services/usage.py.
+    daily_token_budget = Column(Integer, nullable=True)
+    daily_cost_budget = Column(Float, nullable=True)
+    budget_action = Column(String(20), nullable=False, default="reject", server_default="reject")
+    # Materialized by the thermal refresh job; see app/services/temperature.py.
+    entropy_score = Column(Float, nullable=True)
+    fragmentation_index = Column(Float, nullable=True)
+    connection_density = Column(Float, nullable=True)
+    temporal_coherence = Column(Float, nullable=True)
+    entropy_last_calculated = Column(DateTime(timezone=True), nullable=True)
 
     artifacts = relationship(
         "Artifact", back_populates="space", cascade="all, delete-orphan"
@@ -24,6 +58,16 @@ class Space(Base):
     interactions = relationship(
         "Interaction", back_populates="space", cascade="all, delete-orphan"
     )
+    terms = relationship(
+        "SpaceTerm", back_populates="space", cascade="all, delete-orphan"
+    )
+    connections = relationship(
+        "ArtifactConnection", back_populates="space", cascade="all, delete-orphan"
+    )
+    blooms = relationship("Bloom", back_populates="space", cascade="all, delete-orphan")
+    fingerprints = relationship(
+        "ArtifactFingerprint", back_populates="space", cascade="all, delete-orphan"
+    )
 
 
 class Artifact(Base):
@@ -38,9 +82,34 @@ class Artifact(Base):
     mime_type = Column(String(100), nullable=True)
     summary = Column(Text, nullable=True)
     _tags = Column("tags", Text, nullable=True)
+    _terms = Column("terms", Text, nullable=True)
+    _fingerprint = Column("fingerprint", Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set in Python for sub-second precision: rendered cards are cached by it.
+    updated_at = Column(
+        DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc)
+    )
+    last_accessed = Column(DateTime(timezone=True), nullable=True)
+    access_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Snapshot written by the thermal refresh job for SQL filtering and sorting.
+    _temperature = Column("temperature", Float, nullable=True)
+    _temperature_state = Column("temperature_state", String(10), nullable=True)
+    temperature_last_updated = Column(DateTime(timezone=True), nullable=True)
+
+    # Set by enrichment when the artifact nearly duplicates an existing one.
+    # Not stored: only the create and upload responses report it.
+    duplicate_of = None
 
     space = relationship("Space", back_populates="artifacts")
+    tag_index = relationship(
+        "ArtifactTag", back_populates="artifact", cascade="all, delete-orphan"
+    )
+    chunks = relationship(
+        "ArtifactChunk",
+        back_populates="artifact",
+        cascade="all, delete-orphan",
+        order_by="ArtifactChunk.position",
+    )
 
     @property
     def tags(self) -> list[str]:
@@ -59,6 +128,291 @@ class Artifact(Base):
             self._tags = value
         else:
             self._tags = json.dumps(list(value))
+        self._sync_tag_index()
+
+    def _sync_tag_index(self) -> None:
+        """Mirror ``tags`` into the ``artifact_tags`` rows used for SQL filtering."""
+        wanted = {
+            tag.strip().lower()
+            for tag in self.tags
+            if isinstance(tag, str) and tag.strip()
+        }
+        for row in list(self.tag_index):
+            if row.tag in wanted:
+                wanted.discard(row.tag)
+            else:
+                self.tag_index.remove(row)
+        for tag in sorted(wanted):
+            # ``space_id`` is copied from the artifact on insert; it may not
+            # be set yet while the constructor's keyword arguments are applied.
+            self.tag_index.append(ArtifactTag(tag=tag))
+
+    @property
+    def terms(self) -> list[str] | None:
+        """Distinct terms counted in the space document-frequency table.
+
+        ``None`` means the artifact has not been indexed yet.
+        """
+        if self._terms is None:
+            return None
+        try:
+            return json.loads(self._terms)
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    @terms.setter
+    def terms(self, value: list[str] | None) -> None:
+        self._terms = None if value is None else json.dumps(sorted(value))
+
+    @property
+    def fingerprint(self) -> list[int]:
+        """MinHash signature of the artifact's text; empty if not computed."""
+        if not self._fingerprint:
+            return []
+        try:
+            return json.loads(self._fingerprint)
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    @fingerprint.setter
+    def fingerprint(self, value: list[int] | None) -> None:
+        self._fingerprint = json.dumps(list(value)) if value else None
+
+    @property
+    def temperature(self) -> float:
+        """Current temperature, decayed from the last access (or creation)."""
+        return temperature_for_age(age_in_days(self.last_accessed or self.created_at))
+
+    @property
+    def temperature_state(self) -> str:
+        return state_for_age(age_in_days(self.last_accessed or self.created_at))
+
+
+@event.listens_for(Artifact, "before_update")
+def _stamp_artifact_update(_mapper, _connection, artifact: Artifact) -> None:
+    # An ORM hook rather than ``onupdate`` so the Core UPDATEs of access
+    # counts and temperatures do not count as edits.
+    session = object_session(artifact)
+    if session is None or session.is_modified(artifact, include_collections=False):
+        artifact.updated_at = datetime.now(timezone.utc)
+
+
+class ArtifactTag(Base):
+    """Normalized copy of an artifact's tags, indexed for filtering and facets."""
+
+    __tablename__ = "artifact_tags"
+    __table_args__ = (
+        UniqueConstraint("artifact_id", "tag", name="uq_artifact_tags_artifact_tag"),
+        Index("ix_artifact_tags_space_tag", "space_id", "tag"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    artifact_id = Column(Integer, ForeignKey("artifacts.id"), nullable=False)
+    space_id = Column(Integer, ForeignKey("spaces.id"), nullable=False)
+    tag = Column(String(100), nullable=False)
+
+    artifact = relationship("Artifact", back_populates="tag_index")
+
+
+@event.listens_for(ArtifactTag, "before_insert")
+def _copy_tag_space(_mapper, _connection, row: ArtifactTag) -> None:
+    # The artifact row is inserted first, so its space_id is known here even
+    # when it came through ``space=`` or was assigned after ``tags``.
+    if row.artifact is not None:
+        row.space_id = row.artifact.space_id
+
+
+class ArtifactChunk(Base):
+    """Overlapping passage of an artifact's text; agents get passages, not documents."""
+
+    __tablename__ = "artifact_chunks"
+    __table_args__ = (
+        Index("ix_artifact_chunks_artifact_position", "artifact_id", "position"),
+        Index("ix_artifact_chunks_space", "space_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    artifact_id = Column(Integer, ForeignKey("artifacts.id"), nullable=False)
+    space_id = Column(Integer, ForeignKey("spaces.id"), nullable=False)
+    position = Column(Integer, nullable=False)
+    # Character offsets into the chunked text (content, then extracted file text).
+    start = Column(Integer, nullable=False)
+    end = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+
+    artifact = relationship("Artifact", back_populates="chunks")
+
+
+class ArtifactFingerprint(Base):
+    """One LSH band bucket of an artifact's MinHash signature."""
+
+    __tablename__ = "artifact_fingerprints"
+    __table_args__ = (
+        Index("ix_artifact_fingerprints_space_bucket", "space_id", "bucket"),
+        Index("ix_artifact_fingerprints_artifact", "artifact_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    artifact_id = Column(Integer, ForeignKey("artifacts.id"), nullable=False)
+    space_id = Column(Integer, ForeignKey("spaces.id"), nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+
+    space = relationship("Space", back_populates="fingerprints")
+
+
+class SpaceTerm(Base):
+    """Number of artifacts in a space that mention a term."""
+
+    __tablename__ = "space_terms"
+    __table_args__ = (
+        UniqueConstraint("space_id", "term", name="uq_space_terms_space_term"),
+        Index("ix_space_terms_space_frequency", "space_id", "document_frequency"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    space_id = Column(Integer, ForeignKey("spaces.id"), nullable=False)
+    term = Column(String(100), nullable=False)
+    document_frequency = Column(Integer, nullable=False, default=0)
+
+    space = relationship("Space", back_populates="terms")
+
+
+class UsageRollup(Base):
+    """Token and cost totals per day, space, agent, provider and model.
+
+    Updated in the same transaction as each new interaction, so spend can be
+    read without scanning ``interactions``. Ids are plain columns rather than
+    foreign keys: the ledger outlives deleted agents and spaces.
+    """
+
+    __tablename__ = "usage_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "day", "space_id", "agent_id", "provider", "model", name="uq_usage_rollups_key"
+        ),
+        Index("ix_usage_rollups_space_day", "space_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(String(10), nullable=False)  # YYYY-MM-DD, UTC
+    space_id = Column(Integer, nullable=False)
+    agent_id = Column(Integer, nullable=False)
+    provider = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    interactions = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+
+
+class Embedding(Base):
+    """Cached embedding vector, keyed by a hash of the model and the text.
+
+    Rows are shared by every text with the same content, so an artifact that
+    has not changed is never sent to the embedding provider again.
+    """
+
+    __tablename__ = "embeddings"
+
+    content_hash = Column(String(64), primary_key=True)
+    model = Column(String(150), nullable=False)
+    dimensions = Column(Integer, nullable=False)
+    # float32 values, packed with ``array("f").tobytes()``.
+    vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ArtifactConnection(Base):
+    """Undirected edge between two artifacts, stored with source id < target id."""
+
+    __tablename__ = "artifact_connections"
+    __table_args__ = (
+        UniqueConstraint(
+            "source_artifact_id",
+            "target_artifact_id",
+            "connection_type",
+            name="uq_artifact_connections_pair_type",
+        ),
+        Index("ix_artifact_connections_space", "space_id"),
+        Index("ix_artifact_connections_target", "target_artifact_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    space_id = Column(Integer, ForeignKey("spaces.id"), nullable=False)
+    source_artifact_id = Column(Integer, ForeignKey("artifacts.id"), nullable=False)
+    target_artifact_id = Column(Integer, ForeignKey("artifacts.id"), nullable=False)
+    connection_strength = Column(Float, nullable=False)
+    connection_type = Column(String(20), nullable=False, default="semantic")
+    discovered_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_reinforced = Column(DateTime(timezone=True), server_default=func.now())
+
+    space = relationship("Space", back_populates="connections")
+
+
+class Bloom(Base):
+    """Densely connected cluster of artifacts detected in a space's graph."""
+
+    __tablename__ = "blooms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    space_id = Column(Integer, ForeignKey("spaces.id"), nullable=False, index=True)
+    name = Column(String(150), nullable=False)
+    artifact_ids_json = Column("artifact_ids", Text, nullable=False, default="[]")
+    strength = Column(Float, nullable=False, default=0.0)
+    density = Column(Float, nullable=False, default=0.0)
+    bloom_type = Column(String(20), nullable=False, default="connection")
+    description = Column(Text, nullable=True)
+    first_detected = Column(DateTime(timezone=True), server_default=func.now())
+    last_active = Column(DateTime(timezone=True), server_default=func.now())
+
+    space = relationship("Space", back_populates="blooms")
+
+    @property
+    def artifact_ids(self) -> list[int]:
+        try:
+            return json.loads(self.artifact_ids_json or "[]")
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    @artifact_ids.setter
+    def artifact_ids(self, value: list[int]) -> None:
+        self.artifact_ids_json = json.dumps(sorted(value))
+
+
+class CrossSpaceBloom(Base):
+    """Artifacts in different spaces found to overlap by the cross-space scan."""
+
+    __tablename__ = "cross_space_blooms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    space_ids_json = Column("space_ids", Text, nullable=False, default="[]")
+    bridge_artifact_ids_json = Column("bridge_artifact_ids", Text, nullable=False, default="[]")
+    strength = Column(Float, nullable=False, default=0.0)
+    suggested_action = Column(String(20), nullable=False, default="link")
+    detected_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def space_ids(self) -> list[int]:
+        try:
+            return json.loads(self.space_ids_json or "[]")
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    @space_ids.setter
+    def space_ids(self, value: list[int]) -> None:
+        self.space_ids_json = json.dumps(sorted(value))
+
+    @property
+    def bridge_artifact_ids(self) -> list[int]:
+        try:
+            return json.loads(self.bridge_artifact_ids_json or "[]")
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    @bridge_artifact_ids.setter
+    def bridge_artifact_ids(self, value: list[int]) -> None:
+        self.bridge_artifact_ids_json = json.dumps(sorted(value))
 
 
 class Agent(Base):
@@ -71,6 +425,8 @@ class Agent(Base):
     system_prompt = Column(Text, nullable=True)
     model = Column(String(100), nullable=False)
     provider = Column(String(50), nullable=False, default="echo")
+    # Providers tried, in order, when ``provider`` fails or is slow ("name" or "name:model").
+    _fallback_providers = Column("fallback_providers", Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     space = relationship("Space", back_populates="agents")
@@ -78,9 +434,27 @@ class Agent(Base):
         "Interaction", back_populates="agent", cascade="all, delete-orphan"
     )
 
+    @property
+    def fallback_providers(self) -> list[str]:
+        if not self._fallback_providers:
+            return []
+        try:
+            return json.loads(self._fallback_providers)
+        except (json.JSONDecodeError, TypeError):
+            return []
+
+    @fallback_providers.setter
+    def fallback_providers(self, value: list[str] | None) -> None:
+        cleaned = [entry.strip() for entry in value or [] if entry and entry.strip()]
+        self._fallback_providers = json.dumps(cleaned) if cleaned else None
+
 
 class Interaction(Base):
     __tablename__ = "interactions"
+    __table_args__ = (
+        # Newest-first history pages per agent.
+        Index("ix_interactions_agent_id_id", "agent_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     agent_id = Column(Integer, ForeignKey("agents.id"), nullable=False)
@@ -91,6 +465,13 @@ class Interaction(Base):
     provider = Column(String(50), nullable=False)
     model = Column(String(100), nullable=False)
     context_json = Column(Text, nullable=True)
+    # "completed", or "cancelled" when the client went away mid-generation.
+    status = Column(String(20), nullable=False, default="completed", server_default="completed")
+    # Usage reported by the provider; see app/services/usage.py.
+    prompt_tokens = Column(Integer, nullable=False, default=0, server_default="0")
+    completion_tokens = Column(Integer, nullable=False, default=0, server_default="0")
+    cached_tokens = Column(Integer, nullable=False, default=0, server_default="0")
+    cost_usd = Column(Float, nullable=False, default=0.0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     agent = relationship("Agent", back_populates="interactions")
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+import math
+import random
 import re
 from collections import Counter
-from typing import Iterable, List, Tuple
+from functools import lru_cache
+from typing import Iterable, List, Mapping, Optional, Tuple
 
 STOPWORDS: set[str] = {
     "the",
@@ -47,6 +52,15 @@ STOPWORDS: set[str] = {
     "much",
 }
 
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+# Duplicate detection signs at most this many of a text's shingles.
+MINHASH_MAX_ELEMENTS = 256
+_MERSENNE_PRIME = (1 << 61) - 1
+
+TOKEN_PATTERN = re.compile(r"\b[a-zA-Z][a-zA-Z0-9\-]+\b")
+MAX_TERM_LENGTH = 100
+
 
 def summarize_text(text: str, max_sentences: int = 2, max_length: int = 320) -> str:
     """Return a lightweight summary by selecting the first sentences."""
@@ -62,10 +76,8 @@ def summarize_text(text: str, max_sentences: int = 2, max_length: int = 320) ->
     return summary
 
 
-def extract_keywords(
-    text: str, top_k: int = 5, extra_stopwords: Iterable[str] | None = None
-) -> List[str]:
-    """Very small keyword extractor based on frequency filtering."""
+def tokenize(text: str, extra_stopwords: Iterable[str] | None = None) -> List[str]:
+    """Return the lowercase keyword candidates of ``text`` in document order."""
     if not text:
         return []
 
@@ -73,10 +85,18 @@ def extract_keywords(
     if extra_stopwords:
         stopwords.update(word.lower() for word in extra_stopwords)
 
-    tokens = re.findall(r"\b[a-zA-Z][a-zA-Z0-9\-]+\b", text.lower())
-    candidates = [
-        token for token in tokens if len(token) > 3 and token not in stopwords
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if 3 < len(token) <= MAX_TERM_LENGTH and token not in stopwords
     ]
+
+
+def extract_keywords(
+    text: str, top_k: int = 5, extra_stopwords: Iterable[str] | None = None
+) -> List[str]:
+    """Very small keyword extractor based on frequency filtering."""
+    candidates = tokenize(text, extra_stopwords)
     if not candidates:
         return []
 
@@ -84,6 +104,29 @@ def extract_keywords(
     return [word for word, _ in counts.most_common(top_k)]
 
 
+def rank_keywords_tfidf(
+    term_counts: Mapping[str, int],
+    document_frequency: Mapping[str, int],
+    document_count: int,
+    top_k: int = 5,
+) -> List[str]:
+    """Rank terms by TF-IDF against a corpus described by its document frequencies.
+
+    Uses smoothed IDF, ``log((1 + N) / (1 + df)) + 1``, so terms that appear in
+    every document still score by frequency alone. Ties keep the order of
+    ``term_counts``.
+    """
+    scores = {
+        term: count
+        * (
+            math.log((1 + document_count) / (1 + document_frequency.get(term, 0)))
+            + 1
+        )
+        for term, count in term_counts.items()
+    }
+    return sorted(scores, key=scores.__getitem__, reverse=True)[:top_k]
+
+
 def build_summary_and_tags(
     title: str, content: str | None
 ) -> Tuple[str, List[str]]:
@@ -95,3 +138,83 @@ def build_summary_and_tags(
     summary = summarize_text(base_text)
     tags = extract_keywords(base_text, extra_stopwords=[word for word in title.lower().split()])
     return summary, tags
+
+
+def _stable_hash(data: bytes) -> int:
+    """Process-independent 63-bit hash (fits a signed SQLite INTEGER)."""
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big") >> 1
+
+
+@lru_cache(maxsize=8)
+def _permutations(num_perm: int, seed: int) -> Tuple[Tuple[int, int], ...]:
+    rng = random.Random(seed)
+    return tuple(
+        (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+        for _ in range(num_perm)
+    )
+
+
+def minhash_signature(
+    terms: Iterable[str],
+    num_perm: int = MINHASH_PERMUTATIONS,
+    seed: int = 1,
+    max_elements: Optional[int] = None,
+) -> List[int]:
+    """MinHash signature of a term set; equal slots estimate Jaccard similarity.
+
+    With ``max_elements``, larger sets are first reduced to their smallest
+    element hashes. That sample is consistent across sets, so near-identical
+    long texts keep near-identical signatures while signing cost stays
+    bounded. Returns an empty list for an empty set.
+    """
+    hashes = [_stable_hash(term.encode("utf-8")) for term in set(terms)]
+    if not hashes:
+        return []
+    if max_elements is not None and len(hashes) > max_elements:
+        hashes = heapq.nsmallest(max_elements, hashes)
+    return [
+        min((a * value + b) % _MERSENNE_PRIME for value in hashes)
+        for a, b in _permutations(num_perm, seed)
+    ]
+
+
+def lsh_band_keys(signature: List[int], bands: int = MINHASH_BANDS) -> List[int]:
+    """Hash each band of a signature; sets sharing any key are LSH candidates.
+
+    With ``b`` bands of ``r`` rows, pairs with Jaccard similarity ``s`` collide
+    in at least one band with probability ``1 - (1 - s**r)**b``.
+    """
+    if not signature:
+        return []
+    rows = len(signature) // bands
+    return [
+        _stable_hash(
+            band.to_bytes(2, "big")
+            + b"".join(value.to_bytes(8, "big") for value in signature[band * rows : (band + 1) * rows])
+        )
+        for band in range(bands)
+    ]
+
+
+def signature_similarity(first: List[int], second: List[int]) -> float:
+    """Share of equal MinHash slots, an estimate of the sets' Jaccard similarity."""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def word_shingles(text: str, size: int = 3) -> set[str]:
+    """Overlapping ``size``-word windows of lower-cased text.
+
+    Texts shorter than ``size`` words yield a single shingle of all words.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[index : index + size]) for index in range(len(words) - size + 1)}
+
+
+def jaccard(first: Iterable[str], second: Iterable[str]) -> float:
+    first, second = set(first), set(second)
+    union = first | second
+    return len(first & second) / len(union) if union else 0.0
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from . import metrics
+
+TEMPLATE_DIR = Path("app/templates")
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """On-disk cache of compiled templates, so a cold start skips the Jinja compiler.
+
+    ``TEMPLATE_CACHE_DIR`` picks the directory (Jinja's per-user temp directory
+    by default); ``off`` disables it.
+    """
+    directory = os.getenv("TEMPLATE_CACHE_DIR")
+    if directory == "off":
+        return None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory or None)
+
+
+templates = Jinja2Templates(directory=str(TEMPLATE_DIR))
+templates.env.bytecode_cache = _bytecode_cache()
+
+
+def warm_templates() -> None:
+    """Load every template up front, from the bytecode cache when it is fresh."""
+    for name in templates.env.list_templates(extensions=["html"]):
+        templates.env.get_template(name)
+
+
+class FragmentCache:
+    """LRU of rendered HTML fragments, bounded by entry count and total size.
+
+    Keys must change whenever the rendered row does (row id plus its update
+    timestamp), so entries are never invalidated explicitly; stale ones just
+    age out.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key: Hashable, html: str) -> None:
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = html
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> Tuple[int, int]:
+        """Entry count and total size (in characters) of the cached fragments."""
+        with self._lock:
+            return len(self._entries), self._size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+fragment_cache = FragmentCache(
+    max_entries=int(os.getenv("FRAGMENT_CACHE_ENTRIES", "4096")),
+    max_bytes=int(os.getenv("FRAGMENT_CACHE_BYTES", str(16 * 1024 * 1024))),
+)
+
+
+def render_fragment(template_name: str, key: Hashable, **context: Any) -> Markup:
+    """Render a partial template, reusing the cached HTML for the same ``key``."""
+    cache_key = (template_name, key)
+    html = fragment_cache.get(cache_key)
+    if html is not None:
+        metrics.fragment_cache_total.inc(template=template_name, outcome="hit")
+        return Markup(html)
+    metrics.fragment_cache_total.inc(template=template_name, outcome="miss")
+    started = time.perf_counter()
+    html = templates.env.get_template(template_name).render(**context)
+    metrics.template_render_seconds.observe(
+        time.perf_counter() - started, template=template_name
+    )
+    fragment_cache.put(cache_key, html)
+    return Markup(html)
+
+
+def artifact_card(artifact) -> Markup:
+    updated = artifact.updated_at or artifact.created_at
+    return render_fragment("_artifact_card.html", (artifact.id, updated), artifact=artifact)
+
+
+def interaction_block(interaction) -> Markup:
+    # Interactions are never edited, so the creation time is their version.
+    return render_fragment(
+        "_interaction.html", (interaction.id, interaction.created_at), interaction=interaction
+    )
+
+
+def interaction_context(interaction) -> Markup:
+    return render_fragment(
+        "_interaction_context.html",
+        (interaction.id, interaction.created_at),
+        interaction=interaction,
+    )
+
+
+templates.env.globals.update(artifact_card=artifact_card, interaction_block=interaction_block)
+
+
+def render_page(request: Request, template_name: str, context: dict, **kwargs: Any):
+    """``TemplateResponse`` that records how long the page took to render."""
+    started = time.perf_counter()
+    response = templates.TemplateResponse(request, template_name, context, **kwargs)
+    metrics.template_render_seconds.observe(
+        time.perf_counter() - started, template=template_name
+    )
+    return response
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -16,6 +16,15 @@ class ArtifactCreate(ArtifactBase):
     file_path: Optional[str] = None
 
 
+class PassageRead(BaseModel):
+    artifact_id: int
+    position: int
+    start: int
+    end: int
+    text: str
+    score: float
+
+
 class ArtifactUpdate(BaseModel):
     title: Optional[str] = Field(None, max_length=150)
     content: Optional[str] = None
@@ -28,16 +37,33 @@ class ArtifactRead(ArtifactBase):
     id: int
     space_id: int
     created_at: datetime
+    updated_at: Optional[datetime] = None
     file_path: Optional[str] = None
     summary: Optional[str] = None
     tags: list[str] = Field(default_factory=list)
+    last_accessed: Optional[datetime] = None
+    access_count: int = 0
+    temperature: Optional[float] = None
+    temperature_state: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class ArtifactCreated(ArtifactRead):
+    # Existing artifact the new one nearly duplicates, found while creating it.
+    duplicate_of: Optional[int] = None
+
+
 class SpaceBase(BaseModel):
     name: str = Field(..., max_length=100)
     description: Optional[str] = None
+    daily_token_budget: Optional[int] = Field(None, ge=0)
+    daily_cost_budget: Optional[float] = Field(None, ge=0)
+    budget_action: Literal["reject", "downgrade"] = Field(
+        default="reject",
+        description="What happens once a daily budget is used: reject with 429, "
+        "or downgrade to BUDGET_DOWNGRADE_PROVIDERS.",
+    )
 
 
 class SpaceCreate(SpaceBase):
@@ -47,15 +73,120 @@ class SpaceCreate(SpaceBase):
 class SpaceUpdate(BaseModel):
     name: Optional[str] = Field(None, max_length=100)
     description: Optional[str] = None
+    daily_token_budget: Optional[int] = Field(None, ge=0)
+    daily_cost_budget: Optional[float] = Field(None, ge=0)
+    # Omit to keep the current action; unlike the budgets it cannot be null.
+    budget_action: Literal["reject", "downgrade"] = None
 
 
 class SpaceRead(SpaceBase):
     id: int
     created_at: datetime
+    version: int = 0
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TopicRead(BaseModel):
+    term: str
+    document_frequency: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TagFacet(BaseModel):
+    tag: str
+    count: int
+
+
+class GraphNode(BaseModel):
+    id: int
+    title: str
+
+
+class GraphEdge(BaseModel):
+    source: int
+    target: int
+    strength: float
+    type: str
+
+
+class SpaceGraph(BaseModel):
+    nodes: list[GraphNode] = []
+    edges: list[GraphEdge] = []
+
+
+class BloomRead(BaseModel):
+    id: int
+    space_id: int
+    name: str
+    artifact_ids: list[int] = Field(default_factory=list)
+    strength: float
+    density: float
+    bloom_type: str
+    description: Optional[str] = None
+    first_detected: datetime
+    last_active: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CrossSpaceBloomRead(BaseModel):
+    id: int
+    space_ids: list[int] = Field(default_factory=list)
+    bridge_artifact_ids: list[int] = Field(default_factory=list)
+    strength: float
+    suggested_action: str
+    detected_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DuplicateGroup(BaseModel):
+    artifact_ids: list[int]
+    similarity: float
+
+
+class SpaceEntropy(BaseModel):
+    entropy_score: Optional[float] = None
+    fragmentation_index: Optional[float] = None
+    connection_density: Optional[float] = None
+    temporal_coherence: Optional[float] = None
+    entropy_last_calculated: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class UsageTotals(BaseModel):
+    interactions: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+class UsageRow(UsageTotals):
+    key: str
+
+
+class BudgetRead(BaseModel):
+    tokens_today: int
+    cost_today: float
+    daily_token_budget: Optional[int] = None
+    daily_cost_budget: Optional[float] = None
+    action: str
+    exceeded: bool
+
+
+class SpaceUsage(BaseModel):
+    space_id: int
+    since: str
+    group_by: str
+    totals: UsageTotals
+    budget: BudgetRead
+    rows: list[UsageRow] = []
+
+
 class SpaceDetail(SpaceRead):
     artifacts: list[ArtifactRead] = []
     agents: list["AgentRead"] = []
@@ -67,6 +198,10 @@ class AgentBase(BaseModel):
     description: Optional[str] = None
     provider: str = Field(default="echo", max_length=50)
     system_prompt: Optional[str] = None
+    fallback_providers: list[str] = Field(
+        default_factory=list,
+        description='Providers to fail over to, in order, as "name" or "name:model".',
+    )
 
 
 class AgentCreate(AgentBase):
@@ -79,6 +214,7 @@ class AgentUpdate(BaseModel):
     description: Optional[str] = None
     provider: Optional[str] = Field(None, max_length=50)
     system_prompt: Optional[str] = None
+    fallback_providers: Optional[list[str]] = None
 
 
 class AgentRead(AgentBase):
@@ -114,6 +250,11 @@ class InteractionRead(BaseModel):
     response: str
     provider: str
     model: str
+    status: str = "completed"
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cost_usd: float = 0.0
     context: dict[str, Any] = Field(default_factory=dict)
     created_at: datetime
 
@@ -1,12 +1,101 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+import asyncio
+import contextlib
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from .. import metrics
+from ..llm import CompletionRequest, CompletionResponse
+from ..llm.routing import (
+    Attempt,
+    RoutingError,
+    parse_chain_entry,
+    provider_router,
+    resolve_chain,
+)
+from ..models import Agent, Artifact, ArtifactChunk, Interaction, Space
+from ..nlp_utils import tokenize
+from ..schemas import AgentInteractionRequest
+from ..shared_state import RateLimited, RateLimiter
+from .chunking import update_chunks
+from .embeddings import search_passages
+from .singleflight import SingleFlight
+from .tags import rank_by_tags
+from .temperature import access_tracker
+from .usage import BudgetExceeded, budget_status, downgrade_chain, record_usage
+from .versions import space_versions
 
-from sqlalchemy.orm import Session
+T = TypeVar("T")
 
-from ..llm import CompletionRequest, registry
-from ..models import Agent, Artifact, Interaction, Space
-from ..schemas import AgentInteractionRequest
+# Passages of each context artifact handed to the model.
+CONTEXT_PASSAGES = int(os.getenv("CONTEXT_PASSAGES_PER_ARTIFACT", "2"))
+# Interactions per space and minute, counted across workers; 0 disables it.
+interaction_limiter = RateLimiter("interactions", int(os.getenv("INTERACTIONS_PER_MINUTE", "0")))
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the completion finished."""
+
+
+async def _wait_for_disconnect(receive: Callable[[], Awaitable[dict]]) -> None:
+    # The request body has been read, so the next ASGI message the server
+    # delivers is the disconnect (sent at the latest when the response ends).
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def cancel_on_disconnect(
+    receive: Callable[[], Awaitable[dict]], awaitable: Awaitable[T]
+) -> T:
+    """Await ``awaitable``, cancelling it if the client disconnects first.
+
+    ``receive`` is the request's ASGI receive channel. Cancelling the
+    completion also cancels its in-flight provider calls (see
+    ``ProviderRouter``). Raises ``ClientDisconnected`` in that case.
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if work.done():
+            return work.result()
+        work.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await work
+        raise ClientDisconnected()
+    finally:
+        work.cancel()
+        watcher.cancel()
+
+
+# Statuses a RoutingError maps provider failures to (see RoutingError.status_code).
+_PROVIDER_STATUSES = {429, 502, 503, 504}
+
+
+def error_status(exc: Exception) -> int:
+    """HTTP status for a failed interaction: a provider status from routing, else 400."""
+    status_code = getattr(exc, "status_code", None)
+    return status_code if status_code in _PROVIDER_STATUSES else 400
+
+
+def record_cancelled_interaction(db: Session, agent: Agent, prompt: str) -> Interaction:
+    """Store a prompt whose client left before the answer, with no response."""
+    interaction = Interaction(
+        agent_id=agent.id,
+        space_id=agent.space_id,
+        prompt=prompt,
+        response="",
+        provider=agent.provider,
+        model=agent.model,
+        status="cancelled",
+    )
+    db.add(interaction)
+    db.commit()
+    metrics.interactions_cancelled_total.inc(provider=agent.provider)
+    return interaction
 
 
 async def execute_agent_interaction(
@@ -21,18 +110,22 @@ async def execute_agent_interaction(
         "artifact context is insufficient."
     )
 
-    provider_cls = registry.get(agent.provider)
-    if provider_cls is None:
-        raise RuntimeError(f"Provider '{agent.provider}' is not available")
-
-    try:
-        provider = provider_cls(model=agent.model)
-    except TypeError:
-        provider = provider_cls()
-    except RuntimeError as exc:
-        raise RuntimeError(str(exc)) from exc
-
-    context_artifacts = _build_context(agent, payload.context_limit, db)
+    if not interaction_limiter.hit(agent.space_id):
+        raise RateLimited(
+            f"Space '{agent.space.name}' is limited to {interaction_limiter.limit} interactions a minute"
+        )
+    chain = _provider_chain(agent)
+    budget = budget_status(db, agent.space)
+    if budget.exceeded:
+        metrics.budget_exceeded_total.inc(action=budget.action)
+        if budget.action != "downgrade":
+            raise BudgetExceeded(f"Space '{agent.space.name}' has used its daily budget")
+        chain = _downgraded_chain()
+
+    context_artifacts = await _build_context(agent, payload.context_limit, db, payload.prompt)
+    # Context building may chunk artifacts and cache vectors. Commit them now
+    # so the SQLite write lock is not held while the completion is awaited.
+    db.commit()
     context_strings = [
         formatted
         for item in context_artifacts
@@ -40,7 +133,6 @@ async def execute_agent_interaction(
     ]
 
     history_items = _build_history(agent, db)
-    history_strings = [_format_history_item(item) for item in history_items]
 
     system_prompt = (
         payload.system
@@ -48,14 +140,22 @@ async def execute_agent_interaction(
         else agent.system_prompt or default_system_prompt
     )
 
+    # Static system prompt, space context, then turns oldest first: the
+    # layout of every provider (app.llm.prompting), so consecutive turns
+    # share a cacheable prefix.
     request = CompletionRequest(
         prompt=payload.prompt,
         system=system_prompt,
-        context=[*history_strings, *context_strings],
+        context=context_strings,
+        history=[(item.prompt, item.response) for item in reversed(history_items)],
         options={"model": agent.model},
+        conversation=f"agent-{agent.id}",
     )
 
-    completion = await provider.generate(request)
+    completion = await _generate(chain, request)
+    metadata = dict(completion.metadata)
+    if budget.exceeded:
+        metadata["budget"] = budget.as_dict()
     history_payload = [
         {
             "prompt": item.prompt,
@@ -64,35 +164,157 @@ async def execute_agent_interaction(
         }
         for item in history_items
     ]
-    return completion.output, dict(completion.metadata), context_artifacts, history_payload, system_prompt
+    return completion.output, metadata, context_artifacts, history_payload, system_prompt
+
+
+def _provider_chain(agent: Agent) -> List[Tuple[str, Optional[str]]]:
+    chain = resolve_chain(agent.provider, agent.model, agent.fallback_providers)
+    if not chain:
+        raise RuntimeError(f"Provider '{agent.provider}' is not available")
+    return chain
+
+
+def _downgraded_chain() -> List[Tuple[str, Optional[str]]]:
+    entries = downgrade_chain()
+    if entries:
+        name, model = parse_chain_entry(entries[0])
+        chain = resolve_chain(name, model, entries[1:])
+        if chain:
+            return chain
+    raise BudgetExceeded("Daily budget used and no downgrade provider is available")
+
 
+def served_by(metadata: dict, agent: Agent) -> Tuple[str, str]:
+    """Provider and model that produced a completion, which may be a fallback."""
+    routing = metadata.get("routing") or {}
+    return routing.get("provider") or agent.provider, routing.get("model") or agent.model
 
-def _build_context(agent: Agent, limit: int, db: Session) -> List[dict]:
+
+async def _generate(
+    chain: List[Tuple[str, Optional[str]]], request: CompletionRequest
+) -> CompletionResponse:
+    """Run ``request`` over the agent's provider chain; see ``ProviderRouter``.
+
+    The winning provider and every attempt are reported under
+    ``metadata["routing"]``.
+    """
+    try:
+        routed = await provider_router.generate(chain, request)
+    except RoutingError as exc:
+        _observe_attempts(exc.attempts)
+        raise
+    _observe_attempts(routed.attempts)
+    metrics.observe_usage(routed.provider, routed.model or "", routed.response.metadata)
+    metadata = dict(routed.response.metadata)
+    metadata["routing"] = {
+        "provider": routed.provider,
+        "model": routed.model,
+        "attempts": [
+            {
+                "provider": attempt.provider,
+                "model": attempt.model,
+                "outcome": attempt.outcome,
+                "seconds": round(attempt.seconds, 4),
+                "hedge": attempt.hedge,
+            }
+            for attempt in routed.attempts
+        ],
+    }
+    return CompletionResponse(output=routed.response.output, metadata=metadata)
+
+
+def _observe_attempts(attempts: List[Attempt]) -> None:
+    for attempt in attempts:
+        if attempt.outcome != "skipped":
+            metrics.provider_call_seconds.observe(
+                attempt.seconds,
+                provider=attempt.provider,
+                model=attempt.model or "",
+                outcome=attempt.outcome,
+            )
+
+
+async def _build_context(
+    agent: Agent, limit: int, db: Session, prompt: str | None = None
+) -> List[dict]:
+    """Pick artifacts for the prompt: tag matches first, then the most recent.
+
+    Each artifact brings its passages closest to the prompt rather than its
+    whole text.
+    """
     if not limit:
         return []
 
-    artifacts = (
-        db.query(Artifact)
-        .filter(Artifact.space_id == agent.space_id)
-        .order_by(Artifact.created_at.desc())
-        .limit(limit)
-        .all()
-    )
+    matches = rank_by_tags(db, agent.space_id, tokenize(prompt or ""), limit)
+    matched_ids = [artifact_id for artifact_id, _ in matches]
+    artifacts_by_id = {}
+    if matched_ids:
+        artifacts_by_id = {
+            artifact.id: artifact
+            for artifact in db.query(Artifact).filter(Artifact.id.in_(matched_ids))
+        }
+    artifacts = [artifacts_by_id[i] for i in matched_ids if i in artifacts_by_id]
+
+    if len(artifacts) < limit:
+        recent = db.query(Artifact).filter(Artifact.space_id == agent.space_id)
+        if matched_ids:
+            recent = recent.filter(Artifact.id.notin_(matched_ids))
+        artifacts.extend(
+            recent.order_by(Artifact.created_at.desc())
+            .limit(limit - len(artifacts))
+            .all()
+        )
 
+    access_tracker.touch(db, [artifact.id for artifact in artifacts])
+    passages = await _best_passages(db, prompt or "", artifacts)
     context = []
     for artifact in artifacts:
+        chosen = passages.get(artifact.id, [])
         context.append(
             {
                 "title": artifact.title,
                 "summary": artifact.summary
-                or (artifact.content[:160] + "…" if artifact.content else ""),
+                or (artifact.content[:160] + "…" if artifact.content and not chosen else ""),
                 "tags": artifact.tags,
+                "passages": chosen,
                 "artifact_id": artifact.id,
             }
         )
     return context
 
 
+async def _best_passages(
+    db: Session, prompt: str, artifacts: List[Artifact]
+) -> Dict[int, List[str]]:
+    """Up to ``CONTEXT_PASSAGES`` passages per artifact, in document order."""
+    if not artifacts or CONTEXT_PASSAGES <= 0:
+        return {}
+    ids = [artifact.id for artifact in artifacts]
+    chunked = {
+        artifact_id
+        for (artifact_id,) in db.query(ArtifactChunk.artifact_id)
+        .filter(ArtifactChunk.artifact_id.in_(ids))
+        .distinct()
+    }
+    # Artifacts stored before chunking existed are split on first use.
+    unchunked = [artifact for artifact in artifacts if artifact.id not in chunked]
+    for artifact in unchunked:
+        update_chunks(artifact, db)
+    if unchunked:
+        db.flush()
+    ranked = await search_passages(
+        db,
+        prompt,
+        artifact_ids=ids,
+        limit=len(ids) * CONTEXT_PASSAGES,
+        per_artifact=CONTEXT_PASSAGES,
+    )
+    passages: Dict[int, List[str]] = {}
+    for chunk, _ in sorted(ranked, key=lambda item: (item[0].artifact_id, item[0].position)):
+        passages.setdefault(chunk.artifact_id, []).append(chunk.text)
+    return passages
+
+
 def _format_context_item(item: dict) -> str:
     parts = []
     if item.get("title"):
@@ -101,38 +323,71 @@ def _format_context_item(item: dict) -> str:
         parts.append(f"Summary: {item['summary']}")
     if item.get("tags"):
         parts.append("Tags: " + ", ".join(item["tags"]))
+    for passage in item.get("passages") or ():
+        parts.append(f"Passage: {passage}")
     return "\n".join(parts)
 
 
 def _build_history(agent: Agent, db: Session, limit: int = 10) -> List[Interaction]:
     return (
         db.query(Interaction)
-        .filter(Interaction.agent_id == agent.id)
-        .order_by(Interaction.created_at.desc())
+        .filter(Interaction.agent_id == agent.id, Interaction.status == "completed")
+        # Ids follow insertion order; created_at ties within a second.
+        .order_by(Interaction.id.desc())
         .limit(limit)
         .all()
     )
 
 
-def _format_history_item(interaction: Interaction) -> str:
-    parts = [
-        f"Previous prompt: {interaction.prompt}",
-        f"Previous response: {interaction.response}",
-    ]
-    return "\n".join(parts)
+summaries: SingleFlight[str] = SingleFlight("summarize_space")
 
 
 async def summarize_space_state(agent: Agent, db: Session) -> str:
-    provider_cls = registry.get(agent.provider)
-    if provider_cls is None:
-        raise RuntimeError(f"Provider '{agent.provider}' is not available")
-
+    """Summarize a space, sharing one LLM call among concurrent identical requests.
+
+    Results are keyed by the space's collection versions, so a summary is
+    reused until an artifact, agent or interaction of the space changes
+    (saving the summary itself on the space does not invalidate it). The
+    shared task outlives the request that started it, so it reads the space
+    through its own session rather than the caller's. Summaries obey the
+    space's daily budget and are added to its usage ledger like interactions.
+    """
+    versions = space_versions(db, agent.space_id)
+    key = (agent.space_id, agent.id, versions[1:] if versions else None)
+    bind, agent_id = db.get_bind(), agent.id
+    return await summaries.do(key, lambda: _summarize_space(bind, agent_id))
+
+
+async def _summarize_space(bind, agent_id: int) -> str:
+    open_session = sessionmaker(bind=bind, autoflush=False, future=True)
+    session = open_session()
     try:
-        provider = provider_cls(model=agent.model)
-    except TypeError:
-        provider = provider_cls()
-    except RuntimeError as exc:
-        raise RuntimeError(str(exc)) from exc
+        agent = session.get(Agent, agent_id)
+        if agent is None:
+            raise RuntimeError("Agent not found")
+        chain = _provider_chain(agent)
+        budget = budget_status(session, agent.space)
+        if budget.exceeded:
+            metrics.budget_exceeded_total.inc(action=budget.action)
+            if budget.action != "downgrade":
+                raise BudgetExceeded(f"Space '{agent.space.name}' has used its daily budget")
+            chain = _downgraded_chain()
+        request = _summary_request(agent, session)
+    finally:
+        session.close()
+
+    completion = await _generate(chain, request)
+    provider, model = served_by(dict(completion.metadata), agent)
+    session = open_session()
+    try:
+        record_usage(session, agent.space_id, agent_id, provider, model, completion.metadata)
+        session.commit()
+    finally:
+        session.close()
+    return completion.output
+
+
+def _summary_request(agent: Agent, db: Session) -> CompletionRequest:
 
     artifacts = (
         db.query(Artifact)
@@ -150,7 +405,7 @@ async def summarize_space_state(agent: Agent, db: Session) -> str:
 
     interactions = (
         db.query(Interaction)
-        .filter(Interaction.space_id == agent.space_id)
+        .filter(Interaction.space_id == agent.space_id, Interaction.status == "completed")
         .order_by(Interaction.created_at.desc())
         .limit(5)
         .all()
@@ -178,12 +433,9 @@ async def summarize_space_state(agent: Agent, db: Session) -> str:
         + ("\n\n".join(history_lines) if history_lines else "(no recent exchanges)")
     )
 
-    request = CompletionRequest(
+    return CompletionRequest(
         prompt=prompt,
         system=summary_prompt,
         context=[],
         options={"model": agent.model},
     )
-
-    completion = await provider.generate(request)
-    return completion.output
@@ -0,0 +1,458 @@
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import os
+import queue
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..models import ArtifactConnection, ArtifactTag, Bloom, Space
+from ..shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+BLOOM_MIN_SIZE = 5
+BLOOM_MIN_DENSITY = 0.7
+BLOOM_MATCH_OVERLAP = 0.5
+# Spaces whose edge graph is kept in memory, least recently used evicted first.
+BLOOM_CACHED_SPACES = 64
+# Shared job queue of detection passes when several workers run.
+BLOOM_QUEUE = "bloom-detection"
+
+
+@dataclass
+class Community:
+    """Evaluation of the neighbourhood around one changed node."""
+
+    seed: int
+    members: Set[int]
+    bloom: Optional[Set[int]] = None
+    density: float = 0.0
+    strength: float = 0.0
+
+
+class CommunityIndex:
+    """Weighted graph of a space's semantic edges, updated edge by edge.
+
+    Nodes touched by a change are marked dirty. Dense communities are found
+    around dirty nodes only, by greedily peeling the lowest-degree node of
+    the node's neighbourhood until the remainder reaches ``min_density``.
+    """
+
+    def __init__(
+        self, min_size: int = BLOOM_MIN_SIZE, min_density: float = BLOOM_MIN_DENSITY
+    ) -> None:
+        self.min_size = min_size
+        self.min_density = min_density
+        self.adjacency: Dict[int, Dict[int, float]] = {}
+        self._dirty: Set[int] = set()
+        # Shared edge generation of the space this index reflects.
+        self.generation = 0
+
+    def add_edge(self, a: int, b: int, weight: float) -> None:
+        if a == b:
+            return
+        self.adjacency.setdefault(a, {})[b] = weight
+        self.adjacency.setdefault(b, {})[a] = weight
+        self._dirty.update((a, b))
+
+    def remove_edge(self, a: int, b: int) -> None:
+        if b not in self.adjacency.get(a, {}):
+            return
+        del self.adjacency[a][b]
+        del self.adjacency[b][a]
+        self._dirty.update((a, b))
+
+    def remove_node(self, node: int) -> None:
+        for other in list(self.adjacency.get(node, {})):
+            self.remove_edge(node, other)
+        self.adjacency.pop(node, None)
+        self._dirty.discard(node)
+
+    def evaluate_dirty(self) -> List[Community]:
+        """Re-evaluate the neighbourhoods of nodes touched since the previous call.
+
+        A seed already covered by a bloom found in this pass is skipped, so a
+        burst of changes inside one dense community is evaluated once.
+        """
+        dirty = sorted(node for node in self._dirty if node in self.adjacency)
+        self._dirty.clear()
+        covered: Set[int] = set()
+        communities = []
+        for seed in dirty:
+            if seed in covered:
+                continue
+            community = self._evaluate(seed)
+            if community.bloom is not None:
+                covered |= community.bloom
+            communities.append(community)
+        return communities
+
+    def _evaluate(self, seed: int) -> Community:
+        neighbours = self.adjacency.get(seed, {})
+        members = {seed, *neighbours}
+        community = Community(seed=seed, members=members)
+        if len(members) < self.min_size:
+            return community
+
+        degree = {
+            node: sum(1 for other in self.adjacency.get(node, ()) if other in members)
+            for node in members
+        }
+        edge_count = sum(degree.values()) // 2
+        alive = set(members)
+        heap = [(count, node) for node, count in degree.items()]
+        heapq.heapify(heap)
+
+        def density() -> float:
+            size = len(alive)
+            return 2 * edge_count / (size * (size - 1)) if size > 1 else 0.0
+
+        while len(alive) >= self.min_size and density() < self.min_density:
+            count, node = heapq.heappop(heap)
+            if node not in alive or count != degree[node]:
+                continue
+            alive.discard(node)
+            edge_count -= degree[node]
+            for neighbour in self.adjacency.get(node, ()):
+                if neighbour in alive:
+                    degree[neighbour] -= 1
+                    heapq.heappush(heap, (degree[neighbour], neighbour))
+
+        if len(alive) < self.min_size:
+            return community
+
+        weights = [
+            weight
+            for node in alive
+            for other, weight in self.adjacency.get(node, {}).items()
+            if other in alive and node < other
+        ]
+        community.bloom = alive
+        community.density = density()
+        community.strength = (
+            community.density * sum(weights) / len(weights) if weights else 0.0
+        )
+        return community
+
+
+@dataclass
+class EdgeChanges:
+    upserts: List[Tuple[int, int, float]] = field(default_factory=list)
+    removals: List[Tuple[int, int]] = field(default_factory=list)
+    removed_nodes: List[int] = field(default_factory=list)
+    # The space's shared edge generation before and after these changes;
+    # ``since`` is None when merged changes skip a generation.
+    since: Optional[int] = None
+    generation: Optional[int] = None
+
+    def merge(self, later: "EdgeChanges") -> None:
+        self.upserts.extend(later.upserts)
+        self.removals.extend(later.removals)
+        self.removed_nodes.extend(later.removed_nodes)
+        if self.generation is not None and later.since != self.generation:
+            self.since = None
+        self.generation = later.generation
+
+
+def record_edge_changes(
+    db: Session,
+    space_id: int,
+    upserts: Iterable[Tuple[int, int, float]] = (),
+    removals: Iterable[Tuple[int, int]] = (),
+    removed_nodes: Iterable[int] = (),
+) -> None:
+    """Queue semantic edge changes for bloom detection once ``db`` commits."""
+    pending: Dict[int, EdgeChanges] = db.info.setdefault("bloom_edge_changes", {})
+    changes = pending.setdefault(space_id, EdgeChanges())
+    changes.upserts.extend(upserts)
+    changes.removals.extend(removals)
+    changes.removed_nodes.extend(removed_nodes)
+
+
+@event.listens_for(Session, "after_commit")
+def _schedule_committed_changes(session: Session) -> None:
+    pending = session.info.pop("bloom_edge_changes", None)
+    if pending:
+        bind = session.get_bind()
+        state = shared_state()
+        for space_id, changes in pending.items():
+            changes.generation = state.bump(f"blooms:{space_id}")
+            changes.since = changes.generation - 1
+            bloom_worker.submit(bind, space_id, changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_changes(session: Session) -> None:
+    session.info.pop("bloom_edge_changes", None)
+    session.info.pop("bloom_deleted_spaces", None)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deleted_spaces(session: Session, _flush_context) -> None:
+    deleted = {instance.id for instance in session.deleted if isinstance(instance, Space)}
+    if deleted:
+        session.info.setdefault("bloom_deleted_spaces", set()).update(deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_deleted_spaces(session: Session) -> None:
+    for space_id in session.info.pop("bloom_deleted_spaces", ()):
+        bloom_detector.forget(space_id)
+
+
+class BloomDetector:
+    """Keeps a :class:`CommunityIndex` per space and persists ``Bloom`` rows.
+
+    At most ``max_spaces`` indexes are cached; the least recently used one
+    is dropped first and reloaded from the database when needed again.
+    """
+
+    def __init__(self, max_spaces: int = BLOOM_CACHED_SPACES) -> None:
+        self.max_spaces = max_spaces
+        self._indexes: "OrderedDict[Tuple[int, int], CommunityIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+    def forget(self, space_id: int) -> None:
+        """Drop the cached indexes of a deleted space."""
+        with self._lock:
+            for key in [key for key in self._indexes if key[1] == space_id]:
+                del self._indexes[key]
+
+    def _index(
+        self, db: Session, space_id: int, changes: EdgeChanges
+    ) -> Tuple[CommunityIndex, bool]:
+        """The space's index and whether it already reflects ``changes``.
+
+        A cached index is reused when its generation is the one ``changes``
+        start from. Otherwise another worker changed the space in between,
+        and the index is reloaded from the database.
+        """
+        key = (id(db.get_bind()), space_id)
+        index = self._indexes.get(key)
+        if index is not None and changes.generation is not None:
+            if index.generation >= changes.generation:
+                self._indexes.move_to_end(key)
+                return index, True
+            if index.generation != changes.since:
+                index = None
+        if index is not None:
+            self._indexes.move_to_end(key)
+            return index, False
+        generation = shared_state().generation(f"blooms:{space_id}")
+        index = CommunityIndex()
+        index.generation = generation
+        for source, target, strength in db.query(
+            ArtifactConnection.source_artifact_id,
+            ArtifactConnection.target_artifact_id,
+            ArtifactConnection.connection_strength,
+        ).filter(
+            ArtifactConnection.space_id == space_id,
+            ArtifactConnection.connection_type == "semantic",
+        ):
+            index.add_edge(source, target, strength)
+        self._indexes[key] = index
+        while len(self._indexes) > self.max_spaces:
+            self._indexes.popitem(last=False)
+        return index, True
+
+    def process(self, db: Session, space_id: int, changes: EdgeChanges) -> None:
+        with self._lock:
+            index, current = self._index(db, space_id, changes)
+            if not current:
+                # A freshly loaded index already reflects the committed changes.
+                for node in changes.removed_nodes:
+                    index.remove_node(node)
+                for a, b in changes.removals:
+                    index.remove_edge(a, b)
+                for a, b, weight in changes.upserts:
+                    index.add_edge(a, b, weight)
+            if changes.generation is not None:
+                index.generation = max(index.generation, changes.generation)
+            communities = index.evaluate_dirty()
+        self._persist(db, space_id, communities, changes.removed_nodes)
+
+    def _persist(
+        self,
+        db: Session,
+        space_id: int,
+        communities: List[Community],
+        removed_nodes: Iterable[int],
+    ) -> None:
+        touched = set(removed_nodes)
+        for community in communities:
+            touched.add(community.seed)
+            touched |= community.bloom or set()
+        if not touched:
+            return
+
+        now = datetime.now(timezone.utc)
+        existing = [
+            bloom
+            for bloom in db.query(Bloom).filter(Bloom.space_id == space_id)
+            if touched.intersection(bloom.artifact_ids)
+        ]
+        seen: Set[frozenset] = set()
+        for community in communities:
+            if community.bloom is None or frozenset(community.bloom) in seen:
+                continue
+            seen.add(frozenset(community.bloom))
+            match = _best_match(existing, community.bloom)
+            if match is None:
+                match = Bloom(space_id=space_id, first_detected=now)
+                db.add(match)
+            else:
+                existing.remove(match)
+            match.artifact_ids = list(community.bloom)
+            match.name = _bloom_name(db, community.bloom)
+            match.density = round(community.density, 4)
+            match.strength = round(community.strength, 4)
+            match.last_active = now
+        for stale in existing:
+            db.delete(stale)
+        db.commit()
+
+
+def _best_match(blooms: List[Bloom], members: Set[int]) -> Optional[Bloom]:
+    best, best_overlap = None, 0.0
+    for bloom in blooms:
+        ids = set(bloom.artifact_ids)
+        overlap = len(ids & members) / len(ids | members) if ids | members else 0.0
+        if overlap > best_overlap:
+            best, best_overlap = bloom, overlap
+    return best if best_overlap >= BLOOM_MATCH_OVERLAP else None
+
+
+def _bloom_name(db: Session, members: Set[int]) -> str:
+    counts = Counter(
+        tag
+        for (tag,) in db.query(ArtifactTag.tag).filter(
+            ArtifactTag.artifact_id.in_(sorted(members))
+        )
+    )
+    top = [tag for tag, _ in counts.most_common(3)]
+    return "Bloom: " + ", ".join(top) if top else f"Bloom of {len(members)} artifacts"
+
+
+class BloomWorker:
+    """Background thread running bloom detection after committed edge changes.
+
+    Changes for the same space are merged while they wait, so a burst of
+    writes triggers one detection pass. ``BLOOM_DETECTION`` selects
+    ``background`` (default), ``inline`` (run in the committing thread) or
+    ``off``.
+
+    With a shared state backend (several workers), passes go through its
+    ``BLOOM_QUEUE`` instead. Each pass runs once, in whichever worker pops
+    it, under a per-space lock. Passes left by a worker that stopped are
+    picked up by the next one that drains the queue.
+    """
+
+    def __init__(self, detector: BloomDetector) -> None:
+        self.detector = detector
+        self.mode = os.getenv("BLOOM_DETECTION", "background").lower()
+        self._queue: "queue.Queue[Optional[Tuple[int, int]]]" = queue.Queue()
+        self._pending: Dict[Tuple[int, int], Tuple[object, EdgeChanges]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._shared_bind = None
+
+    def _ensure_thread(self) -> None:
+        # Called with ``self._lock`` held.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="bloom-detector", daemon=True)
+            self._thread.start()
+
+    def submit(self, bind, space_id: int, changes: EdgeChanges) -> None:
+        if self.mode == "off":
+            return
+        if self.mode == "inline":
+            self._run(bind, space_id, changes)
+            return
+
+        state = shared_state()
+        if state.shared:
+            state.push(BLOOM_QUEUE, json.dumps({"space_id": space_id, **asdict(changes)}))
+            self.resume(bind)
+            return
+
+        key = (id(bind), space_id)
+        with self._lock:
+            queued = self._pending.get(key)
+            if queued is not None:
+                queued[1].merge(changes)
+                return
+            self._pending[key] = (bind, changes)
+            self._ensure_thread()
+        self._queue.put(key)
+
+    def resume(self, bind) -> None:
+        """Drain the shared queue on ``bind``, including passes left by other workers."""
+        if self.mode != "background" or not shared_state().shared:
+            return
+        with self._lock:
+            self._shared_bind = bind
+            self._ensure_thread()
+        self._queue.put(_SHARED_QUEUE)
+
+    def _loop(self) -> None:
+        while True:
+            key = self._queue.get()
+            try:
+                if key is None:
+                    return
+                if key == _SHARED_QUEUE:
+                    self._drain_shared()
+                    continue
+                with self._lock:
+                    bind, changes = self._pending.pop(key)
+                self._run(bind, key[1], changes)
+            finally:
+                self._queue.task_done()
+
+    def _drain_shared(self) -> None:
+        state = shared_state()
+        while (payload := state.pop(BLOOM_QUEUE)) is not None:
+            job = json.loads(payload)
+            space_id = job.pop("space_id")
+            with state.lock(f"blooms:{space_id}", ttl=300):
+                self._run(self._shared_bind, space_id, EdgeChanges(**job))
+
+    def _run(self, bind, space_id: int, changes: EdgeChanges) -> None:
+        session = sessionmaker(bind=bind, autoflush=False, future=True)()
+        try:
+            self.detector.process(session, space_id, changes)
+        except Exception:  # pragma: no cover - keep the worker alive
+            session.rollback()
+            logger.exception("Bloom detection failed for space %s", space_id)
+        finally:
+            session.close()
+
+    def drain(self) -> None:
+        """Block until every queued detection pass has finished."""
+        self._queue.join()
+
+    def stop(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        self._thread = None
+
+
+# Local queue key asking the thread to drain the shared queue.
+_SHARED_QUEUE = (-1, -1)
+
+bloom_detector = BloomDetector()
+bloom_worker = BloomWorker(bloom_detector)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+from typing import List, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models import Artifact, ArtifactChunk
+from ..storage import extract_text
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE_CHARS", "800"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP_CHARS", "150"))
+
+# Preferred places to end a passage, best first.
+_BREAKS = ("\n\n", "\n", ". ", "? ", "! ", "; ", ", ", " ")
+
+
+def _break_before(text: str, low: int, high: int) -> int:
+    """End offset for a passage cut between ``low`` and ``high``."""
+    for mark in _BREAKS:
+        found = text.rfind(mark, low, high)
+        if found != -1:
+            return found + len(mark)
+    return high
+
+
+def _word_start(text: str, position: int, limit: int) -> int:
+    """First word start at or after ``position``, or ``position`` if none before ``limit``."""
+    index = position
+    if index > 0 and not text[index - 1].isspace():
+        while index < limit and not text[index].isspace():
+            index += 1
+    while index < limit and text[index].isspace():
+        index += 1
+    return index if index < limit else position
+
+
+def split_passages(
+    text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP
+) -> List[Tuple[int, int, str]]:
+    """``(start, end, passage)`` windows of at most ``size`` characters.
+
+    Passages end at a paragraph, sentence or word boundary when one falls in
+    the second half of the window, and each one repeats the last ``overlap``
+    characters of the previous one (from a word start), so a sentence cut at
+    a boundary is still whole in one of them.
+    """
+    passages: List[Tuple[int, int, str]] = []
+    length = len(text)
+    start = _word_start(text, 0, length)
+    while start < length:
+        end = min(length, start + size)
+        if end < length:
+            end = _break_before(text, start + size // 2, end)
+        trimmed = end
+        while trimmed > start and text[trimmed - 1].isspace():
+            trimmed -= 1
+        if trimmed > start:
+            passages.append((start, trimmed, text[start:trimmed]))
+        if end >= length:
+            break
+        start = max(_word_start(text, max(end - overlap, start + 1), end), start + 1)
+    return passages
+
+
+def chunk_source(artifact: Artifact) -> str:
+    """Text that is chunked: the artifact's content, then its uploaded file's text."""
+    parts = [artifact.content, extract_text(artifact.file_path, artifact.mime_type)]
+    return "\n\n".join(part.strip() for part in parts if part and part.strip())
+
+
+def update_chunks(artifact: Artifact, db: Session) -> bool:
+    """Re-split ``artifact`` into ``artifact_chunks`` rows; ``False`` if nothing changed."""
+    passages = split_passages(chunk_source(artifact))
+    current = [(chunk.start, chunk.end, chunk.text) for chunk in artifact.chunks]
+    if current == passages:
+        return False
+    artifact.chunks = [
+        ArtifactChunk(space_id=artifact.space_id, position=position, start=start, end=end, text=text)
+        for position, (start, end, text) in enumerate(passages)
+    ]
+    return True
@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import heapq
+import json
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, event, insert, or_, update
+from sqlalchemy.orm import Session
+
+from ..models import Artifact, ArtifactConnection, Space, SpaceTerm
+from ..shared_state import shared_state
+from .blooms import record_edge_changes
+
+SEMANTIC_TOP_K = 5
+SEMANTIC_THRESHOLD = 0.2
+TEMPORAL_TOP_K = 3
+TEMPORAL_WINDOW = timedelta(minutes=30)
+MAX_CACHED_SPACES = 64
+
+
+class SimilarityIndex:
+    """Cosine-similarity index over sparse vectors with per-term postings.
+
+    A query only visits the postings of its own terms, so finding one
+    artifact's neighbours costs the size of those postings instead of a
+    comparison against every artifact in the space.
+
+    A cached index is shared by the threadpool's requests, so every read and
+    write holds the index's lock.
+    """
+
+    def __init__(self, generation: int = 0) -> None:
+        self._vectors: Dict[int, Dict[str, float]] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._lock = threading.RLock()
+        # Shared generation of the space's edges this index reflects.
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._vectors
+
+    def upsert(self, key: int, vector: Mapping[str, float]) -> None:
+        normalized = _normalize(vector)
+        with self._lock:
+            self.remove(key)
+            self._vectors[key] = normalized
+            for term, weight in normalized.items():
+                self._postings.setdefault(term, {})[key] = weight
+
+    def remove(self, key: int) -> None:
+        with self._lock:
+            vector = self._vectors.pop(key, None)
+            if vector is None:
+                return
+            for term in vector:
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                posting.pop(key, None)
+                if not posting:
+                    del self._postings[term]
+
+    def query(
+        self,
+        vector: Mapping[str, float],
+        top_k: int,
+        threshold: float = 0.0,
+        exclude: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return up to ``top_k`` ``(key, cosine)`` pairs scoring at least ``threshold``."""
+        scores: Dict[int, float] = {}
+        normalized = _normalize(vector)
+        with self._lock:
+            for term, weight in normalized.items():
+                for key, other in self._postings.get(term, {}).items():
+                    scores[key] = scores.get(key, 0.0) + weight * other
+        scores.pop(exclude, None)
+        best = heapq.nlargest(
+            top_k,
+            ((score, key) for key, score in scores.items() if score >= threshold),
+        )
+        return [(key, min(score, 1.0)) for score, key in best]
+
+
+def _normalize(vector: Mapping[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {term: weight / norm for term, weight in vector.items() if weight}
+
+
+def term_vector(
+    terms: Iterable[str], frequencies: Mapping[str, int], document_count: int
+) -> Dict[str, float]:
+    """IDF-weighted binary term vector, matching the tag TF-IDF smoothing."""
+    return {
+        term: math.log((1 + document_count) / (1 + frequencies.get(term, 0))) + 1
+        for term in terms
+    }
+
+
+_indexes: "OrderedDict[int, SimilarityIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _space_index(
+    db: Session, space_id: int, pending_id: Optional[int] = None
+) -> SimilarityIndex:
+    """Return the cached index for a space, rebuilding it if it looks stale.
+
+    Staleness is detected by the space's shared generation, which every
+    commit touching its connections advances (in any worker process), and by
+    comparing the index size to the space's indexed document count.
+    ``pending_id`` names an artifact already counted but about to be inserted
+    into the index by the caller.
+    """
+    generation = shared_state().generation(f"similarity:{space_id}")
+    document_count = (
+        db.query(Space.document_count).filter(Space.id == space_id).scalar() or 0
+    )
+    with _indexes_lock:
+        index = _indexes.get(space_id)
+        if (
+            index is not None
+            and index.generation == generation
+            and len(index) + (pending_id is not None and pending_id not in index) == document_count
+        ):
+            _indexes.move_to_end(space_id)
+            return index
+
+    index = SimilarityIndex(generation)
+    frequencies = dict(
+        db.query(SpaceTerm.term, SpaceTerm.document_frequency).filter(
+            SpaceTerm.space_id == space_id
+        )
+    )
+    for artifact_id, raw_terms in db.query(Artifact.id, Artifact._terms).filter(
+        Artifact.space_id == space_id, Artifact._terms.isnot(None)
+    ):
+        try:
+            terms = json.loads(raw_terms)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        index.upsert(artifact_id, term_vector(terms, frequencies, document_count))
+
+    with _indexes_lock:
+        _indexes[space_id] = index
+        _indexes.move_to_end(space_id)
+        while len(_indexes) > MAX_CACHED_SPACES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def invalidate_space_index(space_id: int) -> None:
+    with _indexes_lock:
+        _indexes.pop(space_id, None)
+
+
+def clear_index_cache() -> None:
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def _touched_spaces(db: Session) -> set:
+    return db.info.setdefault("connection_index_spaces", set())
+
+
+@event.listens_for(Session, "after_commit")
+def _advance_touched_spaces(session: Session) -> None:
+    space_ids = session.info.pop("connection_index_spaces", None)
+    if not space_ids:
+        return
+    state = shared_state()
+    for space_id in space_ids:
+        generation = state.bump(f"similarity:{space_id}")
+        with _indexes_lock:
+            index = _indexes.get(space_id)
+            if index is None:
+                continue
+            if index.generation == generation - 1:
+                # Nobody else committed since the index was current, and it
+                # already holds this transaction's eager updates.
+                index.generation = generation
+            else:
+                del _indexes[space_id]
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back_indexes(session: Session) -> None:
+    # The cached indexes were updated eagerly; rebuild them from the database.
+    for space_id in session.info.pop("connection_index_spaces", ()):
+        invalidate_space_index(space_id)
+
+
+def update_connections(
+    artifact: Artifact,
+    db: Session,
+    frequencies: Mapping[str, int],
+    document_count: int,
+) -> None:
+    """Recompute the edges touching one flushed artifact.
+
+    Only this artifact's top-k semantic neighbours (and, for new artifacts,
+    its nearest neighbours in creation time) are computed. Its existing edges
+    are then reconciled with bulk INSERT/UPDATE/DELETE statements.
+    """
+    index = _space_index(db, artifact.space_id, pending_id=artifact.id)
+    _touched_spaces(db).add(artifact.space_id)
+    vector = term_vector(artifact.terms or [], frequencies, document_count)
+    index.upsert(artifact.id, vector)
+
+    wanted: Dict[Tuple[int, int, str], float] = {}
+    for other_id, score in index.query(
+        vector, SEMANTIC_TOP_K, SEMANTIC_THRESHOLD, exclude=artifact.id
+    ):
+        wanted[(*sorted((artifact.id, other_id)), "semantic")] = round(score, 4)
+
+    existing = {
+        (row.source_artifact_id, row.target_artifact_id, row.connection_type): row
+        for row in db.query(ArtifactConnection).filter(
+            or_(
+                ArtifactConnection.source_artifact_id == artifact.id,
+                ArtifactConnection.target_artifact_id == artifact.id,
+            )
+        )
+    }
+    if not any(key[2] == "temporal" for key in existing):
+        for other_id, strength in _temporal_neighbours(artifact, db):
+            wanted[(*sorted((artifact.id, other_id)), "temporal")] = strength
+    else:
+        # Creation times never change, so temporal edges are kept as they are.
+        for key, row in existing.items():
+            if key[2] == "temporal":
+                wanted[key] = row.connection_strength
+
+    _reconcile_edges(db, artifact.space_id, existing, wanted)
+
+
+def _temporal_neighbours(artifact: Artifact, db: Session) -> List[Tuple[int, float]]:
+    created_at = artifact.created_at or datetime.now(timezone.utc)
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    window_start = (created_at - TEMPORAL_WINDOW).replace(tzinfo=None)
+    rows = (
+        db.query(Artifact.id, Artifact.created_at)
+        .filter(
+            Artifact.space_id == artifact.space_id,
+            Artifact.id != artifact.id,
+            Artifact.created_at >= window_start,
+            Artifact.created_at <= created_at.replace(tzinfo=None),
+        )
+        .order_by(Artifact.created_at.desc())
+        .limit(TEMPORAL_TOP_K)
+        .all()
+    )
+    neighbours = []
+    window = TEMPORAL_WINDOW.total_seconds()
+    for other_id, other_created in rows:
+        if other_created.tzinfo is None:
+            other_created = other_created.replace(tzinfo=timezone.utc)
+        gap = abs((created_at - other_created).total_seconds())
+        neighbours.append((other_id, round(max(0.0, 1 - gap / window), 4)))
+    return neighbours
+
+
+def _reconcile_edges(
+    db: Session,
+    space_id: int,
+    existing: Mapping[Tuple[int, int, str], ArtifactConnection],
+    wanted: Mapping[Tuple[int, int, str], float],
+) -> None:
+    now = datetime.now(timezone.utc)
+    stale = [row.id for key, row in existing.items() if key not in wanted]
+    changed = [
+        {"id": existing[key].id, "connection_strength": strength, "last_reinforced": now}
+        for key, strength in wanted.items()
+        if key in existing and existing[key].connection_strength != strength
+    ]
+    added = [
+        {
+            "space_id": space_id,
+            "source_artifact_id": source,
+            "target_artifact_id": target,
+            "connection_type": connection_type,
+            "connection_strength": strength,
+            "discovered_at": now,
+            "last_reinforced": now,
+        }
+        for (source, target, connection_type), strength in wanted.items()
+        if (source, target, connection_type) not in existing
+    ]
+
+    for row in existing.values():
+        db.expunge(row)
+    if stale:
+        db.execute(delete(ArtifactConnection).where(ArtifactConnection.id.in_(stale)))
+    if changed:
+        db.execute(update(ArtifactConnection), changed)
+    if added:
+        db.execute(insert(ArtifactConnection), added)
+
+    record_edge_changes(
+        db,
+        space_id,
+        upserts=[
+            (source, target, strength)
+            for (source, target, connection_type), strength in wanted.items()
+            if connection_type == "semantic"
+            and (
+                (source, target, connection_type) not in existing
+                or existing[(source, target, connection_type)].connection_strength
+                != strength
+            )
+        ],
+        removals=[
+            (source, target)
+            for (source, target, connection_type) in existing
+            if connection_type == "semantic"
+            and (source, target, connection_type) not in wanted
+        ],
+    )
+
+
+def remove_connections(artifact: Artifact, db: Session) -> None:
+    """Drop every edge touching an artifact that is about to be deleted."""
+    db.execute(
+        delete(ArtifactConnection).where(
+            or_(
+                ArtifactConnection.source_artifact_id == artifact.id,
+                ArtifactConnection.target_artifact_id == artifact.id,
+            )
+        )
+    )
+    record_edge_changes(db, artifact.space_id, removed_nodes=[artifact.id])
+    with _indexes_lock:
+        index = _indexes.get(artifact.space_id)
+    if index is not None:
+        index.remove(artifact.id)
+        _touched_spaces(db).add(artifact.space_id)
+
+
+def space_graph(db: Session, space_id: int) -> Tuple[list, List[ArtifactConnection]]:
+    """Return ``(nodes, edges)`` for a space straight from the materialized edges."""
+    nodes = (
+        db.query(Artifact.id, Artifact.title)
+        .filter(Artifact.space_id == space_id)
+        .order_by(Artifact.id)
+        .all()
+    )
+    edges = (
+        db.query(ArtifactConnection)
+        .filter(ArtifactConnection.space_id == space_id)
+        .order_by(ArtifactConnection.source_artifact_id, ArtifactConnection.target_artifact_id)
+        .all()
+    )
+    return nodes, edges
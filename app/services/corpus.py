@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from ..models import Space, SpaceTerm
+
+# Keep IN (...) lists under SQLite's bound-parameter limit.
+_IN_CHUNK_SIZE = 500
+
+
+def update_document_terms(
+    db: Session,
+    space_id: int,
+    previous: Iterable[str] | None,
+    current: Iterable[str] | None,
+) -> Tuple[Dict[str, int], int]:
+    """Move one document's term set from ``previous`` to ``current``.
+
+    ``None`` means the document is not (or no longer) part of the corpus, so
+    passing ``previous=None`` adds a document and ``current=None`` removes one.
+    Only rows for the document's own terms are read or written, keeping the
+    cost proportional to the document length rather than the corpus size.
+    Counts change with single-statement upserts and updates, so concurrent
+    writers in the same space never read-modify-write a stale count.
+
+    Returns the document frequencies of the ``current`` terms and the space's
+    document count after the change.
+    """
+    previous_terms = set(previous or ())
+    current_terms = set(current or ())
+    added = sorted(current_terms - previous_terms)
+    removed = sorted(previous_terms - current_terms)
+    db.flush()
+
+    for chunk in _chunks(added):
+        statement = insert(SpaceTerm).values(
+            [{"space_id": space_id, "term": term, "document_frequency": 1} for term in chunk]
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=["space_id", "term"],
+                set_={"document_frequency": SpaceTerm.document_frequency + 1},
+            )
+        )
+
+    for chunk in _chunks(removed):
+        in_space = (SpaceTerm.space_id == space_id, SpaceTerm.term.in_(chunk))
+        db.query(SpaceTerm).filter(*in_space).update(
+            {SpaceTerm.document_frequency: SpaceTerm.document_frequency - 1},
+            synchronize_session=False,
+        )
+        db.query(SpaceTerm).filter(*in_space, SpaceTerm.document_frequency <= 0).delete(
+            synchronize_session=False
+        )
+    if added or removed:
+        # Rows loaded earlier in this session hold the old counts.
+        for row in list(db.identity_map.values()):
+            if isinstance(row, SpaceTerm) and row.space_id == space_id:
+                db.expire(row)
+
+    delta = int(current is not None) - int(previous is not None)
+    if delta:
+        db.query(Space).filter(Space.id == space_id).update(
+            {Space.document_count: Space.document_count + delta},
+            synchronize_session=False,
+        )
+    document_count = (
+        db.query(Space.document_count).filter(Space.id == space_id).scalar() or 0
+    )
+
+    frequencies = _load_frequencies(db, space_id, current_terms)
+    return frequencies, document_count
+
+
+def top_terms(db: Session, space_id: int, limit: int = 10) -> List[SpaceTerm]:
+    """Return the terms mentioned by the most artifacts in a space."""
+    return (
+        db.query(SpaceTerm)
+        .filter(SpaceTerm.space_id == space_id)
+        .order_by(SpaceTerm.document_frequency.desc(), SpaceTerm.term)
+        .limit(limit)
+        .all()
+    )
+
+
+def _chunks(terms: List[str]) -> Iterable[List[str]]:
+    for start in range(0, len(terms), _IN_CHUNK_SIZE):
+        yield terms[start : start + _IN_CHUNK_SIZE]
+
+
+def _load_frequencies(db: Session, space_id: int, terms: set[str]) -> Dict[str, int]:
+    frequencies: Dict[str, int] = {}
+    for chunk in _chunks(sorted(terms)):
+        frequencies.update(
+            db.query(SpaceTerm.term, SpaceTerm.document_frequency).filter(
+                SpaceTerm.space_id == space_id, SpaceTerm.term.in_(chunk)
+            )
+        )
+    return frequencies
@@ -0,0 +1,398 @@
+"""Cross-space similarity scan.
+
+Comparing every artifact with every artifact in other spaces is quadratic,
+so the scan uses MinHash LSH for blocking. Each artifact's term set is
+reduced to a signature whose band hashes act as bucket keys. Only artifacts
+from different spaces sharing a bucket become candidate pairs, and those are
+verified with their exact Jaccard similarity. Signing and verification run
+in a process pool, one shard per task. Every finished shard is written to a
+checkpoint directory, so an interrupted scan resumes where it stopped.
+Verified pairs are grouped into connected components and stored as
+``CrossSpaceBloom`` rows.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from ..models import Artifact, CrossSpaceBloom, Space
+from ..nlp_utils import (
+    MINHASH_BANDS,
+    MINHASH_PERMUTATIONS,
+    jaccard,
+    lsh_band_keys,
+    minhash_signature,
+)
+
+logger = logging.getLogger(__name__)
+
+SCAN_THRESHOLD = 0.5
+SHARD_SIZE = 1_000
+VERIFY_CHUNK_SIZE = 5_000
+# Buckets this large come from boilerplate shared by many artifacts and
+# would produce quadratic candidate lists; they are skipped.
+MAX_BUCKET_SIZE = 200
+INSERT_BATCH_SIZE = 500
+# Two spaces are suggested for merging when the bridge covers this share of
+# the smaller space.
+MERGE_SHARE = 0.3
+DEFAULT_CHECKPOINT_DIR = os.getenv("CROSS_SPACE_CHECKPOINT_DIR", ".cross_space_scan")
+
+# Keep IN (...) lists under SQLite's bound-parameter limit.
+_IN_CHUNK_SIZE = 500
+
+
+@dataclass
+class ScanResult:
+    artifacts: int = 0
+    candidates: int = 0
+    verified: int = 0
+    blooms: int = 0
+    skipped_buckets: int = 0
+    resumed_shards: int = 0
+
+
+class ScanCheckpoint:
+    """Per-shard results stored as JSON files next to a manifest.
+
+    The manifest records the scan parameters and a digest of every indexed
+    artifact's terms; if either differs on the next run the old shards are
+    discarded.
+    """
+
+    def __init__(self, directory: str | Path, manifest: Dict[str, Any]) -> None:
+        self.directory = Path(directory)
+        self.manifest = manifest
+
+    def open(self) -> None:
+        path = self.directory / "manifest.json"
+        if path.exists():
+            try:
+                if json.loads(path.read_text()) == self.manifest:
+                    return
+            except (OSError, json.JSONDecodeError):
+                pass
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._write(path, self.manifest)
+
+    def load(self, name: str) -> Optional[Any]:
+        path = self.directory / f"{name}.json"
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def save(self, name: str, payload: Any) -> None:
+        self._write(self.directory / f"{name}.json", payload)
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def _write(path: Path, payload: Any) -> None:
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(payload))
+        os.replace(temporary, path)
+
+
+def _signature_shard(
+    items: Sequence[Tuple[int, int, List[str]]], num_perm: int, bands: int
+) -> List[Tuple[int, int, List[int]]]:
+    """Band keys for ``(artifact_id, space_id, terms)`` items."""
+    return [
+        (artifact_id, space_id, lsh_band_keys(minhash_signature(terms, num_perm), bands))
+        for artifact_id, space_id, terms in items
+    ]
+
+
+def _verify_shard(
+    pairs: Sequence[Tuple[int, int, List[str], List[str]]], threshold: float
+) -> List[Tuple[int, int, float]]:
+    """Exact Jaccard check of candidate pairs; returns the pairs that pass."""
+    verified = []
+    for first, second, first_terms, second_terms in pairs:
+        score = jaccard(first_terms, second_terms)
+        if score >= threshold:
+            verified.append((first, second, round(score, 4)))
+    return verified
+
+
+def _run_shards(
+    executor: Optional[Executor],
+    tasks: Iterable[Tuple[str, Callable[[], Tuple[Callable, tuple]]]],
+    checkpoint: ScanCheckpoint,
+    result: ScanResult,
+    max_in_flight: int,
+) -> Dict[str, Any]:
+    """Run ``(name, prepare)`` tasks, reusing checkpointed shards.
+
+    ``prepare`` loads a shard's inputs and returns ``(function, args)``. It
+    is only called for shards that still need computing, and at most
+    ``max_in_flight`` prepared shards are held in memory at once.
+    """
+    outputs: Dict[str, Any] = {}
+    in_flight: Dict[Any, str] = {}
+
+    def collect(done) -> None:
+        for future in done:
+            name = in_flight.pop(future)
+            outputs[name] = future.result()
+            checkpoint.save(name, outputs[name])
+
+    for name, prepare in tasks:
+        saved = checkpoint.load(name)
+        if saved is not None:
+            outputs[name] = saved
+            result.resumed_shards += 1
+            continue
+        function, args = prepare()
+        if executor is None:
+            outputs[name] = function(*args)
+            checkpoint.save(name, outputs[name])
+            continue
+        in_flight[executor.submit(function, *args)] = name
+        if len(in_flight) >= max_in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+    if in_flight:
+        done, _ = wait(in_flight)
+        collect(done)
+    return outputs
+
+
+def _load_terms(db: Session, artifact_ids: Sequence[int]) -> Dict[int, Tuple[int, List[str]]]:
+    rows: Dict[int, Tuple[int, List[str]]] = {}
+    for start in range(0, len(artifact_ids), _IN_CHUNK_SIZE):
+        chunk = artifact_ids[start : start + _IN_CHUNK_SIZE]
+        for artifact_id, space_id, raw_terms in db.query(
+            Artifact.id, Artifact.space_id, Artifact._terms
+        ).filter(Artifact.id.in_(chunk), Artifact._terms.isnot(None)):
+            try:
+                terms = json.loads(raw_terms)
+            except (json.JSONDecodeError, TypeError):
+                continue
+            if terms:
+                rows[artifact_id] = (space_id, terms)
+    return rows
+
+
+def _candidate_pairs(
+    signed: Iterable[Tuple[int, int, List[int]]], result: ScanResult
+) -> List[Tuple[int, int]]:
+    buckets: Dict[int, List[Tuple[int, int]]] = {}
+    for artifact_id, space_id, keys in signed:
+        for key in keys:
+            buckets.setdefault(key, []).append((artifact_id, space_id))
+
+    pairs = set()
+    for members in buckets.values():
+        if len(members) < 2 or len({space_id for _, space_id in members}) < 2:
+            continue
+        if len(members) > MAX_BUCKET_SIZE:
+            result.skipped_buckets += 1
+            continue
+        for index, (first, first_space) in enumerate(members):
+            for second, second_space in members[index + 1 :]:
+                if first_space != second_space:
+                    pairs.add((min(first, second), max(first, second)))
+    return sorted(pairs)
+
+
+def _group_pairs(
+    verified: Iterable[Tuple[int, int, float]], spaces: Dict[int, int]
+) -> List[Tuple[List[int], List[float]]]:
+    """Connected components of the verified pairs, with their pair scores."""
+    parent: Dict[int, int] = {}
+
+    def find(node: int) -> int:
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    edges = list(verified)
+    for first, second, _ in edges:
+        parent[find(first)] = find(second)
+    groups: Dict[int, Tuple[List[int], List[float]]] = {}
+    for node in parent:
+        groups.setdefault(find(node), ([], []))[0].append(node)
+    for first, _, score in edges:
+        groups[find(first)][1].append(score)
+    return [group for group in groups.values() if len({spaces[n] for n in group[0]}) > 1]
+
+
+def _suggested_action(members: List[int], spaces: Dict[int, int], sizes: Dict[int, int]) -> str:
+    per_space: Dict[int, int] = {}
+    for artifact_id in members:
+        per_space[spaces[artifact_id]] = per_space.get(spaces[artifact_id], 0) + 1
+    if len(per_space) > 2:
+        return "create_bridge"
+    smallest = min(per_space, key=lambda space_id: sizes.get(space_id) or 1)
+    if per_space[smallest] / max(sizes.get(smallest) or 1, 1) >= MERGE_SHARE:
+        return "merge"
+    return "link"
+
+
+def run_cross_space_scan(
+    db: Session,
+    workers: Optional[int] = None,
+    checkpoint_dir: str | Path = DEFAULT_CHECKPOINT_DIR,
+    threshold: float = SCAN_THRESHOLD,
+    shard_size: int = SHARD_SIZE,
+) -> ScanResult:
+    """Scan all spaces for overlapping artifacts and replace ``CrossSpaceBloom`` rows.
+
+    ``workers`` defaults to the CPU count; ``1`` runs every shard in this
+    process. The checkpoint directory is removed once the rows are written.
+    """
+    workers = workers or os.cpu_count() or 1
+    # Signatures depend on the terms only, so a digest of them tells whether
+    # checkpointed shards still describe the artifacts, edits included.
+    artifact_ids = []
+    digest = hashlib.sha256()
+    for artifact_id, raw_terms in (
+        db.query(Artifact.id, Artifact._terms)
+        .filter(Artifact._terms.isnot(None))
+        .order_by(Artifact.id)
+        .yield_per(_IN_CHUNK_SIZE)
+    ):
+        artifact_ids.append(artifact_id)
+        digest.update(f"{artifact_id}:{raw_terms}\n".encode("utf-8"))
+    result = ScanResult(artifacts=len(artifact_ids))
+    checkpoint = ScanCheckpoint(
+        checkpoint_dir,
+        {
+            "artifacts": [len(artifact_ids), digest.hexdigest()],
+            "num_perm": MINHASH_PERMUTATIONS,
+            "bands": MINHASH_BANDS,
+            "threshold": threshold,
+            "shard_size": shard_size,
+        },
+    )
+    checkpoint.open()
+
+    def signature_task(shard: Sequence[int]):
+        def prepare():
+            rows = _load_terms(db, shard)
+            items = [(artifact_id, *rows[artifact_id]) for artifact_id in shard if artifact_id in rows]
+            return _signature_shard, (items, MINHASH_PERMUTATIONS, MINHASH_BANDS)
+
+        return prepare
+
+    def verify_task(chunk: Sequence[Tuple[int, int]]):
+        def prepare():
+            rows = _load_terms(db, sorted({n for pair in chunk for n in pair}))
+            items = [
+                (first, second, rows[first][1], rows[second][1])
+                for first, second in chunk
+                if first in rows and second in rows
+            ]
+            return _verify_shard, (items, threshold)
+
+        return prepare
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        shards = [
+            artifact_ids[start : start + shard_size]
+            for start in range(0, len(artifact_ids), shard_size)
+        ]
+        signed = _run_shards(
+            executor,
+            ((f"signatures-{index:05d}", signature_task(shard)) for index, shard in enumerate(shards)),
+            checkpoint,
+            result,
+            workers * 2,
+        )
+        spaces = {
+            artifact_id: space_id
+            for output in signed.values()
+            for artifact_id, space_id, _ in output
+        }
+        candidates = _candidate_pairs(
+            (row for name in sorted(signed) for row in signed[name]), result
+        )
+        result.candidates = len(candidates)
+
+        chunks = [
+            candidates[start : start + VERIFY_CHUNK_SIZE]
+            for start in range(0, len(candidates), VERIFY_CHUNK_SIZE)
+        ]
+        verified_shards = _run_shards(
+            executor,
+            ((f"verified-{index:05d}", verify_task(chunk)) for index, chunk in enumerate(chunks)),
+            checkpoint,
+            result,
+            workers * 2,
+        )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    verified = [tuple(row) for name in sorted(verified_shards) for row in verified_shards[name]]
+    result.verified = len(verified)
+    sizes = dict(db.query(Space.id, Space.document_count))
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "space_ids_json": json.dumps(sorted({spaces[n] for n in members})),
+            "bridge_artifact_ids_json": json.dumps(sorted(members)),
+            "strength": round(sum(scores) / len(scores), 4),
+            "suggested_action": _suggested_action(members, spaces, sizes),
+            "detected_at": now,
+        }
+        for members, scores in _group_pairs(verified, spaces)
+    ]
+    rows.sort(key=lambda row: row["strength"], reverse=True)
+
+    db.execute(delete(CrossSpaceBloom))
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.execute(insert(CrossSpaceBloom), rows[start : start + INSERT_BATCH_SIZE])
+    db.commit()
+    result.blooms = len(rows)
+    checkpoint.clear()
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:  # pragma: no cover - CLI
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--checkpoint-dir", default=DEFAULT_CHECKPOINT_DIR)
+    parser.add_argument("--threshold", type=float, default=SCAN_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    from ..db import SessionLocal, create_db_and_tables
+
+    create_db_and_tables()
+    session = SessionLocal()
+    try:
+        result = run_cross_space_scan(
+            session,
+            workers=args.workers,
+            checkpoint_dir=args.checkpoint_dir,
+            threshold=args.threshold,
+        )
+    finally:
+        session.close()
+    print(json.dumps(asdict(result)))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session, aliased
+
+from ..models import Artifact, ArtifactFingerprint
+from ..nlp_utils import (
+    MINHASH_MAX_ELEMENTS,
+    lsh_band_keys,
+    minhash_signature,
+    signature_similarity,
+    word_shingles,
+)
+
+DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+
+# Keep IN (...) lists under SQLite's bound-parameter limit.
+_IN_CHUNK_SIZE = 500
+
+
+def fingerprint_text(artifact: Artifact) -> str:
+    """Text compared for duplicates: the content, or the title when there is none.
+
+    Titles are left out otherwise so the same note pasted under different
+    titles is still recognized.
+    """
+    return (artifact.content or "").strip() or (artifact.title or "").strip()
+
+
+def update_fingerprint(artifact: Artifact, db: Session) -> Optional[int]:
+    """Refresh a flushed artifact's fingerprint and return the id it nearly duplicates.
+
+    The signature's LSH band buckets are stored in ``artifact_fingerprints``,
+    so candidates are found with an indexed lookup of the artifact's own
+    buckets instead of a scan of the space. Candidates are then confirmed by
+    signature similarity. The result is also set as ``artifact.duplicate_of``.
+    """
+    signature = minhash_signature(
+        word_shingles(fingerprint_text(artifact), SHINGLE_SIZE), max_elements=MINHASH_MAX_ELEMENTS
+    )
+    buckets = lsh_band_keys(signature)
+    if signature != artifact.fingerprint:
+        artifact.fingerprint = signature
+        db.execute(
+            delete(ArtifactFingerprint).where(ArtifactFingerprint.artifact_id == artifact.id)
+        )
+        if buckets:
+            db.execute(
+                insert(ArtifactFingerprint),
+                [
+                    {"artifact_id": artifact.id, "space_id": artifact.space_id, "bucket": bucket}
+                    for bucket in set(buckets)
+                ],
+            )
+
+    artifact.duplicate_of = None
+    if not buckets:
+        return None
+    candidate_ids = [
+        artifact_id
+        for (artifact_id,) in db.query(ArtifactFingerprint.artifact_id)
+        .filter(
+            ArtifactFingerprint.space_id == artifact.space_id,
+            ArtifactFingerprint.bucket.in_(buckets),
+            ArtifactFingerprint.artifact_id != artifact.id,
+        )
+        .distinct()
+    ]
+    best: Optional[Tuple[float, int]] = None
+    for candidate_id, candidate_signature in _signatures(db, candidate_ids).items():
+        score = signature_similarity(signature, candidate_signature)
+        if score >= DUPLICATE_THRESHOLD and (best is None or (score, -candidate_id) > best):
+            best = (score, -candidate_id)
+    if best is not None:
+        artifact.duplicate_of = -best[1]
+    return artifact.duplicate_of
+
+
+def remove_fingerprint(artifact: Artifact, db: Session) -> None:
+    db.execute(delete(ArtifactFingerprint).where(ArtifactFingerprint.artifact_id == artifact.id))
+
+
+def _signatures(db: Session, artifact_ids: Sequence[int]) -> Dict[int, List[int]]:
+    signatures: Dict[int, List[int]] = {}
+    for start in range(0, len(artifact_ids), _IN_CHUNK_SIZE):
+        chunk = artifact_ids[start : start + _IN_CHUNK_SIZE]
+        for artifact_id, raw in db.query(Artifact.id, Artifact._fingerprint).filter(
+            Artifact.id.in_(chunk), Artifact._fingerprint.isnot(None)
+        ):
+            try:
+                signatures[artifact_id] = json.loads(raw)
+            except (json.JSONDecodeError, TypeError):
+                continue
+    return signatures
+
+
+def find_duplicate_groups(db: Session, space_id: int) -> List[Tuple[List[int], float]]:
+    """Group a space's near-duplicate artifacts.
+
+    Candidate pairs come from a self-join on shared buckets. Pairs that pass
+    the threshold are merged into groups. Each group reports its lowest
+    confirmed pair similarity.
+    """
+    first, second = aliased(ArtifactFingerprint), aliased(ArtifactFingerprint)
+    pairs = (
+        db.query(first.artifact_id, second.artifact_id)
+        .join(
+            second,
+            (second.space_id == first.space_id)
+            & (second.bucket == first.bucket)
+            & (second.artifact_id > first.artifact_id),
+        )
+        .filter(first.space_id == space_id)
+        .distinct()
+        .all()
+    )
+    signatures = _signatures(db, sorted({n for pair in pairs for n in pair}))
+
+    parent: Dict[int, int] = {}
+
+    def find(node: int) -> int:
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    confirmed = []
+    for a, b in pairs:
+        score = signature_similarity(signatures.get(a, []), signatures.get(b, []))
+        if score >= DUPLICATE_THRESHOLD:
+            confirmed.append((a, score))
+            parent[find(b)] = find(a)
+
+    groups: Dict[int, Tuple[List[int], List[float]]] = {}
+    for node in parent:
+        groups.setdefault(find(node), ([], []))[0].append(node)
+    for node, score in confirmed:
+        groups[find(node)][1].append(score)
+    return sorted(
+        ((sorted(members), round(min(scores), 4)) for members, scores in groups.values()),
+        key=lambda group: group[0][0],
+    )
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import threading
+from array import array
+from typing import Collection, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..llm.embeddings import Embedder, content_key, create_embedding_provider
+from ..llm.routing import is_provider_fault, provider_router
+from ..models import Artifact, ArtifactChunk, Embedding
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits bound parameters per statement.
+_LOOKUP_CHUNK = 500
+
+
+def _pack(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class SqlEmbeddingCache:
+    """``EmbeddingCache`` stored in the ``embeddings`` table of ``db``.
+
+    New vectors are inserted in the session's transaction; the caller
+    commits them. Keys in ``transient`` (one-off texts such as search
+    queries) are looked up but never stored.
+    """
+
+    def __init__(self, db: Session, model_id: str, transient: Collection[str] = ()) -> None:
+        self.db = db
+        self.model_id = model_id
+        self.transient = set(transient)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), _LOOKUP_CHUNK):
+            rows = (
+                self.db.query(Embedding.content_hash, Embedding.vector)
+                .filter(Embedding.content_hash.in_(unique[start : start + _LOOKUP_CHUNK]))
+                .all()
+            )
+            found.update((content_hash, _unpack(vector)) for content_hash, vector in rows)
+        metrics.embeddings_total.inc(len(found), model=self.model_id, outcome="cached")
+        metrics.embeddings_total.inc(len(unique) - len(found), model=self.model_id, outcome="embedded")
+        return found
+
+    def put_many(self, vectors: Mapping[str, List[float]]) -> None:
+        rows = [
+            {
+                "content_hash": content_hash,
+                "model": self.model_id,
+                "dimensions": len(vector),
+                "vector": _pack(vector),
+            }
+            for content_hash, vector in vectors.items()
+            if content_hash not in self.transient
+        ]
+        if rows:
+            # Another request may store the same text first; its row is as good.
+            self.db.execute(
+                insert(Embedding).on_conflict_do_nothing(index_elements=["content_hash"]), rows
+            )
+
+
+# One embedder per provider name, created on first use.
+_embedders: Dict[str, Embedder] = {}
+_embedder_lock = threading.Lock()
+
+
+def _embedder_named(name: str) -> Embedder:
+    with _embedder_lock:
+        embedder = _embedders.get(name)
+        if embedder is None:
+            embedder = _embedders[name] = Embedder(
+                create_embedding_provider(name, os.getenv("EMBEDDING_MODEL") or None),
+                max_concurrency=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+            )
+        return embedder
+
+
+def embedder_choices() -> List[str]:
+    """Embedders to try, in order.
+
+    ``EMBEDDING_PROVIDER`` is ``hashing`` (default; local and deterministic),
+    a provider that embeds such as ``ollama`` or ``openai``, or ``auto``.
+    ``auto`` is decided again on every call: the fastest capable provider
+    whose breaker is not open, then ``hashing`` if that one fails.
+    """
+    name = os.getenv("EMBEDDING_PROVIDER", "hashing").lower()
+    if name != "auto":
+        return [name]
+    fastest = provider_router.fastest("embed")
+    return [fastest, "hashing"] if fastest else ["hashing"]
+
+
+def get_embedder() -> Embedder:
+    """The embedder the next call would try first."""
+    return _embedder_named(embedder_choices()[0])
+
+
+def reset_embedder() -> None:
+    with _embedder_lock:
+        _embedders.clear()
+
+
+async def embed_texts(
+    db: Session, texts: Sequence[str], transient: Collection[str] = ()
+) -> List[List[float]]:
+    """Vectors for ``texts``, reusing every one already stored in ``db``.
+
+    New vectors are stored too, except those of the ``transient`` texts.
+    All vectors of one call come from the same embedder. With a fallback
+    (``auto``), the outcome of each provider call feeds that provider's
+    circuit breaker, so an unreachable provider stops being chosen.
+    """
+    *fallible, last = embedder_choices()
+    for name in fallible:
+        try:
+            vectors = await _embed_with(_embedder_named(name), db, texts, transient)
+        except Exception as exc:
+            if is_provider_fault(exc):
+                provider_router.stats(name).breaker.record_failure()
+            logger.warning("Embedding with %s failed, falling back: %s", name, exc)
+            continue
+        provider_router.stats(name).breaker.record_success()
+        return vectors
+    return await _embed_with(_embedder_named(last), db, texts, transient)
+
+
+async def _embed_with(
+    embedder: Embedder, db: Session, texts: Sequence[str], transient: Collection[str]
+) -> List[List[float]]:
+    cache = SqlEmbeddingCache(
+        db,
+        embedder.model_id,
+        transient=[content_key(embedder.model_id, text) for text in transient],
+    )
+    return await embedder.embed(texts, cache=cache)
+
+
+def artifact_text(artifact: Artifact) -> str:
+    return "\n\n".join(part for part in (artifact.title, artifact.content) if part)
+
+
+def cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+async def similar_artifacts(
+    db: Session, query: str, space_id: Optional[int] = None, limit: int = 20
+) -> List[Tuple[Artifact, float]]:
+    """Artifacts ranked by embedding similarity to ``query``, best first."""
+    artifacts_query = db.query(Artifact)
+    if space_id is not None:
+        artifacts_query = artifacts_query.filter(Artifact.space_id == space_id)
+    artifacts = artifacts_query.all()
+    if not artifacts:
+        return []
+    query_vector, *vectors = await embed_texts(
+        db, [query, *(artifact_text(artifact) for artifact in artifacts)], transient=[query]
+    )
+    scored = [(artifact, cosine(query_vector, vector)) for artifact, vector in zip(artifacts, vectors)]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:limit]
+
+
+async def search_passages(
+    db: Session,
+    query: str,
+    space_id: Optional[int] = None,
+    artifact_ids: Optional[Sequence[int]] = None,
+    limit: int = 10,
+    per_artifact: Optional[int] = None,
+) -> List[Tuple[ArtifactChunk, float]]:
+    """Artifact passages ranked by embedding similarity to ``query``, best first.
+
+    ``per_artifact`` caps how many passages one artifact contributes. Equal
+    scores keep document order.
+    """
+    chunks_query = db.query(ArtifactChunk)
+    if space_id is not None:
+        chunks_query = chunks_query.filter(ArtifactChunk.space_id == space_id)
+    if artifact_ids is not None:
+        chunks_query = chunks_query.filter(ArtifactChunk.artifact_id.in_(artifact_ids))
+    chunks = chunks_query.order_by(ArtifactChunk.artifact_id, ArtifactChunk.position).all()
+    if not chunks:
+        return []
+    query_vector, *vectors = await embed_texts(
+        db, [query, *(chunk.text for chunk in chunks)], transient=[query]
+    )
+    scored = [(chunk, cosine(query_vector, vector)) for chunk, vector in zip(chunks, vectors)]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    if per_artifact is not None:
+        taken: Dict[int, int] = {}
+        capped = []
+        for chunk, score in scored:
+            if taken.get(chunk.artifact_id, 0) < per_artifact:
+                taken[chunk.artifact_id] = taken.get(chunk.artifact_id, 0) + 1
+                capped.append((chunk, score))
+        scored = capped
+    return scored[:limit]
+
+
+def prune_embeddings(db: Session, batch_size: int = _LOOKUP_CHUNK) -> int:
+    """Delete stored vectors no current artifact or passage uses; returns the count.
+
+    Rows are keyed by text, so every edit leaves the previous version's
+    vectors behind. Vectors of every stored model are kept for current
+    texts, since ``auto`` may embed with any of them.
+    """
+    model_ids = [model_id for (model_id,) in db.query(Embedding.model).distinct()]
+    live: Set[str] = set()
+    for artifact in db.query(Artifact).yield_per(batch_size):
+        text = artifact_text(artifact)
+        live.update(content_key(model_id, text) for model_id in model_ids)
+    for (text,) in db.query(ArtifactChunk.text).yield_per(batch_size):
+        live.update(content_key(model_id, text) for model_id in model_ids)
+
+    stale = [
+        content_hash
+        for (content_hash,) in db.query(Embedding.content_hash).all()
+        if content_hash not in live
+    ]
+    for start in range(0, len(stale), batch_size):
+        db.execute(
+            delete(Embedding).where(Embedding.content_hash.in_(stale[start : start + batch_size]))
+        )
+    db.commit()
+    return len(stale)
+
+
+if __name__ == "__main__":  # pragma: no cover - run from cron or a scheduler
+    from ..db import SessionLocal, create_db_and_tables
+
+    create_db_and_tables()
+    session = SessionLocal()
+    try:
+        print(f"Pruned {prune_embeddings(session)} embeddings")
+    finally:
+        session.close()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import time
+from collections import Counter
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..models import Artifact
+from ..nlp_utils import rank_keywords_tfidf, summarize_text, tokenize
+from .chunking import update_chunks
+from .connections import remove_connections, update_connections
+from .corpus import update_document_terms
+from .duplicates import remove_fingerprint, update_fingerprint
+
+
+def enrich_artifact(artifact: Artifact, db: Session) -> None:
+    """Refresh an artifact's summary, tags, passages, corpus statistics, graph edges and fingerprint.
+
+    Tags are ranked by TF-IDF against the space's document-frequency table so
+    words shared by every artifact in the space stop dominating the tags. The
+    artifact is added to the session and flushed so its edges can reference it.
+    """
+    started = time.perf_counter()
+    title = (artifact.title or "").strip()
+    base_text = " ".join(filter(None, [title, (artifact.content or "").strip()])).strip()
+
+    term_counts = Counter(tokenize(base_text))
+    frequencies, document_count = update_document_terms(
+        db, artifact.space_id, artifact.terms, term_counts.keys()
+    )
+    artifact.terms = list(term_counts)
+
+    title_words = {word.lower() for word in title.split()}
+    tag_counts = {
+        term: count for term, count in term_counts.items() if term not in title_words
+    }
+    artifact.summary = summarize_text(base_text) or None
+    artifact.tags = rank_keywords_tfidf(tag_counts, frequencies, document_count)
+    update_chunks(artifact, db)
+
+    db.add(artifact)
+    db.flush()
+    update_connections(artifact, db, frequencies, document_count)
+    update_fingerprint(artifact, db)
+    metrics.enrichment_seconds.observe(time.perf_counter() - started)
+
+
+def index_document_terms(db: Session, batch_size: int = 100) -> int:
+    """Count artifacts stored before the term table existed; returns how many.
+
+    Until then their terms are missing from ``space_terms`` and
+    ``Space.document_count``. Only those statistics are filled in; summaries,
+    tags and edges are left as they are. Each artifact is claimed by setting
+    its terms only while they are still unset, in the same transaction that
+    counts them, so concurrent runs never count an artifact twice. Each
+    batch is committed on its own.
+    """
+    table = Artifact.__table__
+    indexed = 0
+    after = 0
+    while True:
+        batch = (
+            db.query(Artifact.id, Artifact.space_id, Artifact.title, Artifact.content)
+            .filter(Artifact._terms.is_(None), Artifact.id > after)
+            .order_by(Artifact.id)
+            .limit(batch_size)
+            .all()
+        )
+        # End the read so the claims below start a fresh write transaction.
+        db.commit()
+        if not batch:
+            return indexed
+        for artifact_id, space_id, title, content in batch:
+            text = " ".join(filter(None, [(title or "").strip(), (content or "").strip()]))
+            terms = sorted(set(tokenize(text)))
+            claimed = db.execute(
+                update(table)
+                .where(table.c.id == artifact_id, table.c.terms.is_(None))
+                .values(terms=json.dumps(terms))
+            ).rowcount
+            if claimed:
+                update_document_terms(db, space_id, None, terms)
+                indexed += 1
+        db.commit()
+        after = batch[-1].id
+
+
+def discard_artifact(artifact: Artifact, db: Session) -> None:
+    """Remove an artifact's corpus statistics, graph edges and fingerprint before deletion."""
+    remove_connections(artifact, db)
+    remove_fingerprint(artifact, db)
+    if artifact.terms is None:
+        return
+    update_document_terms(db, artifact.space_id, artifact.terms, None)
+    artifact.terms = None
+
+
+if __name__ == "__main__":  # pragma: no cover - run once after upgrading
+    from ..db import SessionLocal, create_db_and_tables
+
+    create_db_and_tables()
+    session = SessionLocal()
+    try:
+        print(f"Indexed the terms of {index_document_terms(session)} artifacts")
+    finally:
+        session.close()
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..models import Artifact, Interaction
+from ..shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+# Events a subscriber may fall behind by before it is told to resync instead.
+MAX_PENDING_EVENTS = 100
+# Channel of the shared state carrying events between worker processes.
+EVENTS_CHANNEL = "space-events"
+
+_event_ids = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class SpaceEvent:
+    type: str
+    space_id: int
+    data: Dict[str, object] = field(default_factory=dict)
+    id: int = field(default_factory=lambda: next(_event_ids))
+
+    def encode(self) -> str:
+        """Server-sent event frame for this event."""
+        payload = json.dumps({"space_id": self.space_id, **self.data}, separators=(",", ":"))
+        return f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """One listener's queue of a space's events, owned by an event loop.
+
+    A listener that falls more than ``max_pending`` events behind has its
+    queue replaced by a single ``resync`` event, telling it to reload instead
+    of replaying a backlog.
+    """
+
+    def __init__(self, bus: "EventBus", space_id: int, max_pending: int) -> None:
+        self.space_id = space_id
+        self._bus = bus
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[SpaceEvent]" = asyncio.Queue(max_pending)
+
+    async def get(self) -> SpaceEvent:
+        return await self._queue.get()
+
+    def _deliver(self, space_event: SpaceEvent) -> None:
+        if self._queue.full():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            space_event = SpaceEvent("resync", self.space_id)
+        self._queue.put_nowait(space_event)
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+
+class EventBus:
+    """Pub/sub of change events, keyed by space.
+
+    ``publish`` may be called from any thread (sync endpoints commit from the
+    thread pool), so events are handed to each subscriber's loop with
+    ``call_soon_threadsafe``.
+
+    With a shared state backend, events are published to its
+    ``EVENTS_CHANNEL`` instead, so a subscriber hears about changes made in
+    any worker process. A relay thread polls the channel every
+    ``poll_seconds`` while this process has subscribers.
+    """
+
+    def __init__(self, poll_seconds: float = 0.1) -> None:
+        self.poll_seconds = poll_seconds
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._relay: Optional[threading.Thread] = None
+
+    def subscribe(self, space_id: int, max_pending: int = MAX_PENDING_EVENTS) -> Subscription:
+        """Subscribe the running event loop to ``space_id``'s events."""
+        subscription = Subscription(self, space_id, max_pending)
+        state = shared_state()
+        with self._lock:
+            self._subscribers.setdefault(space_id, set()).add(subscription)
+            if state.shared and self._relay is None:
+                # Read the position here, so events published from now on
+                # reach this subscriber.
+                self._relay = threading.Thread(
+                    target=self._run_relay,
+                    args=(state, state.last_id(EVENTS_CHANNEL)),
+                    name="event-relay",
+                    daemon=True,
+                )
+                self._relay.start()
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.space_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.space_id]
+
+    def subscriber_count(self, space_id: int) -> int:
+        with self._lock:
+            return len(self._subscribers.get(space_id, ()))
+
+    def publish(self, space_event: SpaceEvent) -> None:
+        metrics.space_events_total.inc(type=space_event.type)
+        state = shared_state()
+        if state.shared:
+            message = {"type": space_event.type, "space_id": space_event.space_id, "data": space_event.data}
+            state.publish(EVENTS_CHANNEL, json.dumps(message))
+            return
+        self._deliver(space_event)
+
+    def _deliver(self, space_event: SpaceEvent) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(space_event.space_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._deliver, space_event)
+            except RuntimeError:
+                # The subscriber's loop has closed; it will never read again.
+                self._unsubscribe(subscription)
+
+    def _run_relay(self, state, after: int) -> None:
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._relay = None
+                    return
+            try:
+                messages = state.read(EVENTS_CHANNEL, after)
+            except Exception:  # pragma: no cover - keep relaying
+                logger.exception("Reading shared space events failed")
+                messages = []
+            for message_id, payload in messages:
+                after = message_id
+                message = json.loads(payload)
+                self._deliver(
+                    SpaceEvent(message["type"], message["space_id"], message["data"], id=message_id)
+                )
+            if not messages:
+                time.sleep(self.poll_seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._subscribers.clear()
+
+
+event_bus = EventBus(poll_seconds=float(os.getenv("SHARED_STATE_POLL_SECONDS", "0.1")))
+
+
+def _record(session: Session, kind: str, key: Tuple[str, int], space_id: int, data: dict) -> None:
+    pending: Dict[Tuple[str, int], Tuple[str, int, dict]] = session.info.setdefault(
+        "space_events", {}
+    )
+    previous = pending.get(key)
+    if previous is not None:
+        if previous[0].endswith(".created"):
+            if kind.endswith(".deleted"):
+                # Created and deleted in one transaction: nobody saw it.
+                del pending[key]
+            return
+        if previous[0].endswith(".deleted"):
+            return
+    pending[key] = (kind, space_id, data)
+
+
+def _record_artifact(session: Session, kind: str, artifact: Artifact) -> None:
+    _record(session, kind, ("artifact", artifact.id), artifact.space_id, {"id": artifact.id})
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_events(session: Session, _flush_context) -> None:
+    # Enrichment runs inside the writing transaction, so by commit time a
+    # created or updated artifact already carries its summary and tags.
+    for instance in session.new:
+        if isinstance(instance, Artifact):
+            _record_artifact(session, "artifact.created", instance)
+        elif isinstance(instance, Interaction):
+            _record(
+                session,
+                "interaction.created",
+                ("interaction", instance.id),
+                instance.space_id,
+                {"id": instance.id, "agent_id": instance.agent_id},
+            )
+    for instance in session.dirty:
+        if isinstance(instance, Artifact) and session.is_modified(
+            instance, include_collections=False
+        ):
+            _record_artifact(session, "artifact.updated", instance)
+    for instance in session.deleted:
+        if isinstance(instance, Artifact):
+            _record_artifact(session, "artifact.deleted", instance)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_events(session: Session) -> None:
+    pending = session.info.pop("space_events", None)
+    if pending:
+        for kind, space_id, data in pending.values():
+            event_bus.publish(SpaceEvent(kind, space_id, data))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_events(session: Session) -> None:
+    session.info.pop("space_events", None)
+
+
+async def event_stream(
+    subscription: Subscription,
+    keepalive_seconds: float = 15.0,
+    resume: bool = False,
+) -> AsyncIterator[str]:
+    """Yield SSE frames from ``subscription`` until the client goes away.
+
+    A ``resume`` (reconnect with ``Last-Event-ID``) starts with ``resync``,
+    since events published while disconnected are not kept. Comment frames
+    keep idle connections open through proxies.
+    """
+    with subscription:
+        yield "retry: 3000\n\n"
+        if resume:
+            yield SpaceEvent("resync", subscription.space_id).encode()
+        while True:
+            try:
+                space_event = await asyncio.wait_for(subscription.get(), keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield space_event.encode()
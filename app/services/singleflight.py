@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+from .. import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent async calls with the same key and caches their result.
+
+    The first caller for a key starts the computation as a task; callers
+    arriving while it runs await the same task, and later callers get the
+    cached result. Keys should include whatever version makes a result stale
+    (a new version is simply a new key; old entries age out of the LRU).
+    Failures are not cached. A caller that is cancelled does not cancel the
+    shared task, so the other waiters still get their result.
+    """
+
+    def __init__(self, name: str, max_entries: int = 256) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Hashable, T]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                metrics.coalesced_calls_total.inc(operation=self.name, outcome="cached")
+                return self._results[key]
+            task = self._in_flight.get(key)
+            if task is not None and task.get_loop() is asyncio.get_running_loop():
+                outcome = "joined"
+            else:
+                task = asyncio.ensure_future(compute())
+                self._in_flight[key] = task
+                task.add_done_callback(lambda done: self._finish(key, done))
+                outcome = "computed"
+        metrics.coalesced_calls_total.inc(operation=self.name, outcome=outcome)
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is task:
+                del self._in_flight[key]
+            if task.cancelled() or task.exception() is not None:
+                return
+            self._results[key] = task.result()
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._in_flight.clear()
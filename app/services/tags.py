@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import Query, Session
+
+from ..models import Artifact, ArtifactTag
+
+# Keep IN (...) lists under SQLite's bound-parameter limit. Filters with more
+# tags are rejected; ranking uses the first ones.
+MAX_QUERY_TAGS = 500
+
+
+def normalize_tags(tags: Iterable[str]) -> List[str]:
+    """Lowercase, strip and de-duplicate tags while keeping their order."""
+    seen: dict[str, None] = {}
+    for tag in tags:
+        cleaned = tag.strip().lower()
+        if cleaned:
+            seen.setdefault(cleaned, None)
+    return list(seen)
+
+
+def filter_by_tags(query: Query, tags: Iterable[str], match_all: bool = True) -> Query:
+    """Restrict an ``Artifact`` query to rows carrying the given tags.
+
+    With ``match_all`` every tag must be present (AND); otherwise any one of
+    them is enough (OR). Both forms run as a single indexed subquery. More
+    than ``MAX_QUERY_TAGS`` distinct tags raise ``ValueError``.
+    """
+    wanted = normalize_tags(tags)
+    if not wanted:
+        return query
+    if len(wanted) > MAX_QUERY_TAGS:
+        raise ValueError(f"At most {MAX_QUERY_TAGS} tags can be filtered on")
+
+    matching = select(ArtifactTag.artifact_id).where(ArtifactTag.tag.in_(wanted))
+    if match_all and len(wanted) > 1:
+        matching = matching.group_by(ArtifactTag.artifact_id).having(
+            func.count(ArtifactTag.tag) == len(wanted)
+        )
+    return query.filter(Artifact.id.in_(matching))
+
+
+def tag_facets(db: Session, space_id: int, limit: int = 50) -> List[Tuple[str, int]]:
+    """Return ``(tag, artifact_count)`` pairs for a space, most used first."""
+    count = func.count(ArtifactTag.id).label("count")
+    return [
+        (tag, total)
+        for tag, total in db.query(ArtifactTag.tag, count)
+        .filter(ArtifactTag.space_id == space_id)
+        .group_by(ArtifactTag.tag)
+        .order_by(count.desc(), ArtifactTag.tag)
+        .limit(limit)
+    ]
+
+
+def rank_by_tags(
+    db: Session, space_id: int, terms: Iterable[str], limit: int
+) -> List[Tuple[int, int]]:
+    """Return ``(artifact_id, matched_tag_count)`` for artifacts tagged with ``terms``."""
+    wanted = normalize_tags(terms)[:MAX_QUERY_TAGS]
+    if not wanted or limit <= 0:
+        return []
+
+    hits = func.count(ArtifactTag.id).label("hits")
+    return [
+        (artifact_id, total)
+        for artifact_id, total in db.query(ArtifactTag.artifact_id, hits)
+        .filter(ArtifactTag.space_id == space_id, ArtifactTag.tag.in_(wanted))
+        .group_by(ArtifactTag.artifact_id)
+        .order_by(hits.desc(), ArtifactTag.artifact_id.desc())
+        .limit(limit)
+    ]
+
+
+def index_artifact_tags(db: Session, batch_size: int = 500) -> int:
+    """Fill ``artifact_tags`` for artifacts tagged before it existed; returns how many.
+
+    Each batch is committed on its own.
+    """
+    last_id = indexed = 0
+    while True:
+        batch = (
+            db.query(Artifact)
+            .filter(
+                Artifact.id > last_id,
+                Artifact._tags.isnot(None),
+                ~exists().where(ArtifactTag.artifact_id == Artifact.id),
+            )
+            .order_by(Artifact.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return indexed
+        for artifact in batch:
+            artifact.tags = artifact.tags  # the setter rebuilds the index rows
+        db.commit()
+        last_id = batch[-1].id
+        indexed += len(batch)
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, case, func, literal, select, union_all, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.types import DateTime
+
+from ..models import Artifact, ArtifactConnection, Space
+from ..thermal import COLDEST_STATE, DECAY_RATE, STATE_THRESHOLDS
+
+logger = logging.getLogger(__name__)
+
+# Entropy weights from the bloom design: fragmentation, isolation, temporal drift.
+FRAGMENTATION_WEIGHT = 0.4
+ISOLATION_WEIGHT = 0.3
+DRIFT_WEIGHT = 0.3
+
+
+class AccessTracker:
+    """Coalesces artifact access events in memory and writes them in batches.
+
+    Views only record ``(count, latest time)`` per artifact; a flush turns
+    everything pending into one executemany UPDATE, so a popular artifact
+    viewed a thousand times between flushes costs one row write. The same
+    transaction bumps ``Space.version`` of the spaces touched, since access
+    counts are part of the space's representation (and its ETag). A daemon
+    thread flushes every ``ACCESS_FLUSH_SECONDS`` (default 30), or sooner
+    once ``ACCESS_FLUSH_BATCH`` artifacts are pending. With an interval of
+    ``0`` no thread is started and :meth:`flush` must be called explicitly.
+    """
+
+    def __init__(self) -> None:
+        self.flush_seconds = float(os.getenv("ACCESS_FLUSH_SECONDS", "30"))
+        self.batch_size = int(os.getenv("ACCESS_FLUSH_BATCH", "500"))
+        self._pending: Dict[int, Tuple[Engine, Dict[int, List]]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(
+        self, db: Session, artifact_ids: Iterable[int], when: Optional[datetime] = None
+    ) -> None:
+        bind = db.get_bind()
+        when = when or datetime.now(timezone.utc)
+        with self._lock:
+            accesses = self._pending.setdefault(id(bind), (bind, {}))[1]
+            for artifact_id in artifact_ids:
+                record = accesses.get(artifact_id)
+                if record is None:
+                    accesses[artifact_id] = [1, when]
+                else:
+                    record[0] += 1
+                    record[1] = max(record[1], when)
+            pending = len(accesses)
+            if self.flush_seconds > 0 and (self._thread is None or not self._thread.is_alive()):
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self._loop, name="access-tracker", daemon=True
+                )
+                self._thread.start()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(accesses) for _, accesses in self._pending.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """Write pending accesses and return the number of artifacts updated.
+
+        With ``db`` only that session's engine is flushed, inside the
+        session's transaction (the caller commits); otherwise every engine is
+        flushed in its own transaction.
+        """
+        with self._lock:
+            keys = [id(db.get_bind())] if db is not None else list(self._pending)
+            batches = [self._pending.pop(key) for key in keys if key in self._pending]
+
+        table = Artifact.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                last_accessed=bindparam("b_last"),
+                access_count=func.coalesce(table.c.access_count, 0) + bindparam("b_count"),
+            )
+        )
+        written = 0
+        for index, (engine, accesses) in enumerate(batches):
+            params = [
+                {"b_id": artifact_id, "b_count": count, "b_last": last}
+                for artifact_id, (count, last) in accesses.items()
+            ]
+            try:
+                if db is not None:
+                    db.execute(statement, params)
+                    _bump_space_versions(db, list(accesses))
+                else:
+                    with engine.begin() as connection:
+                        connection.execute(statement, params)
+                        _bump_space_versions(connection, list(accesses))
+            except Exception:
+                for engine_left, accesses_left in batches[index:]:
+                    self._requeue(engine_left, accesses_left)
+                raise
+            written += len(params)
+        return written
+
+    def _requeue(self, engine: Engine, accesses: Dict[int, List]) -> None:
+        with self._lock:
+            current = self._pending.setdefault(id(engine), (engine, {}))[1]
+            for artifact_id, (count, last) in accesses.items():
+                record = current.setdefault(artifact_id, [0, last])
+                record[0] += count
+                record[1] = max(record[1], last)
+
+    def _loop(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - keep the thread alive
+                logger.exception("Flushing artifact accesses failed")
+
+    def stop(self) -> None:
+        """Stop the flush thread and write whatever is still pending."""
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._thread = None
+        try:
+            self.flush()
+        except Exception:  # pragma: no cover - shutdown must not fail
+            logger.exception("Flushing artifact accesses failed")
+
+
+def _bump_space_versions(executor, artifact_ids: Sequence[int]) -> None:
+    artifacts = Artifact.__table__
+    spaces = Space.__table__
+    # Keep IN (...) lists under SQLite's bound-parameter limit.
+    for start in range(0, len(artifact_ids), 500):
+        owners = select(artifacts.c.space_id).where(
+            artifacts.c.id.in_(artifact_ids[start : start + 500])
+        )
+        executor.execute(
+            update(spaces).where(spaces.c.id.in_(owners)).values(version=spaces.c.version + 1)
+        )
+
+
+access_tracker = AccessTracker()
+
+
+def _age_days(now: datetime):
+    last_seen = func.coalesce(Artifact.last_accessed, Artifact.created_at)
+    now_param = literal(now.astimezone(timezone.utc).replace(tzinfo=None), DateTime())
+    return func.max(func.julianday(now_param) - func.julianday(last_seen), 0.0)
+
+
+def materialize_temperatures(
+    db: Session, now: datetime, space_ids: Optional[Sequence[int]] = None
+) -> None:
+    """Store every artifact's closed-form temperature in one UPDATE statement."""
+    age = _age_days(now)
+    state = case(
+        *[(age < upper_bound, state) for state, upper_bound in STATE_THRESHOLDS],
+        else_=COLDEST_STATE,
+    )
+    statement = update(Artifact).values(
+        {
+            Artifact._temperature: func.exp(-DECAY_RATE * age),
+            Artifact._temperature_state: state,
+            Artifact.temperature_last_updated: now,
+        }
+    )
+    if space_ids is not None:
+        statement = statement.where(Artifact.space_id.in_(space_ids))
+    db.execute(statement.execution_options(synchronize_session=False))
+
+
+def materialize_space_entropy(
+    db: Session, now: datetime, space_ids: Optional[Sequence[int]] = None
+) -> None:
+    """Recompute entropy and connection density for spaces in one UPDATE ... FROM.
+
+    Fragmentation is the share of artifacts without a semantic edge, isolation
+    the share with fewer than two edges of any kind, and temporal drift the
+    variance of materialized temperatures scaled to ``[0, 1]``. Run
+    :func:`materialize_temperatures` first.
+    """
+    endpoints = union_all(
+        select(
+            ArtifactConnection.source_artifact_id.label("artifact_id"),
+            ArtifactConnection.connection_type.label("connection_type"),
+        ),
+        select(
+            ArtifactConnection.target_artifact_id.label("artifact_id"),
+            ArtifactConnection.connection_type.label("connection_type"),
+        ),
+    ).subquery()
+    per_artifact = (
+        select(
+            Artifact.space_id.label("space_id"),
+            func.coalesce(Artifact._temperature, 1.0).label("temperature"),
+            func.count(endpoints.c.artifact_id).label("degree"),
+            func.coalesce(
+                func.sum(case((endpoints.c.connection_type == "semantic", 1), else_=0)), 0
+            ).label("semantic_degree"),
+        )
+        .select_from(Artifact)
+        .outerjoin(endpoints, endpoints.c.artifact_id == Artifact.id)
+        .group_by(Artifact.id, Artifact.space_id, Artifact._temperature)
+    )
+    if space_ids is not None:
+        per_artifact = per_artifact.where(Artifact.space_id.in_(space_ids))
+    per_artifact = per_artifact.subquery()
+
+    size = func.count()
+    temperature = per_artifact.c.temperature
+    stats = (
+        select(
+            per_artifact.c.space_id,
+            size.label("size"),
+            (
+                func.sum(case((per_artifact.c.semantic_degree == 0, 1), else_=0)) * 1.0 / size
+            ).label("fragmentation"),
+            (func.sum(case((per_artifact.c.degree < 2, 1), else_=0)) * 1.0 / size).label(
+                "isolation"
+            ),
+            (func.sum(per_artifact.c.semantic_degree) / 2.0).label("edges"),
+            # Values in [0, 1] have a variance of at most 0.25.
+            func.min(
+                1.0,
+                4 * (func.avg(temperature * temperature) - func.avg(temperature) * func.avg(temperature)),
+            ).label("drift"),
+        )
+        .group_by(per_artifact.c.space_id)
+        .subquery()
+    )
+
+    statement = (
+        update(Space)
+        .where(Space.id == stats.c.space_id)
+        .values(
+            {
+                Space.fragmentation_index: func.round(stats.c.fragmentation, 4),
+                Space.connection_density: case(
+                    (
+                        stats.c.size > 1,
+                        func.round(stats.c.edges * 2.0 / (stats.c.size * (stats.c.size - 1)), 4),
+                    ),
+                    else_=0.0,
+                ),
+                Space.temporal_coherence: func.round(1.0 - stats.c.drift, 4),
+                Space.entropy_score: func.round(
+                    100
+                    * (
+                        FRAGMENTATION_WEIGHT * stats.c.fragmentation
+                        + ISOLATION_WEIGHT * stats.c.isolation
+                        + DRIFT_WEIGHT * stats.c.drift
+                    ),
+                    2,
+                ),
+                Space.entropy_last_calculated: now,
+            }
+        )
+    )
+    db.execute(statement.execution_options(synchronize_session=False))
+
+
+def refresh_thermal_state(
+    db: Session,
+    space_ids: Optional[Sequence[int]] = None,
+    now: Optional[datetime] = None,
+) -> None:
+    """Batch job: flush accesses, then materialize temperatures and space entropy."""
+    now = now or datetime.now(timezone.utc)
+    access_tracker.flush(db)
+    materialize_temperatures(db, now, space_ids)
+    materialize_space_entropy(db, now, space_ids)
+    db.commit()
+
+
+if __name__ == "__main__":  # pragma: no cover - run from cron or a scheduler
+    from ..db import SessionLocal, create_db_and_tables
+
+    create_db_and_tables()
+    session = SessionLocal()
+    try:
+        refresh_thermal_state(session)
+    finally:
+        session.close()
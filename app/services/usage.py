@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from .. import metrics
+from ..models import Interaction, Space, UsageRollup
+
+# USD per million tokens: (prompt, completion, cached prompt). Providers and
+# models missing here (local ones such as Ollama) cost nothing.
+DEFAULT_PRICES: Dict[str, Tuple[float, float, float]] = {
+    "openai:gpt-4o": (2.50, 10.00, 1.25),
+    "openai:gpt-4o-mini": (0.15, 0.60, 0.075),
+    "openai:gpt-4.1": (2.00, 8.00, 0.50),
+    "openai:gpt-4.1-mini": (0.40, 1.60, 0.10),
+    "groq:llama-3.3-70b-versatile": (0.59, 0.79, 0.59),
+    "groq:llama-3.1-8b-instant": (0.05, 0.08, 0.05),
+}
+
+
+class BudgetExceeded(RuntimeError):
+    """The space has spent its daily budget and rejects new completions."""
+
+
+def _parse_prices(spec: str) -> Dict[str, Tuple[float, float, float]]:
+    """``provider:model=prompt/completion[/cached],...`` (USD per 1M tokens)."""
+    prices = {}
+    for entry in spec.split(","):
+        key, _, values = entry.strip().partition("=")
+        if not key or not values:
+            continue
+        numbers = [float(value) for value in values.split("/")]
+        prompt, completion = numbers[0], numbers[1] if len(numbers) > 1 else numbers[0]
+        cached = numbers[2] if len(numbers) > 2 else prompt
+        prices[key.strip().lower()] = (prompt, completion, cached)
+    return prices
+
+
+def prices() -> Dict[str, Tuple[float, float, float]]:
+    """Price table: the defaults, overridden entry by entry by ``TOKEN_PRICES``."""
+    table = dict(DEFAULT_PRICES)
+    table.update(_parse_prices(os.getenv("TOKEN_PRICES", "")))
+    return table
+
+
+def cost_usd(provider: str, model: str, prompt: int, completion: int, cached: int = 0) -> float:
+    """Cost of one completion; ``provider:*`` prices every model of a provider."""
+    table = prices()
+    price = table.get(f"{provider}:{model}".lower()) or table.get(f"{provider}:*".lower())
+    if price is None:
+        return 0.0
+    prompt_price, completion_price, cached_price = price
+    cached = min(cached, prompt)
+    return (
+        (prompt - cached) * prompt_price + cached * cached_price + completion * completion_price
+    ) / 1_000_000
+
+
+def apply_usage(interaction: Interaction, metadata: Any) -> None:
+    """Copy a completion's ``usage`` metadata onto ``interaction`` and price it."""
+    usage = metadata.get("usage") if isinstance(metadata, Mapping) else None
+    if not isinstance(usage, Mapping):
+        return
+    prompt = int(usage.get("prompt_tokens") or 0)
+    completion = int(usage.get("completion_tokens") or 0)
+    cached = metrics.cached_tokens(usage)
+    interaction.prompt_tokens = prompt
+    interaction.completion_tokens = completion
+    interaction.cached_tokens = cached
+    interaction.cost_usd = cost_usd(
+        interaction.provider, interaction.model, prompt, completion, cached
+    )
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _add_to_rollup(
+    executor, space_id: int, agent_id: int, provider: str, model: str, **values
+) -> None:
+    statement = insert(UsageRollup).values(
+        day=_today(),
+        space_id=space_id,
+        agent_id=agent_id,
+        provider=provider,
+        model=model,
+        **values,
+    )
+    executor.execute(
+        statement.on_conflict_do_update(
+            index_elements=["day", "space_id", "agent_id", "provider", "model"],
+            set_={
+                name: getattr(UsageRollup, name) + getattr(statement.excluded, name)
+                for name in values
+            },
+        )
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _roll_up_usage(session: Session, _flush_context) -> None:
+    # Same transaction as the interaction, so the ledger never drifts from
+    # the rows it sums. Interactions are never edited, only inserted.
+    rows = [
+        instance
+        for instance in session.new
+        if isinstance(instance, Interaction) and instance.status == "completed"
+    ]
+    if not rows:
+        return
+    connection = session.connection()
+    for interaction in rows:
+        _add_to_rollup(
+            connection,
+            interaction.space_id,
+            interaction.agent_id,
+            interaction.provider,
+            interaction.model,
+            interactions=1,
+            prompt_tokens=interaction.prompt_tokens or 0,
+            completion_tokens=interaction.completion_tokens or 0,
+            cached_tokens=interaction.cached_tokens or 0,
+            cost_usd=interaction.cost_usd or 0.0,
+        )
+
+
+def record_usage(
+    db: Session, space_id: int, agent_id: int, provider: str, model: str, metadata: Any
+) -> None:
+    """Add a completion that is not stored as an interaction (e.g. a summary) to the ledger.
+
+    It counts towards the space's spend and budgets but not its interactions.
+    The caller commits.
+    """
+    usage = metadata.get("usage") if isinstance(metadata, Mapping) else None
+    if not isinstance(usage, Mapping):
+        return
+    prompt = int(usage.get("prompt_tokens") or 0)
+    completion = int(usage.get("completion_tokens") or 0)
+    cached = metrics.cached_tokens(usage)
+    _add_to_rollup(
+        db,
+        space_id,
+        agent_id,
+        provider,
+        model,
+        interactions=0,
+        prompt_tokens=prompt,
+        completion_tokens=completion,
+        cached_tokens=cached,
+        cost_usd=cost_usd(provider, model, prompt, completion, cached),
+    )
+
+
+_TOTAL_COLUMNS = ("interactions", "prompt_tokens", "completion_tokens", "cached_tokens", "cost_usd")
+GROUPS = {
+    "day": UsageRollup.day,
+    "agent": UsageRollup.agent_id,
+    "provider": UsageRollup.provider,
+    "model": UsageRollup.model,
+}
+
+
+def _totals(row) -> dict:
+    totals = {name: (getattr(row, name) or 0) for name in _TOTAL_COLUMNS}
+    totals["cost_usd"] = round(float(totals["cost_usd"]), 6)
+    return totals
+
+
+def _sums():
+    return [func.sum(getattr(UsageRollup, name)).label(name) for name in _TOTAL_COLUMNS]
+
+
+def spend(db: Session, space_id: int, days: int = 7, group_by: str = "day") -> dict:
+    """Spend of a space over the last ``days`` UTC days, read from the rollups only."""
+    since = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+    column = GROUPS[group_by]
+    base = db.query(*_sums()).filter(UsageRollup.space_id == space_id, UsageRollup.day >= since)
+    rows = (
+        db.query(column.label("key"), *_sums())
+        .filter(UsageRollup.space_id == space_id, UsageRollup.day >= since)
+        .group_by(column)
+        .order_by(column)
+        .all()
+    )
+    return {
+        "since": since,
+        "group_by": group_by,
+        "totals": _totals(base.one()),
+        "rows": [{"key": str(row.key), **_totals(row)} for row in rows],
+    }
+
+
+@dataclass
+class BudgetStatus:
+    tokens_today: int
+    cost_today: float
+    token_budget: Optional[int]
+    cost_budget: Optional[float]
+    action: str
+
+    @property
+    def exceeded(self) -> bool:
+        return (self.token_budget is not None and self.tokens_today >= self.token_budget) or (
+            self.cost_budget is not None and self.cost_today >= self.cost_budget
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "tokens_today": self.tokens_today,
+            "cost_today": round(self.cost_today, 6),
+            "daily_token_budget": self.token_budget,
+            "daily_cost_budget": self.cost_budget,
+            "action": self.action,
+            "exceeded": self.exceeded,
+        }
+
+
+def budget_status(db: Session, space: Space) -> BudgetStatus:
+    """Today's spend of ``space`` against its daily budgets."""
+    tokens = cost = 0
+    if space.daily_token_budget is not None or space.daily_cost_budget is not None:
+        row = (
+            db.query(
+                func.sum(UsageRollup.prompt_tokens + UsageRollup.completion_tokens),
+                func.sum(UsageRollup.cost_usd),
+            )
+            .filter(UsageRollup.space_id == space.id, UsageRollup.day == _today())
+            .one()
+        )
+        tokens, cost = row[0] or 0, row[1] or 0.0
+    return BudgetStatus(
+        tokens_today=int(tokens),
+        cost_today=float(cost),
+        token_budget=space.daily_token_budget,
+        cost_budget=space.daily_cost_budget,
+        action=space.budget_action or "reject",
+    )
+
+
+def downgrade_chain() -> List[str]:
+    """``provider`` or ``provider:model`` entries used once a ``downgrade`` budget is spent."""
+    spec = os.getenv("BUDGET_DOWNGRADE_PROVIDERS", "ollama")
+    return [entry.strip() for entry in spec.split(",") if entry.strip()]
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from typing import Dict, FrozenSet, NamedTuple, Optional, Set
+
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from ..models import Agent, Artifact, Interaction, Space
+
+# Which per-collection counter each model bumps, besides ``Space.version``.
+_COLLECTION_COLUMNS = {
+    Artifact: "artifacts_version",
+    Agent: "agents_version",
+    Interaction: "interactions_version",
+    Space: None,
+}
+
+
+class SpaceVersions(NamedTuple):
+    version: int
+    artifacts: int
+    agents: int
+    interactions: int
+
+
+def space_versions(db: Session, space_id: int) -> Optional[SpaceVersions]:
+    """Change counters of a space, or ``None`` if it does not exist."""
+    row = (
+        db.query(
+            Space.version,
+            Space.artifacts_version,
+            Space.agents_version,
+            Space.interactions_version,
+        )
+        .filter(Space.id == space_id)
+        .first()
+    )
+    return SpaceVersions(*(value or 0 for value in row)) if row is not None else None
+
+
+def space_etag(versions: SpaceVersions, *parts: object) -> str:
+    """Weak ETag for a representation of a space built from ``versions``."""
+    return 'W/"space-' + "-".join(str(part) for part in (versions.version, *parts)) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(",")
+    )
+
+
+def _changed_collections(session: Session) -> Dict[int, Set[Optional[str]]]:
+    changes: Dict[int, Set[Optional[str]]] = {}
+
+    def record(instance, modified: bool) -> None:
+        model = type(instance)
+        if model not in _COLLECTION_COLUMNS or not modified:
+            return
+        space_id = instance.id if model is Space else instance.space_id
+        if space_id is not None:
+            changes.setdefault(space_id, set()).add(_COLLECTION_COLUMNS[model])
+
+    for instance in session.new:
+        # A new space starts at version 0; it has nothing to invalidate yet.
+        record(instance, not isinstance(instance, Space))
+    for instance in session.deleted:
+        record(instance, True)
+    for instance in session.dirty:
+        record(instance, session.is_modified(instance, include_collections=False))
+    return changes
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_space_versions(session: Session, _flush_context) -> None:
+    # new/dirty/deleted still describe what was just flushed at this point.
+    changes = _changed_collections(session)
+    if not changes:
+        return
+
+    table = Space.__table__
+    by_columns: Dict[FrozenSet[str], list] = {}
+    for space_id, columns in changes.items():
+        by_columns.setdefault(frozenset(c for c in columns if c), []).append(space_id)
+    connection = session.connection()
+    for columns, space_ids in by_columns.items():
+        values = {name: table.c[name] + 1 for name in ("version", *sorted(columns))}
+        connection.execute(
+            update(table).where(table.c.id.in_(sorted(space_ids))).values(**values)
+        )
+    session.info.setdefault("bumped_space_versions", set()).update(changes)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expire_bumped_versions(session: Session, _flush_context) -> None:
+    space_ids = session.info.pop("bumped_space_versions", None)
+    if not space_ids:
+        return
+    for instance in list(session.identity_map.values()):
+        if isinstance(instance, Space) and instance.id in space_ids:
+            session.expire(
+                instance,
+                ["version", "artifacts_version", "agents_version", "interactions_version"],
+            )
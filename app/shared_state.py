@@ -0,0 +1,440 @@
+"""State shared by every worker process of one deployment.
+
+Each uvicorn or gunicorn worker is a separate process. Anything kept in
+module globals (cache invalidation, rate-limit counters, job queues,
+pub/sub) would drift apart between them. Such state goes through a
+``SharedState`` backend instead:
+
+- ``memory``: plain in-process structures, for a single worker (the default).
+- ``sqlite:///path``: a small SQLite file in WAL mode, shared by every worker
+  on the host. It is the local stand-in for a Redis-style server.
+- ``module:Class``: any other ``SharedState`` implementation, e.g. one backed
+  by Redis, constructed without arguments.
+
+``SHARED_STATE`` picks the backend. When it is unset and ``WEB_CONCURRENCY``
+asks for more than one worker, ``sqlite:///./thinkspaces-state.db`` is used.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import importlib
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import ClassVar, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Messages kept per channel for late readers; older ones are trimmed.
+MESSAGE_RETENTION = 1_000
+# Expired keys (e.g. past rate-limit windows) are deleted on a write at most
+# this often, whether or not anyone reads them again.
+EXPIRED_PURGE_SECONDS = 60.0
+
+
+class RateLimited(RuntimeError):
+    """A caller went over its rate limit."""
+
+
+class SharedState(ABC):
+    """Key/value store with counters, job queues and a message log.
+
+    Values are strings. Message ids increase within a channel, so a reader
+    remembers the last id it saw and asks for anything newer.
+    """
+
+    # False when the state is private to this process (nothing to relay).
+    shared: ClassVar[bool] = True
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None: ...
+
+    @abstractmethod
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        """Set ``key`` unless it already holds a live value; ``True`` if set."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """Add ``amount`` to a counter and return it; ``ttl`` applies when it is created."""
+
+    @abstractmethod
+    def push(self, queue: str, item: str) -> None: ...
+
+    @abstractmethod
+    def pop(self, queue: str) -> Optional[str]:
+        """Oldest item of ``queue``, removed; each item goes to exactly one caller."""
+
+    @abstractmethod
+    def publish(self, channel: str, message: str) -> int:
+        """Append ``message`` to ``channel`` and return its id."""
+
+    @abstractmethod
+    def read(self, channel: str, after: int, limit: int = 100) -> List[Tuple[int, str]]:
+        """Messages of ``channel`` with an id above ``after``, oldest first."""
+
+    @abstractmethod
+    def last_id(self, channel: str) -> int: ...
+
+    def close(self) -> None:
+        pass
+
+    def generation(self, name: str) -> int:
+        """Current value of the ``name`` counter (0 if it was never bumped)."""
+        value = self.get(f"generation:{name}")
+        return int(value) if value else 0
+
+    def bump(self, name: str) -> int:
+        """Advance the ``name`` counter, telling other workers their copy is stale."""
+        return self.incr(f"generation:{name}")
+
+    @contextlib.contextmanager
+    def lock(self, name: str, ttl: float = 60.0, poll: float = 0.05) -> Iterator[None]:
+        """Hold ``name`` across workers. The lock lapses after ``ttl`` seconds
+        if its holder dies."""
+        key = f"lock:{name}"
+        while not self.add(key, str(os.getpid()), ttl):
+            time.sleep(poll)
+        try:
+            yield
+        finally:
+            self.delete(key)
+
+
+class MemoryState(SharedState):
+    """``SharedState`` private to this process."""
+
+    shared = False
+
+    def __init__(self) -> None:
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._queues: Dict[str, Deque[str]] = defaultdict(deque)
+        self._messages: Dict[str, Deque[Tuple[int, str]]] = defaultdict(
+            lambda: deque(maxlen=MESSAGE_RETENTION)
+        )
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.purge_seconds = EXPIRED_PURGE_SECONDS
+        self._next_purge = 0.0
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_seconds
+        expired = [
+            key
+            for key, (_, expires_at) in self._values.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            del self._values[key]
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._values[key]
+            return None
+        return value
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl is not None else None
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._purge_expired()
+            self._values[key] = (value, self._expiry(ttl))
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            self._purge_expired()
+            if self._live(key) is not None:
+                return False
+            self._values[key] = (value, self._expiry(ttl))
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            self._purge_expired()
+            current = self._live(key)
+            if current is None:
+                value, expires_at = amount, self._expiry(ttl)
+            else:
+                value, expires_at = int(current) + amount, self._values[key][1]
+            self._values[key] = (str(value), expires_at)
+            return value
+
+    def push(self, queue: str, item: str) -> None:
+        with self._lock:
+            self._queues[queue].append(item)
+
+    def pop(self, queue: str) -> Optional[str]:
+        with self._lock:
+            items = self._queues.get(queue)
+            return items.popleft() if items else None
+
+    def publish(self, channel: str, message: str) -> int:
+        with self._lock:
+            message_id = next(self._ids)
+            self._messages[channel].append((message_id, message))
+            return message_id
+
+    def read(self, channel: str, after: int, limit: int = 100) -> List[Tuple[int, str]]:
+        with self._lock:
+            newer = [entry for entry in self._messages.get(channel, ()) if entry[0] > after]
+        return newer[:limit]
+
+    def last_id(self, channel: str) -> int:
+        with self._lock:
+            messages = self._messages.get(channel)
+            return messages[-1][0] if messages else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+            self._queues.clear()
+            self._messages.clear()
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL);
+CREATE INDEX IF NOT EXISTS ix_kv_expires_at ON kv (expires_at);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, queue TEXT NOT NULL, payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_queue ON jobs (queue, id);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_messages_channel ON messages (channel, id);
+"""
+
+
+class SqliteState(SharedState):
+    """``SharedState`` in a SQLite file that several processes open at once.
+
+    Each thread gets its own connection. Read-modify-write operations run
+    in ``BEGIN IMMEDIATE`` transactions, which take the write lock up front,
+    so concurrent workers queue up instead of overwriting each other.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 30.0) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._published = 0
+        self.purge_seconds = EXPIRED_PURGE_SECONDS
+        self._next_purge = 0.0
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _purge_expired(self, connection: sqlite3.Connection) -> None:
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_seconds
+        connection.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+
+    @staticmethod
+    def _live(connection: sqlite3.Connection, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        row = connection.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl is not None else None
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._live(self._connection(), key)
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        connection = self._connection()
+        self._purge_expired(connection)
+        connection.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, self._expiry(ttl)),
+        )
+
+    def add(self, key: str, value: str, ttl: Optional[float] = None) -> bool:
+        with self._transaction() as connection:
+            self._purge_expired(connection)
+            if self._live(connection, key) is not None:
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, self._expiry(ttl)),
+            )
+            return True
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        with self._transaction() as connection:
+            self._purge_expired(connection)
+            row = self._live(connection, key)
+            if row is None:
+                value, expires_at = amount, self._expiry(ttl)
+            else:
+                value, expires_at = int(row[0]) + amount, row[1]
+            connection.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, str(value), expires_at),
+            )
+            return value
+
+    def push(self, queue: str, item: str) -> None:
+        self._connection().execute(
+            "INSERT INTO jobs (queue, payload) VALUES (?, ?)", (queue, item)
+        )
+
+    def pop(self, queue: str) -> Optional[str]:
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT id, payload FROM jobs WHERE queue = ? ORDER BY id LIMIT 1", (queue,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute("DELETE FROM jobs WHERE id = ?", (row[0],))
+            return row[1]
+
+    def publish(self, channel: str, message: str) -> int:
+        connection = self._connection()
+        message_id = connection.execute(
+            "INSERT INTO messages (channel, payload) VALUES (?, ?)", (channel, message)
+        ).lastrowid
+        self._published += 1
+        if self._published % 100 == 0:
+            connection.execute(
+                "DELETE FROM messages WHERE channel = ? AND id <= ?",
+                (channel, message_id - MESSAGE_RETENTION),
+            )
+        return message_id
+
+    def read(self, channel: str, after: int, limit: int = 100) -> List[Tuple[int, str]]:
+        return self._connection().execute(
+            "SELECT id, payload FROM messages WHERE channel = ? AND id > ? ORDER BY id LIMIT ?",
+            (channel, after, limit),
+        ).fetchall()
+
+    def last_id(self, channel: str) -> int:
+        row = self._connection().execute(
+            "SELECT MAX(id) FROM messages WHERE channel = ?", (channel,)
+        ).fetchone()
+        return row[0] or 0
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def create_shared_state(spec: str) -> SharedState:
+    """Backend for a ``SHARED_STATE`` value; see the module docstring."""
+    if spec in ("", "memory"):
+        return MemoryState()
+    if spec.startswith("sqlite:///"):
+        return SqliteState(spec[len("sqlite:///"):])
+    module_name, _, class_name = spec.partition(":")
+    if not class_name:
+        raise ValueError(f"Unknown shared state backend '{spec}'")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def _configured_spec() -> str:
+    spec = os.getenv("SHARED_STATE")
+    if spec is not None:
+        return spec
+    if int(os.getenv("WEB_CONCURRENCY", "1") or 1) > 1:
+        return "sqlite:///./thinkspaces-state.db"
+    return "memory"
+
+
+_state: Optional[SharedState] = None
+_state_lock = threading.Lock()
+
+
+def shared_state() -> SharedState:
+    """The process's backend, created from the environment on first use."""
+    global _state
+    with _state_lock:
+        if _state is None:
+            _state = create_shared_state(_configured_spec())
+        return _state
+
+
+def set_shared_state(state: Optional[SharedState]) -> Optional[SharedState]:
+    """Replace the backend (``None`` re-reads the environment); returns the old one."""
+    global _state
+    with _state_lock:
+        previous, _state = _state, state
+    return previous
+
+
+class RateLimiter:
+    """At most ``limit`` hits per key in each ``window_seconds`` window, across workers.
+
+    Fixed windows: the counter for a key starts over at each window
+    boundary. A ``limit`` of 0 disables the limiter.
+    """
+
+    def __init__(self, name: str, limit: int, window_seconds: float = 60.0) -> None:
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    def hit(self, key: object, state: Optional[SharedState] = None) -> bool:
+        """Count one hit for ``key``; ``False`` if it goes over the limit."""
+        if self.limit <= 0:
+            return True
+        window = int(time.time() // self.window_seconds)
+        count = (state or shared_state()).incr(
+            f"rate:{self.name}:{key}:{window}", ttl=self.window_seconds
+        )
+        return count <= self.limit
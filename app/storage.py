@@ -1,9 +1,12 @@
+import os
 from pathlib import Path
 from typing import Optional, Tuple
 from uuid import uuid4
 
 from fastapi import UploadFile
 
+from . import metrics
+
 UPLOAD_ROOT = Path("uploads")
 
 
@@ -21,12 +24,34 @@ async def save_upload(file: UploadFile) -> Tuple[str, str, str]:
 
     contents = await file.read()
     destination.write_bytes(contents)
+    metrics.upload_bytes.observe(len(contents))
 
     original_name = file.filename or stored_name
     mime_type = file.content_type or "application/octet-stream"
     return stored_name, original_name, mime_type
 
 
+TEXT_MIME_TYPES = {"application/json", "application/xml", "application/x-yaml"}
+
+
+def extract_text(stored_name: Optional[str], mime_type: Optional[str]) -> Optional[str]:
+    """Text of an uploaded file, if it is a text format; ``None`` otherwise.
+
+    Reads at most ``UPLOAD_TEXT_MAX_BYTES`` (default 1 MiB), decoded as UTF-8.
+    """
+    if not stored_name or not mime_type:
+        return None
+    mime_type = mime_type.split(";")[0].strip().lower()
+    if not (mime_type.startswith("text/") or mime_type in TEXT_MIME_TYPES):
+        return None
+    path = UPLOAD_ROOT / stored_name
+    if not path.is_file():
+        return None
+    with path.open("rb") as handle:
+        data = handle.read(int(os.getenv("UPLOAD_TEXT_MAX_BYTES", str(1024 * 1024))))
+    return data.decode("utf-8", errors="replace")
+
+
 def remove_upload(stored_name: Optional[str]) -> None:
     if not stored_name:
         return
@@ -0,0 +1,42 @@
+"""Closed-form artifact temperature.
+
+Temperature is a pure function of the time since an artifact was last
+accessed (or created), so it can be computed on read without any stored
+state and materialized in bulk by a single SQL statement.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+from typing import Optional
+
+HALF_LIFE_DAYS = 14.0
+DECAY_RATE = math.log(2) / HALF_LIFE_DAYS
+
+# Upper bounds (in days since last access) of each state, hottest first.
+STATE_THRESHOLDS = (("hot", 7.0), ("warm", 30.0), ("cool", 90.0))
+COLDEST_STATE = "frost"
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def age_in_days(last_seen: Optional[datetime], now: Optional[datetime] = None) -> float:
+    if last_seen is None:
+        return 0.0
+    now = _as_utc(now or datetime.now(timezone.utc))
+    return max(0.0, (now - _as_utc(last_seen)).total_seconds() / 86400)
+
+
+def temperature_for_age(age_days: float) -> float:
+    """Exponential decay from 1.0 at access time, halving every ``HALF_LIFE_DAYS``."""
+    return math.exp(-DECAY_RATE * max(age_days, 0.0))
+
+
+def state_for_age(age_days: float) -> str:
+    for state, upper_bound in STATE_THRESHOLDS:
+        if age_days < upper_bound:
+            return state
+    return COLDEST_STATE
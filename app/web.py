@@ -1,27 +1,96 @@
+import hashlib
 from typing import Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
-from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from sqlalchemy import or_
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm import Session, defer, selectinload
 
 from .db import get_db
 from .models import Agent, Artifact, Interaction, Space
+from .rendering import (
+    TEMPLATE_DIR,
+    artifact_card,
+    interaction_block,
+    interaction_context,
+    render_page,
+    templates,
+)
 from .schemas import AgentInteractionRequest
-from .services.agent_interaction import execute_agent_interaction, summarize_space_state
-from .nlp_utils import build_summary_and_tags
+from .services.agent_interaction import (
+    ClientDisconnected,
+    cancel_on_disconnect,
+    error_status,
+    execute_agent_interaction,
+    record_cancelled_interaction,
+    served_by,
+    summarize_space_state,
+)
+from .services.enrichment import discard_artifact, enrich_artifact
+from .services.events import event_bus, event_stream
+from .services.usage import BudgetExceeded, apply_usage
+from .services.versions import etag_matches, space_etag, space_versions
+from .shared_state import RateLimited
 from .storage import remove_upload, save_upload
 
-templates = Jinja2Templates(directory="app/templates")
+# Part of the space page ETag so a deploy with changed templates revalidates.
+_TEMPLATE_DIGEST = hashlib.sha1(
+    b"".join(path.read_bytes() for path in sorted(TEMPLATE_DIR.glob("*.html")))
+).hexdigest()[:8]
+
+# Interactions rendered per agent on the space page and per "load older" fetch.
+INTERACTION_PAGE_SIZE = 20
 
 router = APIRouter(prefix="/ui", tags=["ui"])
 
 
+def _wants_json(request: Request) -> bool:
+    """Whether a form post came from the page's scripts rather than a plain submit."""
+    return "application/json" in request.headers.get("accept", "")
+
+
+def _split_providers(value: Optional[str]) -> list[str]:
+    """Parse the comma-separated fallback providers field of the agent forms."""
+    return [entry.strip() for entry in (value or "").split(",") if entry.strip()]
+
+
+def _interaction_page(
+    db: Session, agent_id: int, before: Optional[int] = None, limit: int = INTERACTION_PAGE_SIZE
+) -> tuple[list[Interaction], Optional[int]]:
+    """Newest-first page of an agent's interactions and the cursor for the next one.
+
+    Pages are keyed on the id rather than offset, so turns added while the
+    user scrolls do not shift later pages. Context JSON is left unloaded; it
+    is fetched when a turn's context panel is opened.
+    """
+    query = (
+        db.query(Interaction)
+        .options(defer(Interaction.context_json))
+        .filter(Interaction.agent_id == agent_id)
+    )
+    if before is not None:
+        query = query.filter(Interaction.id < before)
+    rows = query.order_by(Interaction.id.desc()).limit(limit + 1).all()
+    page = rows[:limit]
+    return page, page[-1].id if len(rows) > limit else None
+
+
 @router.get("/spaces")
 def list_spaces(request: Request, db: Session = Depends(get_db)):
     spaces = db.query(Space).order_by(Space.created_at.desc()).all()
-    return templates.TemplateResponse(
+    return render_page(
         request,
         "spaces_list.html",
         {"spaces": spaces},
@@ -46,8 +115,17 @@ def space_detail(
     space_id: int,
     request: Request,
     search: Optional[str] = Query(default=None, alias="q"),
+    if_none_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
 ):
+    versions = space_versions(db, space_id)
+    if versions is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    etag = space_etag(versions, _TEMPLATE_DIGEST)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
     space = (
         db.query(Space)
         .options(selectinload(Space.artifacts), selectinload(Space.agents))
@@ -74,16 +152,9 @@ def space_detail(
             .all()
         )
 
-    interactions_by_agent: dict[int, list[Interaction]] = {}
-    for agent in space.agents:
-        interactions_by_agent[agent.id] = (
-            db.query(Interaction)
-            .filter(Interaction.agent_id == agent.id)
-            .order_by(Interaction.created_at.desc())
-            .all()
-        )
+    interactions_by_agent = {agent.id: _interaction_page(db, agent.id) for agent in space.agents}
 
-    return templates.TemplateResponse(
+    return render_page(
         request,
         "space_detail.html",
         {
@@ -92,12 +163,97 @@ def space_detail(
             "search_results": search_results,
             "interactions": interactions_by_agent,
         },
+        headers=headers,
+    )
+
+
+@router.get("/spaces/{space_id}/events")
+async def space_events(
+    space_id: int,
+    last_event_id: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    """Server-sent events for changes to a space's artifacts and interactions.
+
+    The page patches itself from the fragment endpoints below as events
+    arrive, instead of reloading and re-rendering the whole space.
+    """
+    if db.query(Space.id).filter(Space.id == space_id).first() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
+    subscription = event_bus.subscribe(space_id)
+    return StreamingResponse(
+        event_stream(subscription, resume=last_event_id is not None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/spaces/{space_id}/artifacts/{artifact_id}/fragment")
+def artifact_fragment(space_id: int, artifact_id: int, db: Session = Depends(get_db)):
+    artifact = (
+        db.query(Artifact)
+        .filter(Artifact.id == artifact_id, Artifact.space_id == space_id)
+        .first()
     )
+    if artifact is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artifact not found")
+    return HTMLResponse(artifact_card(artifact))
+
+
+@router.get("/spaces/{space_id}/interactions/{interaction_id}/fragment")
+def interaction_fragment(space_id: int, interaction_id: int, db: Session = Depends(get_db)):
+    interaction = (
+        db.query(Interaction)
+        .filter(Interaction.id == interaction_id, Interaction.space_id == space_id)
+        .first()
+    )
+    if interaction is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Interaction not found")
+    return HTMLResponse(interaction_block(interaction))
+
+
+@router.get("/spaces/{space_id}/agents/{agent_id}/interactions")
+def agent_interactions_fragment(
+    space_id: int,
+    agent_id: int,
+    before: Optional[int] = Query(default=None),
+    limit: int = Query(default=INTERACTION_PAGE_SIZE, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    """An older page of an agent's conversation, loaded as the user scrolls."""
+    agent = (
+        db.query(Agent.id)
+        .filter(Agent.id == agent_id, Agent.space_id == space_id)
+        .first()
+    )
+    if agent is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
+    page, next_before = _interaction_page(db, agent_id, before, limit)
+    return HTMLResponse(
+        templates.env.get_template("_interaction_page.html").render(
+            page=page, next_before=next_before, space_id=space_id, agent_id=agent_id
+        )
+    )
+
+
+@router.get("/spaces/{space_id}/interactions/{interaction_id}/context")
+def interaction_context_fragment(
+    space_id: int, interaction_id: int, db: Session = Depends(get_db)
+):
+    interaction = (
+        db.query(Interaction)
+        .filter(Interaction.id == interaction_id, Interaction.space_id == space_id)
+        .first()
+    )
+    if interaction is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Interaction not found")
+    return HTMLResponse(interaction_context(interaction))
 
 
 @router.post("/spaces/{space_id}/artifacts")
 async def create_artifact(
     space_id: int,
+    request: Request,
     title: str = Form(...),
     content: str | None = Form(default=None),
     file: Optional[UploadFile] = File(default=None),
@@ -119,11 +275,11 @@ async def create_artifact(
         file_path=stored_name,
         mime_type=mime_type,
     )
-    summary, tags = build_summary_and_tags(title, content or "")
-    artifact.summary = summary or None
-    artifact.tags = tags
+    enrich_artifact(artifact, db)
     db.add(artifact)
     db.commit()
+    if _wants_json(request):
+        return {"success": True, "artifact_id": artifact.id}
     return RedirectResponse(
         url=f"/ui/spaces/{space_id}", status_code=status.HTTP_303_SEE_OTHER
     )
@@ -133,6 +289,7 @@ async def create_artifact(
 def update_artifact(
     space_id: int,
     artifact_id: int,
+    request: Request,
     title: str = Form(...),
     content: str | None = Form(default=None),
     db: Session = Depends(get_db),
@@ -147,17 +304,19 @@ def update_artifact(
 
     artifact.title = title
     artifact.content = content
-    summary, tags = build_summary_and_tags(title, content or "")
-    artifact.summary = summary or None
-    artifact.tags = tags
+    enrich_artifact(artifact, db)
     db.commit()
+    if _wants_json(request):
+        return {"success": True, "artifact_id": artifact.id}
     return RedirectResponse(
         url=f"/ui/spaces/{space_id}", status_code=status.HTTP_303_SEE_OTHER
     )
 
 
 @router.post("/spaces/{space_id}/artifacts/{artifact_id}/delete")
-def delete_artifact(space_id: int, artifact_id: int, db: Session = Depends(get_db)):
+def delete_artifact(
+    space_id: int, artifact_id: int, request: Request, db: Session = Depends(get_db)
+):
     artifact = (
         db.query(Artifact)
         .filter(Artifact.id == artifact_id, Artifact.space_id == space_id)
@@ -167,8 +326,11 @@ def delete_artifact(space_id: int, artifact_id: int, db: Session = Depends(get_d
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Artifact not found")
 
     remove_upload(artifact.file_path)
+    discard_artifact(artifact, db)
     db.delete(artifact)
     db.commit()
+    if _wants_json(request):
+        return {"success": True, "artifact_id": artifact_id}
     return RedirectResponse(
         url=f"/ui/spaces/{space_id}", status_code=status.HTTP_303_SEE_OTHER
     )
@@ -201,16 +363,13 @@ def save_interaction_as_artifact(
     )
 
     # Generate summary and tags
-    summary, tags = build_summary_and_tags(title, content)
-    artifact.summary = summary or None
-    artifact.tags = tags
+    enrich_artifact(artifact, db)
 
     db.add(artifact)
     db.commit()
     db.refresh(artifact)
 
-    # Check if AJAX request
-    if request.headers.get("accept") == "application/json" or "application/json" in request.headers.get("accept", ""):
+    if _wants_json(request):
         return {
             "success": True,
             "artifact_id": artifact.id,
@@ -230,6 +389,7 @@ def create_agent(
     provider: str = Form("echo"),
     description: str | None = Form(default=None),
     system_prompt: str | None = Form(default=None),
+    fallback_providers: str | None = Form(default=None),
     db: Session = Depends(get_db),
 ):
     space = db.query(Space).filter(Space.id == space_id).first()
@@ -245,6 +405,7 @@ def create_agent(
         provider=provider,
         description=description,
         system_prompt=clean_system_prompt,
+        fallback_providers=_split_providers(fallback_providers),
     )
     db.add(agent)
     db.commit()
@@ -262,6 +423,7 @@ def update_agent_ui(
     provider: str = Form(...),
     description: str | None = Form(default=None),
     system_prompt: str | None = Form(default=None),
+    fallback_providers: str | None = Form(default=None),
     db: Session = Depends(get_db),
 ):
     agent = (
@@ -279,6 +441,7 @@ def update_agent_ui(
     agent.provider = provider
     agent.description = description
     agent.system_prompt = clean_system_prompt
+    agent.fallback_providers = _split_providers(fallback_providers)
     db.commit()
     return RedirectResponse(
         url=f"/ui/spaces/{space_id}", status_code=status.HTTP_303_SEE_OTHER
@@ -299,7 +462,12 @@ async def summarize_space_ui(
     if agent is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found")
 
-    summary = await summarize_space_state(agent, db)
+    try:
+        summary = await summarize_space_state(agent, db)
+    except BudgetExceeded as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=error_status(exc), detail=str(exc))
     space = db.query(Space).filter(Space.id == space_id).first()
     if space is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Space not found")
@@ -355,21 +523,29 @@ async def chat_with_agent(
     )
 
     try:
-        output, metadata, artifacts_ctx, history_ctx, system_prompt_used = await execute_agent_interaction(
-            agent, payload, db
+        output, metadata, artifacts_ctx, history_ctx, system_prompt_used = await cancel_on_disconnect(
+            request.receive, execute_agent_interaction(agent, payload, db)
         )
+    except ClientDisconnected:
+        # Nobody is waiting for the answer; keep the prompt, marked cancelled.
+        record_cancelled_interaction(db, agent, prompt)
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except (BudgetExceeded, RateLimited) as exc:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(exc))
     except RuntimeError as exc:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+        raise HTTPException(status_code=error_status(exc), detail=str(exc))
 
+    provider, model = served_by(metadata, agent)
     interaction = Interaction(
         agent_id=agent.id,
         space_id=space_id,
         prompt=prompt,
         system_prompt=system_prompt_used,
         response=output,
-        provider=agent.provider,
-        model=agent.model,
+        provider=provider,
+        model=model,
     )
+    apply_usage(interaction, metadata)
     interaction.context = {
         "artifacts": artifacts_ctx,
         "history": history_ctx,
@@ -379,11 +555,11 @@ async def chat_with_agent(
     db.add(interaction)
     db.commit()
 
-    # Check if this is an AJAX request
-    if request.headers.get("accept") == "application/json" or "application/json" in request.headers.get("accept", ""):
+    if _wants_json(request):
         return {
+            "interaction_id": interaction.id,
             "output": output,
-            "provider": agent.provider,
+            "provider": provider,
             "metadata": metadata,
             "context": {
                 "artifacts": artifacts_ctx,
@@ -0,0 +1 @@
+"""Performance benchmarks for Think Spaces (run with ``python -m pytest benchmarks``)."""
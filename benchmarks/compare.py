@@ -0,0 +1,49 @@
+"""Compare two benchmark reports: ``python -m benchmarks.compare OLD NEW``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+
+def load(path: str) -> dict:
+    report = json.loads(Path(path).read_text())
+    return {item["name"]: item["stats"] for item in report["benchmarks"]}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Percent change in median flagged as a regression or improvement.",
+    )
+    args = parser.parse_args(argv)
+
+    old, new = load(args.old), load(args.new)
+    print(f"{'scenario':40} {'old ms':>10} {'new ms':>10} {'change':>9}")
+    regressions = 0
+    for name in sorted(old.keys() | new.keys()):
+        if name not in old or name not in new:
+            state = "added" if name in new else "removed"
+            print(f"{name:40} {'':>10} {'':>10} {state:>9}")
+            continue
+        before = old[name]["median"] * 1000
+        after = new[name]["median"] * 1000
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  slower"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:40} {before:10.2f} {after:10.2f} {change:+8.1f}%{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
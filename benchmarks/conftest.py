@@ -0,0 +1,179 @@
+"""Fixtures and JSON reporting for the benchmark suite.
+
+Run with ``python -m pytest benchmarks``. Scenarios call the ``benchmark``
+fixture the same way pytest-benchmark does (``benchmark(fn, *args)``); the
+timings of every scenario are written to ``--bench-json`` (default
+``bench_report.json``) so reports from two commits can be compared with
+``python -m benchmarks.compare``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Generator
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.db import get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Base  # noqa: E402
+from benchmarks.synthetic import SCALES, Workspace, generate_workspace  # noqa: E402
+
+_RESULTS: list[dict[str, Any]] = []
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    group = parser.getgroup("think-spaces benchmarks")
+    group.addoption(
+        "--bench-json",
+        default="bench_report.json",
+        help="Where to write the benchmark JSON report.",
+    )
+    group.addoption(
+        "--bench-scale",
+        default=os.getenv("BENCH_SCALE", "small"),
+        choices=sorted(SCALES),
+        help="Synthetic dataset size.",
+    )
+    group.addoption(
+        "--bench-rounds",
+        type=int,
+        default=int(os.getenv("BENCH_ROUNDS", "20")),
+        help="Timed rounds per scenario.",
+    )
+
+
+class Benchmark:
+    """Time a callable over several rounds after a short warm-up."""
+
+    def __init__(self, name: str, rounds: int, warmup: int = 2) -> None:
+        self.name = name
+        self.rounds = rounds
+        self.warmup = warmup
+        self.stats: dict[str, float] | None = None
+        self.extra_info: dict[str, Any] = {}
+
+    def __call__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        result = None
+        for _ in range(self.warmup):
+            result = fn(*args, **kwargs)
+
+        timings = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+
+        self.stats = {
+            "rounds": len(timings),
+            "min": min(timings),
+            "max": max(timings),
+            "mean": statistics.fmean(timings),
+            "median": statistics.median(timings),
+            "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+            "ops": len(timings) / sum(timings) if sum(timings) else 0.0,
+        }
+        return result
+
+
+@pytest.fixture
+def benchmark(request: pytest.FixtureRequest) -> Generator[Benchmark, None, None]:
+    bench = Benchmark(request.node.name, request.config.getoption("--bench-rounds"))
+    yield bench
+    if bench.stats is not None:
+        _RESULTS.append(
+            {"name": bench.name, "stats": bench.stats, "extra_info": bench.extra_info}
+        )
+
+
+@pytest.fixture(scope="session")
+def bench_engine(tmp_path_factory: pytest.TempPathFactory):
+    """File-backed SQLite database filled once per session with synthetic data."""
+    path = tmp_path_factory.mktemp("bench") / "bench.db"
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}, future=True
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def bench_sessionmaker(bench_engine):
+    return sessionmaker(bind=bench_engine, autoflush=False, autocommit=False, future=True)
+
+
+@pytest.fixture(scope="session")
+def workspace(bench_sessionmaker, pytestconfig) -> Workspace:
+    scale = SCALES[pytestconfig.getoption("--bench-scale")]
+    with bench_sessionmaker() as db:
+        return generate_workspace(db, scale)
+
+
+@pytest.fixture
+def db(bench_sessionmaker, workspace) -> Generator[Session, None, None]:
+    session = bench_sessionmaker()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def bench_client(bench_sessionmaker, workspace) -> Generator[TestClient, None, None]:
+    def override_get_db() -> Generator:
+        session = bench_sessionmaker()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+def _git_revision() -> str | None:
+    try:
+        return (
+            subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout.strip()
+            or None
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    if not _RESULTS:
+        return
+    config = session.config
+    report = {
+        "commit": _git_revision(),
+        "scale": config.getoption("--bench-scale"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": sorted(_RESULTS, key=lambda item: item["name"]),
+    }
+    Path(config.getoption("--bench-json")).write_text(
+        json.dumps(report, indent=2, sort_keys=True) + "\n"
+    )
@@ -0,0 +1,250 @@
+"""Open-loop load generator for ``/agents/{id}/interact``.
+
+Requests are fired on a fixed schedule (``--rps``) whether or not earlier
+ones have finished, and latency is measured from each request's scheduled
+start, so a slow server shows up as latency instead of silently lowering the
+offered load.
+
+Against a running server::
+
+    SIMULATED_TTFT_SECONDS=0.4 uvicorn app.main:app
+    python -m benchmarks.loadgen --base-url http://localhost:8000 --rps 20 --duration 30
+
+Or fully in-process against a temporary SQLite file, which also reports
+database write timings and ``database is locked`` errors::
+
+    python -m benchmarks.loadgen --in-process --rps 20 --duration 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Generator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+WRITE_PREFIXES = ("INSERT", "UPDATE", "DELETE")
+
+
+@dataclass
+class DatabaseProbe:
+    """Times write statements and counts SQLite lock errors on an engine."""
+
+    write_seconds: list[float] = field(default_factory=list)
+    lock_errors: int = 0
+
+    def attach(self, engine: Engine) -> None:
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("loadgen_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _stop(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["loadgen_started"].pop()
+            if statement.lstrip().upper().startswith(WRITE_PREFIXES):
+                self.write_seconds.append(time.perf_counter() - started)
+
+        @event.listens_for(engine, "handle_error")
+        def _error(context):
+            # No connection when the error happened while connecting.
+            if context.connection is not None:
+                started = context.connection.info.get("loadgen_started")
+                if started:
+                    started.pop()
+            if "database is locked" in str(context.original_exception):
+                self.lock_errors += 1
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "write_statements": len(self.write_seconds),
+            "write_p95_ms": percentile(self.write_seconds, 95) * 1000,
+            "write_max_ms": max(self.write_seconds, default=0.0) * 1000,
+            "lock_errors": self.lock_errors,
+        }
+
+
+@dataclass
+class Result:
+    latency: float
+    status: Optional[int]
+    error: Optional[str] = None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def _one_request(
+    client: httpx.AsyncClient, agent_id: int, scheduled: float, payload: dict
+) -> Result:
+    try:
+        response = await client.post(f"/agents/{agent_id}/interact", json=payload)
+    except httpx.HTTPError as exc:
+        return Result(time.perf_counter() - scheduled, None, type(exc).__name__)
+    error = None
+    if response.status_code != 200:
+        try:
+            error = str(response.json().get("detail"))[:80]
+        except ValueError:
+            error = response.text[:80]
+    return Result(time.perf_counter() - scheduled, response.status_code, error)
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    agent_ids: list[int],
+    rps: float,
+    duration: float,
+    context_limit: int = 5,
+) -> dict[str, Any]:
+    """Drive ``rps`` requests per second for ``duration`` seconds and summarize."""
+    total = max(1, int(rps * duration))
+    start = time.perf_counter()
+    tasks = []
+    for index in range(total):
+        scheduled = start + index / rps
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        payload = {"prompt": f"Load test prompt {index}", "context_limit": context_limit}
+        agent_id = agent_ids[index % len(agent_ids)]
+        tasks.append(asyncio.create_task(_one_request(client, agent_id, scheduled, payload)))
+
+    results = await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    ok = [r.latency for r in results if r.status == 200]
+    all_latencies = [r.latency for r in results]
+    return {
+        "offered_rps": rps,
+        "requests": total,
+        "succeeded": len(ok),
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "status_counts": dict(Counter(str(r.status) for r in results)),
+        "errors": dict(Counter(r.error for r in results if r.error).most_common(10)),
+        "latency_ms": {
+            "p50": percentile(all_latencies, 50) * 1000,
+            "p90": percentile(all_latencies, 90) * 1000,
+            "p95": percentile(all_latencies, 95) * 1000,
+            "p99": percentile(all_latencies, 99) * 1000,
+            "max": max(all_latencies, default=0.0) * 1000,
+        },
+    }
+
+
+async def _create_agents(client: httpx.AsyncClient, count: int, provider: str) -> list[int]:
+    space = await client.post("/spaces/", json={"name": f"Load test {time.time_ns()}"})
+    space.raise_for_status()
+    space_id = space.json()["id"]
+    for index in range(5):
+        await client.post(
+            "/artifacts/",
+            json={
+                "space_id": space_id,
+                "title": f"Load note {index}",
+                "content": "Context for simulated load testing of agent chat.",
+            },
+        )
+    agent_ids = []
+    for index in range(count):
+        agent = await client.post(
+            "/agents/",
+            json={
+                "space_id": space_id,
+                "name": f"Load agent {index}",
+                "model": provider,
+                "provider": provider,
+            },
+        )
+        agent.raise_for_status()
+        agent_ids.append(agent.json()["id"])
+    return agent_ids
+
+
+async def _main(args: argparse.Namespace) -> dict[str, Any]:
+    probe: Optional[DatabaseProbe] = None
+    if args.in_process:
+        from app.db import get_db
+        from app.main import app
+        from app.models import Base
+
+        db_path = Path(tempfile.mkdtemp(prefix="loadgen-")) / "load.db"
+        engine = create_engine(
+            f"sqlite:///{db_path}", connect_args={"check_same_thread": False}, future=True
+        )
+        Base.metadata.create_all(bind=engine)
+        probe = DatabaseProbe()
+        probe.attach(engine)
+        LoadSession = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+        def override_get_db() -> Generator:
+            db = LoadSession()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadgen", timeout=None)
+    else:
+        limits = httpx.Limits(max_connections=args.max_connections)
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=None, limits=limits)
+
+    async with client:
+        agent_ids = args.agent_id or await _create_agents(client, args.agents, args.provider)
+        report = await run_load(client, agent_ids, args.rps, args.duration, args.context_limit)
+
+    if probe is not None:
+        report["database"] = probe.summary()
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", default="http://localhost:8000")
+    target.add_argument("--in-process", action="store_true")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--agent-id",
+        type=int,
+        action="append",
+        help="Existing agent(s) to target; a space with new agents is created otherwise.",
+    )
+    parser.add_argument("--agents", type=int, default=4, help="Agents to create.")
+    parser.add_argument("--provider", default="simulated")
+    parser.add_argument("--context-limit", type=int, default=5)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", help="Also write the report here.")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_main(args))
+    text = json.dumps(report, indent=2, sort_keys=True)
+    print(text)
+    if args.json_path:
+        Path(args.json_path).write_text(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+"""Deterministic synthetic data for Think Spaces benchmarks."""
+
+from __future__ import annotations
+
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.models import Agent, Artifact, Interaction, Space
+from app.services.enrichment import enrich_artifact
+
+VOCABULARY = (
+    "design research prototype interview insight roadmap metric experiment "
+    "hypothesis customer onboarding retention pricing launch feedback sketch "
+    "architecture database latency caching pipeline embedding retrieval "
+    "summary agent memory context bloom entropy garden compost harvest soil "
+    "seedling budget invoice forecast spreadsheet quarter revenue hiring "
+    "culture meeting agenda decision tradeoff constraint workshop canvas "
+    "typography palette layout grid motion illustration narrative chapter "
+    "character dialogue outline draft revision publish audience newsletter"
+).split()
+
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Dataset dimensions for one benchmark run."""
+
+    spaces: int = 2
+    artifacts_per_space: int = 200
+    agents_per_space: int = 2
+    interactions_per_agent: int = 200
+    median_artifact_words: int = 120
+    seed: int = 1234
+
+
+SCALES = {
+    "small": Scale(),
+    "medium": Scale(artifacts_per_space=1_000, interactions_per_agent=1_000),
+    "large": Scale(
+        spaces=4,
+        artifacts_per_space=5_000,
+        agents_per_space=4,
+        interactions_per_agent=2_500,
+    ),
+}
+
+
+@dataclass
+class Workspace:
+    """Identifiers of the rows created by :func:`generate_workspace`."""
+
+    space_ids: List[int] = field(default_factory=list)
+    artifact_ids: List[int] = field(default_factory=list)
+    agent_ids: List[int] = field(default_factory=list)
+
+
+def make_text(rng: random.Random, words: int) -> str:
+    """Return ``words`` vocabulary words grouped into sentences."""
+    sentences = []
+    remaining = max(words, 1)
+    while remaining:
+        length = min(remaining, rng.randint(6, 18))
+        sentence = " ".join(rng.choice(VOCABULARY) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+
+def artifact_length(rng: random.Random, median_words: int) -> int:
+    """Heavy-tailed document length: most notes are short, a few are long."""
+    return max(3, int(rng.lognormvariate(0, 1) * median_words))
+
+
+def generate_workspace(db: Session, scale: Scale) -> Workspace:
+    """Populate ``db`` with spaces, artifacts, agents and interaction histories."""
+    rng = random.Random(scale.seed)
+    workspace = Workspace()
+
+    for space_index in range(scale.spaces):
+        space = Space(
+            name=f"Bench space {space_index}",
+            description=make_text(rng, 12),
+        )
+        db.add(space)
+        db.flush()
+        workspace.space_ids.append(space.id)
+
+        for artifact_index in range(scale.artifacts_per_space):
+            words = artifact_length(rng, scale.median_artifact_words)
+            artifact = Artifact(
+                space_id=space.id,
+                title=f"{rng.choice(VOCABULARY).title()} note {artifact_index}",
+                content=make_text(rng, words),
+                created_at=EPOCH + timedelta(minutes=artifact_index),
+            )
+            enrich_artifact(artifact, db)
+            db.add(artifact)
+            db.flush()
+            workspace.artifact_ids.append(artifact.id)
+
+        for agent_index in range(scale.agents_per_space):
+            agent = Agent(
+                space_id=space.id,
+                name=f"Agent {agent_index}",
+                model="echo",
+                provider="echo",
+            )
+            db.add(agent)
+            db.flush()
+            workspace.agent_ids.append(agent.id)
+
+            for turn in range(scale.interactions_per_agent):
+                prompt = make_text(rng, rng.randint(5, 40))
+                interaction = Interaction(
+                    agent_id=agent.id,
+                    space_id=space.id,
+                    prompt=prompt,
+                    response=make_text(rng, rng.randint(20, 200)),
+                    provider="echo",
+                    model="echo",
+                    created_at=EPOCH + timedelta(minutes=turn),
+                )
+                interaction.context_json = json.dumps(
+                    {
+                        "artifacts": [
+                            {"title": f"note {i}", "summary": make_text(rng, 10), "tags": []}
+                            for i in range(3)
+                        ],
+                        "history": [],
+                        "system_prompt": None,
+                    }
+                )
+                db.add(interaction)
+
+        db.commit()
+
+    return workspace
+
+
+def planted_partition_edges(
+    edge_count: int, community_size: int = 10, noise: float = 0.1, seed: int = 1234
+) -> List[tuple[int, int, float]]:
+    """Weighted edges of dense communities joined by sparse random links.
+
+    Each community is a clique of ``community_size`` nodes; a ``noise`` share
+    of the edges connect random nodes across communities.
+    """
+    rng = random.Random(seed)
+    per_community = community_size * (community_size - 1) // 2
+    communities = max(1, int(edge_count * (1 - noise)) // per_community)
+    edges: List[tuple[int, int, float]] = []
+    for community in range(communities):
+        base = community * community_size
+        for a in range(community_size):
+            for b in range(a + 1, community_size):
+                edges.append((base + a, base + b, round(rng.uniform(0.4, 0.9), 3)))
+    nodes = communities * community_size
+    while len(edges) < edge_count:
+        a, b = rng.randrange(nodes), rng.randrange(nodes)
+        if a != b:
+            edges.append((min(a, b), max(a, b), round(rng.uniform(0.2, 0.4), 3)))
+    return edges
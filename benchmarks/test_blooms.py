@@ -0,0 +1,38 @@
+import pytest
+
+from app.services.blooms import CommunityIndex
+from benchmarks.synthetic import planted_partition_edges
+
+
+@pytest.fixture(scope="module", params=[10_000, 100_000], ids=["10k", "100k"])
+def graph_edges(request):
+    return planted_partition_edges(request.param)
+
+
+def _build(edges):
+    index = CommunityIndex()
+    for a, b, weight in edges:
+        index.add_edge(a, b, weight)
+    return index, index.evaluate_dirty()
+
+
+def test_bloom_full_detection(benchmark, graph_edges):
+    benchmark.rounds = min(benchmark.rounds, 3)
+    benchmark.warmup = 0
+    _, communities = benchmark(_build, graph_edges)
+    assert sum(1 for community in communities if community.bloom) > 0
+    benchmark.extra_info["edges"] = len(graph_edges)
+
+
+def test_bloom_incremental_update(benchmark, graph_edges):
+    index, _ = _build(graph_edges)
+    a, b, weight = graph_edges[0]
+
+    def churn():
+        index.remove_edge(a, b)
+        index.add_edge(a, b, weight)
+        return index.evaluate_dirty()
+
+    communities = benchmark(churn)
+    assert communities
+    benchmark.extra_info["edges"] = len(graph_edges)
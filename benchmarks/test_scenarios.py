@@ -0,0 +1,99 @@
+import asyncio
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+from app.models import Agent, Artifact
+from app.services.agent_interaction import _build_context
+from app.services.cross_space import run_cross_space_scan
+from app.services.enrichment import enrich_artifact
+from app.services.temperature import access_tracker, refresh_thermal_state
+from benchmarks.synthetic import make_text
+
+
+def test_search_artifacts(benchmark, bench_client, workspace):
+    space_id = workspace.space_ids[0]
+    response = benchmark(
+        bench_client.get,
+        "/artifacts/search",
+        params={"q": "retrieval", "space_id": space_id, "limit": 20},
+    )
+    assert response.status_code == 200
+
+
+def test_list_artifacts_by_tag(benchmark, bench_client, workspace):
+    space_id = workspace.space_ids[0]
+    response = benchmark(
+        bench_client.get,
+        "/artifacts",
+        params={"space_id": space_id, "tag": ["design", "latency"], "tag_mode": "any"},
+    )
+    assert response.status_code == 200
+
+
+def test_space_detail_render(benchmark, bench_client, workspace):
+    response = benchmark(bench_client.get, f"/ui/spaces/{workspace.space_ids[0]}")
+    assert response.status_code == 200
+    benchmark.extra_info["bytes"] = len(response.content)
+
+
+def test_build_context(benchmark, db, workspace):
+    agent = db.get(Agent, workspace.agent_ids[0])
+    prompt = "What did we learn about retrieval latency?"
+    context = benchmark(lambda: asyncio.run(_build_context(agent, 10, db, prompt)))
+    assert len(context) == 10
+
+
+def test_enrich_long_artifact(benchmark, db, workspace):
+    text = make_text(random.Random(7), 5_000)
+    artifact = Artifact(space_id=workspace.space_ids[0], title="Long read", content=text)
+
+    def enrich() -> None:
+        artifact.terms = None
+        enrich_artifact(artifact, db)
+
+    benchmark(enrich)
+    assert artifact.tags
+
+
+def test_echo_chat_round_trip(benchmark, bench_client, workspace):
+    agent_id = workspace.agent_ids[-1]
+    response = benchmark(
+        bench_client.post,
+        f"/agents/{agent_id}/interact",
+        json={"prompt": "Summarize the design feedback", "context_limit": 5},
+    )
+    assert response.status_code == 200
+
+
+def test_thermal_refresh(benchmark, db, workspace):
+    access_tracker.touch(db, workspace.artifact_ids[::3])
+    benchmark(refresh_thermal_state, db)
+    benchmark.extra_info["artifacts"] = len(workspace.artifact_ids)
+
+
+def test_cross_space_scan(benchmark, db, workspace, tmp_path):
+    result = benchmark(run_cross_space_scan, db, workers=1, checkpoint_dir=tmp_path / "scan")
+    benchmark.extra_info["artifacts"] = result.artifacts
+    benchmark.extra_info["candidates"] = result.candidates
+
+
+def test_cold_start_import(benchmark):
+    """A fresh interpreter importing the app, as every worker does on boot."""
+    root = Path(__file__).resolve().parents[1]
+    benchmark(subprocess.run, [sys.executable, "-c", "import app.main"], cwd=root, check=True)
+    importtime = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    cumulative = {
+        line.split("|")[2].strip(): int(line.split("|")[1])
+        for line in importtime.splitlines()
+        if line.count("|") == 2 and line.split("|")[1].strip().isdigit()
+    }
+    benchmark.extra_info["app_main_import_us"] = cumulative.get("app.main")
+    benchmark.extra_info["openai_imported"] = "openai" in cumulative
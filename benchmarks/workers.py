@@ -0,0 +1,169 @@
+"""Throughput of ``/agents/{id}/interact`` with 1, 2, 4... uvicorn workers.
+
+Each run starts ``uvicorn app.main:app --workers N`` on a fresh SQLite
+database (WAL mode) with a shared SQLite state file, then keeps
+``--concurrency`` requests in flight for ``--duration`` seconds (closed
+loop: a new request starts as soon as one finishes)::
+
+    python -m benchmarks.workers --workers 1 2 4 --concurrency 12 --duration 15
+
+Speedup is each run's throughput over the first run's. It is bounded by the
+host's cores (``os.cpu_count()`` is reported alongside) and, for writes, by
+SQLite's single writer. Keep ``--concurrency`` under a worker's connection
+pool (15 by default): an interaction holds its connection until it ends.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from .loadgen import _create_agents, percentile
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(workers: int, port: int, directory: Path, provider_env: dict) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        **provider_env,
+        "DATABASE_URL": f"sqlite:///{directory / 'app.db'}",
+        "SHARED_STATE": f"sqlite:///{directory / 'state.db'}",
+        "SQLITE_JOURNAL_MODE": os.getenv("SQLITE_JOURNAL_MODE", "wal"),
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--workers", str(workers), "--port", str(port), "--log-level", "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+async def _wait_healthy(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("Server did not become healthy")
+        await asyncio.sleep(0.2)
+
+
+async def closed_loop(
+    client: httpx.AsyncClient, agent_ids: list[int], concurrency: int, duration: float
+) -> dict[str, Any]:
+    """Keep ``concurrency`` requests in flight for ``duration`` seconds."""
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def user(index: int) -> None:
+        count = 0
+        while time.perf_counter() < deadline:
+            agent_id = agent_ids[(index + count) % len(agent_ids)]
+            payload = {"prompt": f"Worker benchmark prompt {index}-{count}", "context_limit": 5}
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"/agents/{agent_id}/interact", json=payload)
+                statuses[str(response.status_code)] += 1
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError as exc:
+                statuses[type(exc).__name__] += 1
+            count += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "succeeded": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "status_counts": dict(statuses),
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+        },
+    }
+
+
+async def run_workers(workers: int, args: argparse.Namespace) -> dict[str, Any]:
+    port = _free_port()
+    directory = Path(tempfile.mkdtemp(prefix=f"workers-{workers}-"))
+    provider_env = {"SIMULATED_TTFT_SECONDS": str(args.ttft), "SIMULATED_TOKENS_PER_SECOND": "0"}
+    server = _start_server(workers, port, directory, provider_env)
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits
+        ) as client:
+            await _wait_healthy(client)
+            agent_ids = await _create_agents(client, args.agents, args.provider)
+            await closed_loop(client, agent_ids, args.concurrency, args.warmup)
+            report = await closed_loop(client, agent_ids, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"workers": workers, **report}
+
+
+async def _main(args: argparse.Namespace) -> dict[str, Any]:
+    runs = [await run_workers(workers, args) for workers in args.workers]
+    baseline = runs[0]["throughput_rps"] or 1.0
+    for run in runs:
+        run["speedup"] = run["throughput_rps"] / baseline
+    return {
+        "cpu_count": os.cpu_count(),
+        "provider": args.provider,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "runs": runs,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--agents", type=int, default=4)
+    parser.add_argument("--provider", default="echo")
+    parser.add_argument(
+        "--ttft", type=float, default=0.0, help="SIMULATED_TTFT_SECONDS for --provider simulated."
+    )
+    parser.add_argument("--json", dest="json_path", help="Also write the report here.")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_main(args))
+    text = json.dumps(report, indent=2, sort_keys=True)
+    print(text)
+    if args.json_path:
+        Path(args.json_path).write_text(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
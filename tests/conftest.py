@@ -11,8 +11,16 @@ from sqlalchemy.pool import StaticPool
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app.db import get_db  # noqa: E402
+from app.llm.routing import provider_router
 from app.main import app
 from app.models import Base
+from app.rendering import fragment_cache
+from app.services.agent_interaction import summaries
+from app.services.blooms import bloom_detector, bloom_worker
+from app.services.connections import clear_index_cache
+from app.services.events import event_bus
+from app.services.temperature import access_tracker
+from app.shared_state import set_shared_state
 
 
 @pytest.fixture
@@ -36,8 +44,19 @@ def client() -> Generator[TestClient, None, None]:
             db.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    # The in-memory database shares one connection, so run detection inline.
+    bloom_worker.mode = "inline"
+    access_tracker.flush_seconds = 0
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+    clear_index_cache()
+    bloom_detector.clear()
+    access_tracker.clear()
+    summaries.clear()
+    event_bus.clear()
+    fragment_cache.clear()
+    provider_router.reset()
+    set_shared_state(None)
     Base.metadata.drop_all(bind=engine)
     engine.dispose()
@@ -1,3 +1,14 @@
+import asyncio
+import time
+
+from app.db import get_db
+from app.main import app
+from app.llm.routing import provider_router
+from app.models import Agent
+from app.services import agent_interaction
+from app.services.singleflight import SingleFlight
+
+
 def test_agent_crud_flow(client):
     space_id = client.post("/spaces", json={"name": "Lab"}).json()["id"]
 
@@ -128,6 +139,97 @@ def test_ollama_provider_connection_error(client, monkeypatch):
     assert "Ollama" in response.json()["detail"]
 
 
+def _ollama_agent(client):
+    space_id = client.post("/spaces", json={"name": "Upstream"}).json()["id"]
+    return client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Local", "model": "llama3", "provider": "ollama"},
+    ).json()
+
+
+def test_upstream_auth_errors_are_not_passed_through(client, monkeypatch):
+    agent = _ollama_agent(client)
+
+    class AuthenticationError(RuntimeError):
+        status_code = 401
+
+    async def fake_generate(self, request):
+        raise AuthenticationError("Incorrect API key provided")
+
+    monkeypatch.setattr("app.llm.ollama_provider.OllamaProvider.generate", fake_generate)
+    response = client.post(f"/agents/{agent['id']}/interact", json={"prompt": "Ping"})
+    assert response.status_code == 400
+    assert "Incorrect API key" in response.json()["detail"]
+
+
+def test_open_breakers_answer_service_unavailable(client):
+    agent = _ollama_agent(client)
+    provider_router.stats("ollama").breaker.opened_at = time.monotonic()
+
+    response = client.post(f"/agents/{agent['id']}/interact", json={"prompt": "Ping"})
+    assert response.status_code == 503
+    assert "circuit open" in response.json()["detail"]
+
+
+def test_client_disconnect_cancels_the_provider_call(client, monkeypatch):
+    space_id = client.post("/spaces", json={"name": "Impatient"}).json()["id"]
+    agent = client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Slow", "model": "llama3", "provider": "ollama"},
+    ).json()
+    provider_cancelled = []
+
+    async def slow_generate(self, request):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            provider_cancelled.append(True)
+            raise
+
+    monkeypatch.setattr("app.llm.ollama_provider.OllamaProvider.generate", slow_generate)
+
+    async def post_then_leave():
+        messages = [{"type": "http.request", "body": b'{"prompt": "Still there?"}'}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.05)  # the user closes the tab
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": f"/agents/{agent['id']}/interact",
+            "raw_path": f"/agents/{agent['id']}/interact".encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"content-type", b"application/json")],
+            "client": ("test", 1),
+            "server": ("test", 80),
+        }
+        await asyncio.wait_for(client.app(scope, receive, send), 2)
+        return sent[0]["status"]
+
+    assert asyncio.run(post_then_leave()) == 499
+    assert provider_cancelled == [True]
+
+    [interaction] = client.get(f"/agents/{agent['id']}/interactions").json()
+    assert (interaction["status"], interaction["response"]) == ("cancelled", "")
+
+    # Cancelled turns are not replayed as conversation history.
+    client.put(f"/agents/{agent['id']}", json={"provider": "echo", "model": "echo"})
+    output = client.post(f"/agents/{agent['id']}/interact", json={"prompt": "Hello?"}).json()["output"]
+    assert "Still there?" not in output
+
+
 def test_list_agent_interactions(client):
     space_id = client.post("/spaces", json={"name": "History"}).json()["id"]
     agent = client.post(
@@ -159,3 +261,121 @@ def test_list_agent_interactions(client):
         f"/agents/{agent['id']}/interact",
         json={"prompt": "summarize", "context_limit": 0},
     )
+
+
+def test_context_prefers_artifacts_tagged_with_prompt_terms(client):
+    space_id = client.post("/spaces", json={"name": "Boost"}).json()["id"]
+    client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Old", "content": "gardening compost"},
+    )
+    client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "New", "content": "budget spreadsheet"},
+    )
+    agent = client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Echo", "model": "echo", "provider": "echo"},
+    ).json()
+
+    response = client.post(
+        f"/agents/{agent['id']}/interact",
+        json={"prompt": "Ideas for compost?", "context_limit": 1},
+    )
+    assert response.status_code == 200
+    artifacts = response.json()["context"]["artifacts"]
+    assert [item["title"] for item in artifacts] == ["Old"]
+
+
+def test_simulated_provider_latency_and_failures(client, monkeypatch):
+    monkeypatch.setenv("SIMULATED_TTFT_SECONDS", "0")
+    monkeypatch.setenv("SIMULATED_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("SIMULATED_OUTPUT_TOKENS", "3")
+    space_id = client.post("/spaces", json={"name": "Simulated"}).json()["id"]
+    agent = client.post(
+        "/agents",
+        json={
+            "space_id": space_id,
+            "name": "Sim",
+            "model": "simulated",
+            "provider": "simulated",
+        },
+    ).json()
+
+    response = client.post(f"/agents/{agent['id']}/interact", json={"prompt": "Hi there"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["output"] == "Hi there Hi"
+    assert data["metadata"]["usage"]["completion_tokens"] == 3
+
+    monkeypatch.setenv("SIMULATED_RATE_LIMIT_RATE", "1")
+    response = client.post(f"/agents/{agent['id']}/interact", json={"prompt": "Hi"})
+    assert response.status_code == 429
+    assert "rate limit" in response.json()["detail"]
+
+
+def test_single_flight_shares_one_call_and_caches_the_result():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.do("a", lambda: compute(1)) for _ in range(5)))
+        assert results == [2] * 5
+        assert await flights.do("a", lambda: compute(1)) == 2
+        assert await flights.do("b", lambda: compute(3)) == 6
+
+    asyncio.run(scenario())
+    assert calls == [1, 3]
+
+
+def test_summaries_are_reused_until_the_space_changes(client, monkeypatch):
+    space_id = client.post("/spaces", json={"name": "Memory"}).json()["id"]
+    agent_id = client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Steward", "model": "echo", "provider": "echo"},
+    ).json()["id"]
+    calls = []
+    generate = agent_interaction._generate
+
+    async def counting_generate(chain, request):
+        calls.append(request.prompt)
+        return await generate(chain, request)
+
+    monkeypatch.setattr(agent_interaction, "_generate", counting_generate)
+    summarize = f"/ui/spaces/{space_id}/agents/{agent_id}/summarize"
+
+    client.post(summarize, follow_redirects=False)
+    client.post(summarize, follow_redirects=False)
+    assert len(calls) == 1
+
+    client.post("/artifacts", json={"space_id": space_id, "title": "New", "content": "idea"})
+    client.post(summarize, follow_redirects=False)
+    assert len(calls) == 2
+    assert "New" in calls[-1]
+
+
+def test_shared_summary_does_not_use_the_callers_session(client, monkeypatch):
+    space_id = client.post("/spaces", json={"name": "Memory"}).json()["id"]
+    agent_id = client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Steward", "model": "echo", "provider": "echo"},
+    ).json()["id"]
+    sessions = []
+    build = agent_interaction._summary_request
+
+    def recording_build(agent, db):
+        sessions.append(db)
+        return build(agent, db)
+
+    monkeypatch.setattr(agent_interaction, "_summary_request", recording_build)
+    db = next(app.dependency_overrides[get_db]())
+    agent = db.get(Agent, agent_id)
+
+    summary = asyncio.run(agent_interaction.summarize_space_state(agent, db))
+    assert summary
+    assert len(sessions) == 1 and sessions[0] is not db
@@ -1,3 +1,9 @@
+from app.db import get_db
+from app.main import app
+from app.models import Artifact, ArtifactTag, Space
+from app.services.tags import MAX_QUERY_TAGS, index_artifact_tags
+
+
 def test_artifact_crud_flow(client):
     space_id = client.post("/spaces", json={"name": "Ideas"}).json()["id"]
 
@@ -78,3 +84,120 @@ def test_search_artifacts_api(client):
     assert len(results) == 1
     assert results[0]["title"] == "Deep Work"
     assert results[0]["summary"]
+
+
+def test_tags_prefer_terms_distinctive_within_space(client):
+    space_id = client.post("/spaces", json={"name": "Corpus"}).json()["id"]
+    for title in ("One", "Two"):
+        client.post(
+            "/artifacts",
+            json={"space_id": space_id, "title": title, "content": "design review"},
+        )
+
+    artifact = client.post(
+        "/artifacts",
+        json={
+            "space_id": space_id,
+            "title": "Three",
+            "content": "design typography",
+        },
+    ).json()
+    assert artifact["tags"][0] == "typography"
+
+
+def test_filter_artifacts_by_tags(client):
+    space_id = client.post("/spaces", json={"name": "Tagged"}).json()["id"]
+    for title, content in (
+        ("One", "python testing"),
+        ("Two", "python packaging"),
+        ("Three", "rust testing"),
+    ):
+        client.post(
+            "/artifacts",
+            json={"space_id": space_id, "title": title, "content": content},
+        )
+
+    both = client.get(
+        "/artifacts", params={"space_id": space_id, "tag": ["python", "testing"]}
+    ).json()
+    assert [item["title"] for item in both] == ["One"]
+
+    either = client.get(
+        "/artifacts",
+        params={"space_id": space_id, "tag": ["packaging", "rust"], "tag_mode": "any"},
+    ).json()
+    assert {item["title"] for item in either} == {"Two", "Three"}
+
+    facets = client.get(f"/spaces/{space_id}/tags").json()
+    assert facets[:2] == [
+        {"tag": "python", "count": 2},
+        {"tag": "testing", "count": 2},
+    ]
+
+    too_many = [f"tag{n}" for n in range(MAX_QUERY_TAGS + 1)]
+    response = client.get("/artifacts", params={"space_id": space_id, "tag": too_many})
+    assert response.status_code == 422
+
+
+def test_tag_index_takes_the_space_from_the_artifact(client):
+    db = next(app.dependency_overrides[get_db]())
+    space = Space(name="Ordering")
+    db.add(space)
+    db.flush()
+    first = Artifact(tags=["Alpha"], space_id=space.id, title="Keyword order")
+    second = Artifact(tags=["beta"], space=Space(name="Related"), title="Through space=")
+    db.add_all([first, second])
+    db.commit()
+
+    rows = {(row.artifact_id, row.tag): row.space_id for row in db.query(ArtifactTag)}
+    assert rows == {(first.id, "alpha"): space.id, (second.id, "beta"): second.space_id}
+
+    # Artifacts tagged before the index existed are filled in once.
+    db.query(ArtifactTag).delete()
+    db.commit()
+    assert index_artifact_tags(db, batch_size=1) == 2
+    assert index_artifact_tags(db) == 0
+    assert db.query(ArtifactTag).count() == 2
+
+
+def test_near_duplicates_are_flagged_and_reported(client):
+    space_id = client.post("/spaces", json={"name": "Dupes"}).json()["id"]
+    note = (
+        "Interview notes: customers want offline sync, faster search and a "
+        "cleaner export flow before they will move the whole team over."
+    )
+    original = client.post(
+        "/artifacts", json={"space_id": space_id, "title": "Interview", "content": note}
+    ).json()
+    assert original["duplicate_of"] is None
+
+    pasted = client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Interview (copy)", "content": note + "!"},
+    ).json()
+    assert pasted["duplicate_of"] == original["id"]
+    # Later reads find duplicates through /spaces/{id}/duplicates instead.
+    assert "duplicate_of" not in client.get(f"/artifacts/{pasted['id']}").json()
+
+    uploaded = client.post(
+        "/artifacts/upload",
+        data={"space_id": str(space_id), "content": note},
+        files={"file": ("notes.txt", b"notes", "text/plain")},
+    ).json()
+    assert uploaded["duplicate_of"] == original["id"]
+
+    other = client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Pricing", "content": "Pricing tiers draft"},
+    ).json()
+    assert other["duplicate_of"] is None
+
+    groups = client.get(f"/spaces/{space_id}/duplicates").json()
+    assert groups == [
+        {"artifact_ids": [original["id"], pasted["id"], uploaded["id"]], "similarity": 1.0}
+    ]
+
+    client.delete(f"/artifacts/{original['id']}")
+    groups = client.get(f"/spaces/{space_id}/duplicates").json()
+    assert [group["artifact_ids"] for group in groups] == [[pasted["id"], uploaded["id"]]]
+    client.delete(f"/artifacts/{uploaded['id']}")
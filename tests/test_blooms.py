@@ -0,0 +1,67 @@
+from app.db import get_db
+from app.main import app
+from app.services.blooms import BloomDetector, CommunityIndex, EdgeChanges, bloom_detector
+
+
+def test_community_index_finds_dense_cores():
+    index = CommunityIndex(min_size=4, min_density=0.8)
+    clique = [1, 2, 3, 4]
+    for a in clique:
+        for b in clique:
+            if a < b:
+                index.add_edge(a, b, 0.5)
+    index.add_edge(4, 5, 0.3)
+    index.add_edge(5, 6, 0.3)
+
+    [bloom] = [c for c in index.evaluate_dirty() if c.bloom]
+    assert bloom.bloom == {1, 2, 3, 4}
+    assert bloom.density == 1.0
+
+    index.remove_edge(4, 5)
+    assert 4 not in index.adjacency[5]
+
+    index.remove_node(1)
+    communities = index.evaluate_dirty()
+    assert all(c.bloom is None for c in communities)
+
+
+def test_blooms_follow_artifact_changes(client):
+    space_id = client.post("/spaces", json={"name": "Garden"}).json()["id"]
+    ids = []
+    for index in range(5):
+        response = client.post(
+            "/artifacts",
+            json={
+                "space_id": space_id,
+                "title": f"Bed {index}",
+                "content": "compost garden soil worms mulch",
+            },
+        )
+        ids.append(response.json()["id"])
+    client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Taxes", "content": "invoice receipts"},
+    )
+
+    blooms = client.get(f"/spaces/{space_id}/blooms").json()
+    assert len(blooms) == 1
+    assert blooms[0]["artifact_ids"] == ids
+    assert blooms[0]["density"] == 1.0
+    assert "compost" in blooms[0]["name"]
+
+    client.delete(f"/artifacts/{ids[0]}")
+    assert client.get(f"/spaces/{space_id}/blooms").json() == []
+
+    # Deleting the space drops its cached edge graph.
+    assert any(key[1] == space_id for key in bloom_detector._indexes)
+    client.delete(f"/spaces/{space_id}")
+    assert not any(key[1] == space_id for key in bloom_detector._indexes)
+
+
+def test_bloom_detector_keeps_recent_spaces_only(client):
+    detector = BloomDetector(max_spaces=2)
+    space_ids = [client.post("/spaces", json={"name": f"S{n}"}).json()["id"] for n in range(3)]
+    db = next(app.dependency_overrides[get_db]())
+    for space_id in (*space_ids, space_ids[1]):
+        detector.process(db, space_id, EdgeChanges())
+    assert [key[1] for key in detector._indexes] == [space_ids[2], space_ids[1]]
@@ -0,0 +1,62 @@
+from app.db import get_db
+from app.main import app
+from app.models import ArtifactChunk
+from app.services.chunking import split_passages
+
+FILLER = " ".join(f"Filler sentence number {n} about nothing in particular." for n in range(40))
+
+
+def test_passages_overlap_and_end_on_boundaries():
+    text = " ".join(f"Sentence {n} has a few words." for n in range(60))
+    passages = split_passages(text, size=200, overlap=50)
+    assert len(passages) > 1
+    assert all(len(passage) <= 200 for _, _, passage in passages)
+    for (start, end, passage), (next_start, _, _) in zip(passages, passages[1:]):
+        assert text[start:end] == passage
+        assert passage.endswith(".")
+        assert start < next_start < end  # the next passage repeats this one's tail
+    assert passages[-1][1] == len(text)
+    assert split_passages("   ") == []
+
+
+def test_agent_context_uses_the_passage_matching_the_prompt(client):
+    space_id = client.post("/spaces", json={"name": "Manuals"}).json()["id"]
+    content = f"{FILLER}\n\nThe reactor coolant valve must be closed before maintenance.\n\n{FILLER}"
+    artifact = client.post(
+        "/artifacts", json={"space_id": space_id, "title": "Plant manual", "content": content}
+    ).json()
+
+    db = next(app.dependency_overrides[get_db]())
+    chunks = db.query(ArtifactChunk).filter_by(artifact_id=artifact["id"]).all()
+    assert len(chunks) > 3
+
+    agent_id = client.post(
+        "/agents", json={"space_id": space_id, "name": "Operator", "model": "echo"}
+    ).json()["id"]
+    response = client.post(
+        f"/agents/{agent_id}/interact",
+        json={"prompt": "When is the coolant valve closed?", "context_limit": 1},
+    )
+    [item] = response.json()["context"]["artifacts"]
+    assert 1 <= len(item["passages"]) <= 2
+    assert any("coolant valve must be closed" in passage for passage in item["passages"])
+    assert sum(map(len, item["passages"])) < len(content) / 2
+
+    passages = client.get(
+        "/artifacts/passages", params={"q": "reactor coolant valve", "space_id": space_id, "limit": 1}
+    ).json()
+    assert "coolant valve" in passages[0]["text"]
+    assert passages[0]["artifact_id"] == artifact["id"]
+
+
+def test_uploaded_text_files_are_chunked(client):
+    space_id = client.post("/spaces", json={"name": "Uploads"}).json()["id"]
+    artifact = client.post(
+        "/artifacts/upload",
+        data={"space_id": space_id},
+        files={"file": ("notes.txt", b"Quarterly planning notes about hiring.", "text/plain")},
+    ).json()
+
+    db = next(app.dependency_overrides[get_db]())
+    [chunk] = db.query(ArtifactChunk).filter_by(artifact_id=artifact["id"]).all()
+    assert chunk.text == "Quarterly planning notes about hiring."
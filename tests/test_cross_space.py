@@ -0,0 +1,95 @@
+import pytest
+
+from app.db import get_db
+from app.main import app
+from app.services import cross_space
+from app.services.cross_space import run_cross_space_scan
+
+
+def _seed(client):
+    garden = client.post("/spaces", json={"name": "Garden"}).json()["id"]
+    farm = client.post("/spaces", json={"name": "Farm"}).json()["id"]
+    taxes = client.post("/spaces", json={"name": "Taxes"}).json()["id"]
+    notes = [
+        (garden, "Compost", "compost worms mulch soil nitrogen carbon layers"),
+        (farm, "Fields", "compost worms mulch soil nitrogen carbon rotation"),
+        (garden, "Roses", "roses pruning aphids thorns"),
+        (taxes, "Receipts", "invoice receipts deadline deductions"),
+    ]
+    ids = [
+        client.post(
+            "/artifacts", json={"space_id": space, "title": title, "content": content}
+        ).json()["id"]
+        for space, title, content in notes
+    ]
+    return (garden, farm, taxes), ids
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scan_links_overlapping_artifacts_across_spaces(client, tmp_path, workers):
+    (garden, farm, taxes), ids = _seed(client)
+    db = next(app.dependency_overrides[get_db]())
+
+    result = run_cross_space_scan(
+        db, workers=workers, checkpoint_dir=tmp_path / "scan", shard_size=2
+    )
+    db.close()
+    assert result.blooms == 1
+    assert result.verified == 1
+    assert not (tmp_path / "scan").exists()
+
+    [bloom] = client.get(f"/spaces/{garden}/cross-space-blooms").json()
+    assert bloom["space_ids"] == sorted([garden, farm])
+    assert bloom["bridge_artifact_ids"] == ids[:2]
+    assert bloom["strength"] == pytest.approx(6 / 9, abs=1e-4)
+    assert bloom["suggested_action"] == "merge"
+    assert client.get(f"/spaces/{taxes}/cross-space-blooms").json() == []
+
+
+def test_scan_resumes_from_checkpoint(client, tmp_path, monkeypatch):
+    _seed(client)
+    db = next(app.dependency_overrides[get_db]())
+    checkpoint = tmp_path / "scan"
+
+    def interrupted(*_args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(cross_space, "_verify_shard", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run_cross_space_scan(db, workers=1, checkpoint_dir=checkpoint, shard_size=2)
+    assert sorted(path.name for path in checkpoint.iterdir()) == [
+        "manifest.json",
+        "signatures-00000.json",
+        "signatures-00001.json",
+    ]
+
+    monkeypatch.undo()
+    monkeypatch.setattr(cross_space, "_signature_shard", interrupted)
+    result = run_cross_space_scan(db, workers=1, checkpoint_dir=checkpoint, shard_size=2)
+    db.close()
+    assert result.resumed_shards == 2
+    assert result.blooms == 1
+
+
+def test_resumed_scan_discards_shards_of_edited_artifacts(client, tmp_path, monkeypatch):
+    (garden, _, _), ids = _seed(client)
+    db = next(app.dependency_overrides[get_db]())
+    checkpoint = tmp_path / "scan"
+
+    def interrupted(*_args):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(cross_space, "_verify_shard", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run_cross_space_scan(db, workers=1, checkpoint_dir=checkpoint, shard_size=2)
+    monkeypatch.undo()
+
+    # The edit keeps the artifact count and highest id, but not the terms.
+    client.put(f"/artifacts/{ids[1]}", json={"content": "tractor diesel harvest"})
+    db.expire_all()
+    result = run_cross_space_scan(db, workers=1, checkpoint_dir=checkpoint, shard_size=2)
+    db.close()
+    assert result.resumed_shards == 0
+    assert result.blooms == 0
+    assert client.get(f"/spaces/{garden}/cross-space-blooms").json() == []
+
@@ -0,0 +1,135 @@
+import asyncio
+from dataclasses import dataclass, field
+
+from app.db import get_db
+from app.llm import EmbeddingProvider
+from app.llm.embeddings import Embedder, MemoryEmbeddingCache
+from app.llm.hashing_embedder import HashingEmbedder
+from app.main import app
+from app.models import Embedding
+from app.services import embeddings
+from app.services.embeddings import cosine, prune_embeddings
+
+
+@dataclass
+class CountingEmbedder(EmbeddingProvider):
+    name: str = "counting"
+    embedding_model: str = "v1"
+    delay: float = 0.01
+    calls: list = field(default_factory=list)
+    in_flight: int = 0
+    peak: int = 0
+    max_batch = 3
+
+    async def embed(self, texts):
+        self.calls.append(list(texts))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return [[float(len(text))] for text in texts]
+
+
+def test_hashing_embedder_is_deterministic_and_normalised():
+    embedder = HashingEmbedder(dimensions=64)
+    [a, a_again, near, far] = asyncio.run(
+        embedder.embed(
+            [
+                "retrieval latency budget",
+                "retrieval latency budget",
+                "latency of retrieval budget review",
+                "watercolour landscape painting",
+            ]
+        )
+    )
+    assert a == a_again and len(a) == 64
+    assert abs(sum(x * x for x in a) - 1.0) < 1e-9
+    assert cosine(a, near) > cosine(a, far)
+
+
+def test_embedder_splits_batches_bounds_concurrency_and_caches():
+    provider = CountingEmbedder()
+    embedder = Embedder(provider, cache=MemoryEmbeddingCache(), max_concurrency=2)
+    texts = [f"text {n}" for n in range(10)] + ["text 0"]
+
+    vectors = asyncio.run(embedder.embed(texts))
+    assert vectors == [[float(len(text))] for text in texts]
+    # Ten distinct texts in slices of three, two at a time.
+    assert sorted(map(len, provider.calls)) == [1, 3, 3, 3]
+    assert provider.peak == 2
+
+    provider.calls.clear()
+    asyncio.run(embedder.embed(["text 3", "text 10"]))
+    assert provider.calls == [["text 10"]]
+
+
+def test_unchanged_artifacts_are_not_embedded_again(client, monkeypatch):
+    hashing = HashingEmbedder()
+    monkeypatch.setitem(embeddings._embedders, "hashing", Embedder(hashing))
+    space_id = client.post("/spaces", json={"name": "Semantic"}).json()["id"]
+    for title, content in [
+        ("Latency notes", "Retrieval latency grows with the index size."),
+        ("Garden", "Tomatoes need sun and regular watering."),
+    ]:
+        client.post("/artifacts", json={"space_id": space_id, "title": title, "content": content})
+
+    response = client.get("/artifacts/similar", params={"q": "retrieval latency", "space_id": space_id})
+    assert response.status_code == 200
+    assert [item["title"] for item in response.json()] == ["Latency notes", "Garden"]
+
+    db = next(app.dependency_overrides[get_db]())
+    stored = db.query(Embedding).count()
+    assert stored == 2  # both artifacts; queries are not stored
+
+    calls = []
+    original = hashing.embed
+
+    async def counting_embed(texts):
+        calls.append(list(texts))
+        return await original(texts)
+
+    monkeypatch.setattr(hashing, "embed", counting_embed)
+    client.get("/artifacts/similar", params={"q": "watering tomatoes", "space_id": space_id})
+    assert calls == [["watering tomatoes"]]
+
+
+def test_vectors_of_edited_artifacts_are_pruned(client, monkeypatch):
+    monkeypatch.setitem(embeddings._embedders, "hashing", Embedder(HashingEmbedder()))
+    space_id = client.post("/spaces", json={"name": "Semantic"}).json()["id"]
+    artifact_id = client.post(
+        "/artifacts", json={"space_id": space_id, "title": "Draft", "content": "First version."}
+    ).json()["id"]
+    client.get("/artifacts/similar", params={"q": "version", "space_id": space_id})
+    client.put(f"/artifacts/{artifact_id}", json={"content": "Second version."})
+    client.get("/artifacts/similar", params={"q": "version", "space_id": space_id})
+
+    db = next(app.dependency_overrides[get_db]())
+    assert db.query(Embedding).count() == 2
+    assert prune_embeddings(db) == 1
+    assert db.query(Embedding).count() == 1
+
+
+@dataclass
+class UnreachableEmbedder(EmbeddingProvider):
+    name: str = "ollama"
+    embedding_model: str = "nomic-embed-text"
+
+    async def embed(self, texts):
+        raise RuntimeError("Failed to reach Ollama")
+
+
+def test_auto_embedder_falls_back_to_hashing_and_stops_choosing_a_failing_provider(
+    client, monkeypatch
+):
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "auto")
+    for name in ("ollama", "openai"):
+        monkeypatch.setitem(embeddings._embedders, name, Embedder(UnreachableEmbedder(name=name)))
+    space_id = client.post("/spaces", json={"name": "Auto"}).json()["id"]
+    client.post("/artifacts", json={"space_id": space_id, "title": "Note", "content": "text"})
+
+    for _ in range(12):
+        response = client.get("/artifacts/similar", params={"q": "note", "space_id": space_id})
+        assert response.status_code == 200
+        assert [item["title"] for item in response.json()] == ["Note"]
+    # Both providers' breakers are open now, so hashing is the only choice.
+    assert embeddings.embedder_choices() == ["hashing"]
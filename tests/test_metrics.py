@@ -0,0 +1,43 @@
+import pytest
+
+from app import metrics
+
+
+@pytest.fixture
+def metrics_enabled():
+    metrics.registry.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.registry.reset()
+
+
+def test_metrics_endpoint_disabled_by_default(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_record_routes_queries_and_providers(client, metrics_enabled):
+    space_id = client.post("/spaces", json={"name": "Observed"}).json()["id"]
+    client.post(
+        "/artifacts/upload",
+        data={"space_id": str(space_id)},
+        files={"file": ("note.txt", b"hello world", "text/plain")},
+    )
+    agent = client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Echo", "model": "echo", "provider": "echo"},
+    ).json()
+    client.post(f"/agents/{agent['id']}/interact", json={"prompt": "Hi"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.text
+    assert (
+        'thinkspaces_http_request_duration_seconds_count'
+        '{method="POST",route="/agents/{agent_id}/interact",status="200"} 1'
+    ) in body
+    assert 'thinkspaces_db_queries_per_request_count{route="/spaces/"}' in body
+    assert metrics.db_queries_total.value(operation="INSERT") >= 3
+    assert metrics.provider_call_seconds.count(provider="echo", model="echo", outcome="ok") == 1
+    assert metrics.enrichment_seconds.count() == 1
+    assert "thinkspaces_upload_bytes_sum 11" in body
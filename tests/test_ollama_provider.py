@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+import httpx
+
+import app.main  # noqa: F401 - registers the batch metrics listener
+from app import metrics
+from app.llm import CompletionRequest
+from app.llm import ollama_provider
+from app.llm.ollama_provider import OllamaProvider
+from app.llm.prompting import chat_messages
+
+
+def _mock_ollama(monkeypatch, requests):
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        requests.append((request.url.path, body))
+        if request.url.path == "/api/embed":
+            vectors = [[float(len(text)), 1.0] for text in body["input"]]
+            return httpx.Response(200, json={"model": body["model"], "embeddings": vectors})
+        tokens = [*body.get("context", []), *range(len(body["prompt"].split()) + 1)]
+        return httpx.Response(
+            200,
+            json={
+                "model": body["model"],
+                "response": "pong",
+                "context": tokens,
+                "prompt_eval_count": len(body["prompt"].split()),
+                "eval_count": 1,
+            },
+        )
+
+    connections = ollama_provider.KeepAliveClients(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(ollama_provider, "connections", connections)
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "-1")
+    return connections
+
+
+def test_concurrent_embeds_share_one_request(monkeypatch):
+    requests = []
+    _mock_ollama(monkeypatch, requests)
+    provider = OllamaProvider(base_url="http://ollama.test")
+    metrics.registry.reset()
+    metrics.enable()
+
+    async def run():
+        return await asyncio.gather(
+            provider.embed(["a", "bb"]),
+            provider.embed(["ccc"]),
+            provider.embed(["dddd"], model="other"),
+        )
+
+    try:
+        first, second, other = asyncio.run(run())
+        exposition = metrics.registry.render()
+    finally:
+        metrics.disable()
+        metrics.registry.reset()
+
+    assert first == [[1.0, 1.0], [2.0, 1.0]]
+    assert second == [[3.0, 1.0]]
+    assert other == [[4.0, 1.0]]
+    # One call per model; the first two callers were batched together.
+    assert sorted((body["model"], body["input"]) for _, body in requests) == [
+        ("nomic-embed-text", ["a", "bb", "ccc"]),
+        ("other", ["dddd"]),
+    ]
+    assert all(body["keep_alive"] == -1 for _, body in requests)
+    assert 'thinkspaces_provider_batch_size_count{operation="ollama.embed"} 2' in exposition
+    assert 'thinkspaces_provider_batch_size_sum{operation="ollama.embed"} 4' in exposition
+
+
+def test_embed_batches_are_capped_by_text_count(monkeypatch):
+    requests = []
+    _mock_ollama(monkeypatch, requests)
+    monkeypatch.setattr(ollama_provider.embed_batcher, "max_batch", 4)
+    provider = OllamaProvider(base_url="http://ollama.test")
+
+    async def run():
+        return await asyncio.gather(
+            provider.embed(["a", "b", "c"]),
+            provider.embed(["d", "e"]),
+            provider.embed(["f", "g"]),
+        )
+
+    results = asyncio.run(run())
+    assert [len(vectors) for vectors in results] == [3, 2, 2]
+    assert [body["input"] for _, body in requests] == [["a", "b", "c"], ["d", "e", "f", "g"]]
+
+
+def test_generate_reuses_pooled_client_and_pins_model(monkeypatch):
+    requests = []
+    connections = _mock_ollama(monkeypatch, requests)
+    provider = OllamaProvider(base_url="http://ollama.test")
+
+    async def run():
+        first = await provider.generate(CompletionRequest(prompt="ping"))
+        client = connections.get(provider.base_url)
+        second = await provider.generate(CompletionRequest(prompt="ping", options={"model": "phi3"}))
+        assert connections.get(provider.base_url) is client
+        await connections.aclose()
+        assert client.is_closed
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.output == "pong"
+    assert second.metadata["model"] == "phi3"
+    assert [body["keep_alive"] for _, body in requests] == [-1, -1]
+
+
+def test_turns_of_a_conversation_reuse_ollama_context(monkeypatch):
+    requests = []
+    _mock_ollama(monkeypatch, requests)
+    ollama_provider.contexts.clear()
+    provider = OllamaProvider(base_url="http://ollama.test")
+
+    def turn(prompt, history, context=("Artifact: Plan",)):
+        request = CompletionRequest(
+            prompt=prompt,
+            system="Be brief.",
+            context=list(context),
+            history=history,
+            conversation="agent-1",
+        )
+        return asyncio.run(provider.generate(request))
+
+    first = turn("one two", [])
+    assert requests[-1][1]["prompt"].startswith("System:\nBe brief.\n\nContext:\nArtifact: Plan")
+    assert first.metadata["usage"]["prompt_tokens_details"]["cached_tokens"] == 0
+
+    second = turn("three", [("one two", "pong")])
+    sent = requests[-1][1]
+    assert sent["prompt"] == "three"
+    assert sent["context"] == list(range(len(requests[0][1]["prompt"].split()) + 1))
+    assert second.metadata["usage"]["prompt_tokens_details"]["cached_tokens"] == len(sent["context"])
+
+    # A different space context changes the prefix, so the full prompt is sent.
+    turn("four", [("one two", "pong"), ("three", "pong")], context=("Artifact: Other",))
+    assert "context" not in requests[-1][1]
+    assert requests[-1][1]["prompt"].endswith("User:\nthree\n\nAssistant:\npong\n\nfour")
+
+
+def test_chat_messages_put_static_parts_first():
+    request = CompletionRequest(
+        prompt="now",
+        system="static",
+        context=["Artifact: A"],
+        history=[("earlier", "reply")],
+    )
+    assert [(m["role"], m["content"]) for m in chat_messages(request)] == [
+        ("system", "static"),
+        ("system", "Context:\nArtifact: A"),
+        ("user", "earlier"),
+        ("assistant", "reply"),
+        ("user", "now"),
+    ]
@@ -0,0 +1,117 @@
+import subprocess
+import sys
+from importlib import metadata
+from pathlib import Path
+
+from app.llm import ProviderCapabilities, ProviderRegistry
+from app.llm.providers import EchoProvider
+from app.llm.routing import ProviderRouter
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _imported_modules(statement: str) -> dict:
+    """Module -> cumulative import microseconds, from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_app_startup_does_not_import_provider_sdks():
+    modules = _imported_modules("import app.main")
+    assert "app.main" in modules
+    assert "openai" not in modules
+    assert not any(name.startswith("app.llm.") and name.endswith("_provider") for name in modules)
+
+
+def test_lazy_providers_load_on_first_get():
+    providers = ProviderRegistry()
+    providers.register_lazy("echo", "app.llm.providers:EchoProvider")
+    providers.register_lazy("broken", "app.llm.no_such_module:Provider")
+    assert providers.available() == ["broken", "echo"]
+    assert not providers.is_loaded("echo")
+
+    assert providers.get("Echo") is EchoProvider
+    assert providers.is_loaded("echo")
+    # A provider whose module cannot be imported is simply unavailable.
+    assert providers.get("broken") is None
+    assert providers.available() == ["echo"]
+
+
+PLUGIN = """
+from dataclasses import dataclass
+
+from app.llm import CompletionResponse, LLMProvider, ProviderCapabilities
+
+
+@dataclass
+class {cls}(LLMProvider):
+    name: str = "{name}"
+    capabilities = ProviderCapabilities(embeddings=True, max_context=32000)
+
+    async def generate(self, request):
+        return CompletionResponse(output="{name}")
+"""
+
+
+def test_providers_are_discovered_from_entry_points_and_env(tmp_path, monkeypatch):
+    (tmp_path / "lazy_plugin.py").write_text(PLUGIN.format(cls="LazyProvider", name="lazy"))
+    (tmp_path / "eager_plugin.py").write_text(
+        PLUGIN.format(cls="EagerProvider", name="eager")
+        + "\nfrom app.llm import registry\nregistry.register(EagerProvider)\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv("LLM_PROVIDER_MODULES", "lazy=lazy_plugin:LazyProvider, eager_plugin")
+    monkeypatch.setattr(
+        metadata,
+        "entry_points",
+        lambda group: [metadata.EntryPoint("packaged", "app.llm.providers:EchoProvider", group)],
+    )
+    monkeypatch.delitem(sys.modules, "eager_plugin", raising=False)
+
+    providers = ProviderRegistry(discover=True)
+    assert providers.available() == ["lazy", "packaged"]
+    assert "lazy_plugin" not in sys.modules
+    assert "eager_plugin" in sys.modules  # registered itself on the global registry
+    assert providers.capabilities("lazy") == ProviderCapabilities(embeddings=True, max_context=32000)
+    assert providers.get("packaged") is EchoProvider
+
+    from app.llm import registry
+
+    assert registry.get("eager") is sys.modules["eager_plugin"].EagerProvider
+    monkeypatch.delitem(registry._providers, "eager")
+
+
+def test_router_picks_the_fastest_capable_provider():
+    providers = ProviderRegistry()
+    for name, capabilities in {
+        "remote": ProviderCapabilities(embeddings=True, max_context=128_000),
+        "local": ProviderCapabilities(embeddings=True, max_context=4096),
+        "plain": ProviderCapabilities(),
+    }.items():
+        providers.register_lazy(name, "app.llm.providers:EchoProvider", capabilities)
+    router = ProviderRouter(providers, failure_threshold=1)
+
+    # Nothing measured yet: registry order.
+    assert router.fastest("embed") == "local"
+    router.stats("remote").latencies.extend([0.2, 0.3])
+    router.stats("local").latencies.extend([0.5, 0.9])
+    assert router.fastest("embed") == "remote"
+    assert router.fastest("complete") == "remote"
+    assert router.fastest("embed", min_context=8000) == "remote"
+    router.stats("remote").breaker.record_failure()
+    assert router.fastest("embed") == "local"
+    assert router.fastest("stream") is None
+    assert not providers.is_loaded("remote")  # declared capabilities need no import
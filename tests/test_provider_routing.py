@@ -0,0 +1,170 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from app.llm import CompletionRequest, CompletionResponse, LLMProvider, ProviderRegistry
+from app.llm.routing import Attempt, ProviderRouter, RoutingError, resolve_chain
+from app.llm.timeouts import ProviderTimeouts, provider_timeouts
+
+
+def _registry(delays):
+    providers = ProviderRegistry()
+    for provider_name, provider_delay in delays.items():
+
+        @dataclass
+        class Timed(LLMProvider):
+            name: str = provider_name
+            model: str = f"{provider_name}-default"
+            delay: float = provider_delay
+
+            async def generate(self, request: CompletionRequest) -> CompletionResponse:
+                await asyncio.sleep(self.delay)
+                if self.delay < 0:
+                    raise RuntimeError(f"{self.name} is down")
+                return CompletionResponse(output=f"{self.name}:{request.options.get('model')}")
+
+        providers.register(Timed)
+    return providers
+
+
+def test_resolve_chain_skips_unknown_providers():
+    providers = _registry({"groq": 0, "ollama": 0})
+    chain = resolve_chain("groq", "llama-70b", ["missing", "ollama:llama3.2", "groq"], providers)
+    assert chain == [("groq", "llama-70b"), ("ollama", "llama3.2"), ("groq", None)]
+
+
+def test_breaker_opens_after_repeated_failures_and_recovers():
+    router = ProviderRouter(
+        _registry({"flaky": -1, "echo": 0}), failure_threshold=2, cooldown_seconds=0.05
+    )
+    chain = [("flaky", None), ("echo", None)]
+    request = CompletionRequest(prompt="hi")
+
+    for _ in range(2):
+        routed = asyncio.run(router.generate(chain, request))
+        assert [a.outcome for a in routed.attempts] == ["error", "ok"]
+    routed = asyncio.run(router.generate(chain, request))
+    assert [a.outcome for a in routed.attempts] == ["skipped", "ok"]
+    assert router.health()["flaky"]["state"] == "open"
+
+    with pytest.raises(RoutingError, match="circuit open"):
+        asyncio.run(router.generate([("flaky", None)], request))
+
+    time.sleep(0.06)
+    router.providers = _registry({"flaky": 0, "echo": 0})
+    assert router.health()["flaky"]["state"] == "half_open"
+    routed = asyncio.run(router.generate(chain, request))
+    assert routed.provider == "flaky"
+    assert router.health()["flaky"]["state"] == "closed"
+
+
+def test_slow_provider_is_hedged_after_its_p95():
+    router = ProviderRouter(
+        _registry({"slow": 1.0, "fast": 0.01}), hedge_min_samples=3, hedge_min_seconds=0.05
+    )
+    router.stats("slow").latencies.extend([0.05, 0.05, 0.05])
+    started = time.perf_counter()
+    routed = asyncio.run(router.generate([("slow", None), ("fast", "f1")], CompletionRequest("hi")))
+    assert time.perf_counter() - started < 0.5
+    assert routed.response.output == "fast:f1"
+    assert [(a.provider, a.outcome, a.hedge) for a in routed.attempts] == [
+        ("fast", "ok", True),
+        ("slow", "cancelled", False),
+    ]
+    # A cancelled loser is not a failure.
+    assert router.health()["slow"]["consecutive_failures"] == 0
+
+
+def test_call_past_its_total_timeout_fails_over():
+    router = ProviderRouter(
+        _registry({"slow": 1.0, "fast": 0}),
+        hedging=False,
+        timeouts=lambda name: ProviderTimeouts(total=0.05 if name == "slow" else None),
+    )
+    routed = asyncio.run(router.generate([("slow", None), ("fast", None)], CompletionRequest("hi")))
+    assert routed.provider == "fast"
+    timed_out = routed.attempts[0]
+    assert (timed_out.outcome, timed_out.error) == ("timeout", "slow timed out after 0.05s")
+    assert router.health()["slow"]["consecutive_failures"] == 1
+
+
+def test_provider_timeouts_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv("PROVIDER_CONNECT_TIMEOUT_SECONDS", "2")
+    monkeypatch.setenv("OLLAMA_READ_TIMEOUT_SECONDS", "300")
+    monkeypatch.setenv("OLLAMA_TOTAL_TIMEOUT_SECONDS", "0")
+    assert provider_timeouts("ollama") == ProviderTimeouts(connect=2, read=300, total=None)
+    assert provider_timeouts("groq") == ProviderTimeouts(connect=2)
+
+
+def test_agent_fails_over_and_records_the_serving_provider(client, monkeypatch):
+    space_id = client.post("/spaces", json={"name": "Failover"}).json()["id"]
+    agent = client.post(
+        "/agents",
+        json={
+            "space_id": space_id,
+            "name": "Local first",
+            "model": "llama3",
+            "provider": "ollama",
+            "fallback_providers": ["echo"],
+        },
+    ).json()
+    assert agent["fallback_providers"] == ["echo"]
+
+    async def unreachable(self, request):
+        raise RuntimeError("Failed to reach Ollama at http://localhost:11434")
+
+    monkeypatch.setattr("app.llm.ollama_provider.OllamaProvider.generate", unreachable)
+    response = client.post(f"/agents/{agent['id']}/interact", json={"prompt": "Ping"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["provider"] == "echo"
+    assert [a["outcome"] for a in body["metadata"]["routing"]["attempts"]] == ["error", "ok"]
+
+    [interaction] = client.get(f"/agents/{agent['id']}/interactions").json()
+    assert (interaction["provider"], interaction["model"]) == ("echo", "echo")
+
+    health = client.get("/health").json()
+    assert health["status"] == "ok"
+    assert health["providers"]["ollama"]["failures"] == 1
+    assert "Ollama" in health["providers"]["ollama"]["last_error"]
+    assert health["providers"]["echo"]["state"] == "closed"
+
+
+@pytest.mark.parametrize(
+    "outcome, upstream, expected",
+    [
+        ("error", 401, 400),
+        ("error", 404, 400),
+        ("error", 429, 429),
+        ("error", 503, 502),
+        ("error", None, 400),
+        ("timeout", None, 504),
+        ("skipped", None, 503),
+    ],
+)
+def test_routing_errors_map_to_our_own_statuses(outcome, upstream, expected):
+    error = RoutingError("failed", [Attempt("p", None, outcome, status_code=upstream)])
+    assert error.status_code == expected
+
+
+def test_rejected_requests_do_not_open_the_breaker():
+    class ContextTooLong(RuntimeError):
+        status_code = 400
+
+    @dataclass
+    class Strict(LLMProvider):
+        name: str = "strict"
+
+        async def generate(self, request: CompletionRequest) -> CompletionResponse:
+            raise ContextTooLong("prompt is too long")
+
+    providers = ProviderRegistry()
+    providers.register(Strict)
+    router = ProviderRouter(providers, failure_threshold=2)
+    for _ in range(3):
+        with pytest.raises(RoutingError, match="too long"):
+            asyncio.run(router.generate([("strict", None)], CompletionRequest("long")))
+    health = router.health()["strict"]
+    assert (health["state"], health["consecutive_failures"], health["failures"]) == ("closed", 0, 3)
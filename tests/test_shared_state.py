@@ -0,0 +1,147 @@
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.db import get_db
+from app.main import app
+from app.services import agent_interaction
+from app.services.connections import _space_index
+from app.services.events import EVENTS_CHANNEL, EventBus
+from app.shared_state import (
+    MemoryState,
+    RateLimiter,
+    SqliteState,
+    set_shared_state,
+    shared_state,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+
+WORKER = """
+import sys
+from app.shared_state import SqliteState
+state = SqliteState(sys.argv[1])
+for n in range(50):
+    state.incr("hits")
+    state.push("jobs", f"{sys.argv[2]}-{n}")
+"""
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    backend = MemoryState() if request.param == "memory" else SqliteState(str(tmp_path / "state.db"))
+    yield backend
+    backend.close()
+
+
+def test_backend_contract(state):
+    assert state.get("missing") is None
+    state.set("key", "value")
+    assert state.get("key") == "value"
+    assert state.add("key", "other") is False
+    state.delete("key")
+    assert state.add("key", "other") is True
+    state.set("short", "lived", ttl=-1)
+    assert state.get("short") is None
+
+    assert [state.incr("count") for _ in range(3)] == [1, 2, 3]
+    assert state.generation("space:1") == 0
+    assert state.bump("space:1") == 1
+
+    for item in ("a", "b"):
+        state.push("queue", item)
+    assert [state.pop("queue"), state.pop("queue"), state.pop("queue")] == ["a", "b", None]
+
+    first = state.publish("channel", "one")
+    state.publish("channel", "two")
+    assert [message for _, message in state.read("channel", 0)] == ["one", "two"]
+    assert state.read("channel", first) == [(state.last_id("channel"), "two")]
+
+    with state.lock("job"):
+        assert state.add("lock:job", "intruder") is False
+    assert state.add("lock:job", "next") is True
+
+
+def _stored_keys(state):
+    if isinstance(state, MemoryState):
+        return set(state._values)
+    return {key for (key,) in state._connection().execute("SELECT key FROM kv")}
+
+
+def test_expired_keys_are_purged_without_being_read(state):
+    state.purge_seconds = 0
+    limiter = RateLimiter("test", limit=5, window_seconds=-1)  # every window already over
+    for client in range(3):
+        limiter.hit(client, state)
+    state.incr("live", ttl=60)
+    assert _stored_keys(state) == {"live"}
+
+
+def test_processes_share_counters_and_queues(tmp_path):
+    path = str(tmp_path / "state.db")
+    SqliteState(path).close()  # create the tables before the workers race
+    workers = [
+        subprocess.Popen([sys.executable, "-c", WORKER, path, str(n)], cwd=ROOT) for n in range(3)
+    ]
+    assert all(worker.wait(timeout=60) == 0 for worker in workers)
+
+    state = SqliteState(path)
+    assert state.get("hits") == "150"
+    jobs = []
+    while (job := state.pop("jobs")) is not None:
+        jobs.append(job)
+    assert len(jobs) == len(set(jobs)) == 150
+
+
+def test_events_are_relayed_between_processes(tmp_path):
+    path = str(tmp_path / "state.db")
+    set_shared_state(SqliteState(path))
+    other_worker = SqliteState(path)
+    bus = EventBus(poll_seconds=0.01)
+
+    async def scenario():
+        with bus.subscribe(7) as subscription:
+            message = {"type": "artifact.created", "space_id": 7, "data": {"id": 3}}
+            other_worker.publish(EVENTS_CHANNEL, json.dumps({**message, "space_id": 8}))
+            other_worker.publish(EVENTS_CHANNEL, json.dumps(message))
+            return await asyncio.wait_for(subscription.get(), timeout=5)
+
+    try:
+        event = asyncio.run(scenario())
+    finally:
+        set_shared_state(None).close()
+        other_worker.close()
+    assert (event.type, event.space_id, event.data) == ("artifact.created", 7, {"id": 3})
+
+
+def test_connection_index_is_rebuilt_after_another_worker_commits(client):
+    space_id = client.post("/spaces", json={"name": "Workers"}).json()["id"]
+    for title in ("Solar panels", "Solar batteries"):
+        client.post("/artifacts", json={"space_id": space_id, "title": title, "content": title})
+    db = next(app.dependency_overrides[get_db]())
+    index = _space_index(db, space_id)
+    assert _space_index(db, space_id) is index
+
+    # What another worker's commit leaves behind in the shared state.
+    shared_state().bump(f"similarity:{space_id}")
+    rebuilt = _space_index(db, space_id)
+    assert rebuilt is not index
+    assert len(rebuilt) == 2
+
+
+def test_interactions_are_rate_limited_per_space(client, monkeypatch):
+    monkeypatch.setattr(agent_interaction, "interaction_limiter", RateLimiter("interactions", 2))
+    space_id = client.post("/spaces", json={"name": "Busy"}).json()["id"]
+    agent_id = client.post(
+        "/agents", json={"space_id": space_id, "name": "Echo", "model": "echo", "provider": "echo"}
+    ).json()["id"]
+    url = f"/agents/{agent_id}/interact"
+
+    assert [client.post(url, json={"prompt": "Hi"}).status_code for _ in range(2)] == [200, 200]
+    limited = client.post(url, json={"prompt": "Hi"})
+    assert limited.status_code == 429
+    assert "2 interactions a minute" in limited.json()["detail"]
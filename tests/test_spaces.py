@@ -1,3 +1,13 @@
+import threading
+
+from app.db import get_db
+from app.main import app
+from app.models import Artifact, Space
+from app.services.connections import SimilarityIndex
+from app.services.enrichment import index_document_terms
+from app.services.versions import space_versions
+
+
 def test_create_and_get_space(client):
     response = client.post(
         "/spaces",
@@ -37,3 +47,162 @@ def test_update_and_delete_space(client):
 
     response = client.get(f"/spaces/{space_id}")
     assert response.status_code == 404
+
+
+def test_space_topics_track_artifact_changes(client):
+    space_id = client.post("/spaces", json={"name": "Topics"}).json()["id"]
+    first = client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Alpha", "content": "design systems"},
+    ).json()
+    client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Beta", "content": "design tokens"},
+    )
+
+    topics = client.get(f"/spaces/{space_id}/topics").json()
+    assert topics[0] == {"term": "design", "document_frequency": 2}
+
+    client.put(f"/artifacts/{first['id']}", json={"content": "typography"})
+    topics = {item["term"]: item["document_frequency"] for item in client.get(
+        f"/spaces/{space_id}/topics"
+    ).json()}
+    assert topics["design"] == 1
+    assert "systems" not in topics
+    assert topics["typography"] == 1
+
+    client.delete(f"/artifacts/{first['id']}")
+    topics = {item["term"] for item in client.get(f"/spaces/{space_id}/topics").json()}
+    assert topics == {"beta", "design", "tokens"}
+
+    assert client.get("/spaces/999/topics").status_code == 404
+
+
+def test_artifacts_stored_before_the_term_table_are_backfilled(client):
+    db = next(app.dependency_overrides[get_db]())
+    space = Space(name="Legacy")
+    db.add(space)
+    db.flush()
+    db.add_all(
+        Artifact(space_id=space.id, title=title, content="shared design notes")
+        for title in ("Old", "Older")
+    )
+    db.commit()
+
+    assert index_document_terms(db, batch_size=1) == 2
+    assert index_document_terms(db) == 0
+    topics = client.get(f"/spaces/{space.id}/topics").json()
+    assert {"term": "design", "document_frequency": 2} in topics
+    db.refresh(space)
+    assert space.document_count == 2
+
+
+def test_space_graph_connects_similar_artifacts(client):
+    space_id = client.post("/spaces", json={"name": "Graph"}).json()["id"]
+    first = client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Soil", "content": "compost worms garden"},
+    ).json()
+    second = client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Beds", "content": "garden compost mulch"},
+    ).json()
+    third = client.post(
+        "/artifacts",
+        json={"space_id": space_id, "title": "Taxes", "content": "invoice receipts"},
+    ).json()
+
+    graph = client.get(f"/spaces/{space_id}/graph").json()
+    assert {node["id"] for node in graph["nodes"]} == {first["id"], second["id"], third["id"]}
+    semantic = [edge for edge in graph["edges"] if edge["type"] == "semantic"]
+    assert [(edge["source"], edge["target"]) for edge in semantic] == [
+        (first["id"], second["id"])
+    ]
+    assert 0 < semantic[0]["strength"] <= 1
+
+    client.put(f"/artifacts/{second['id']}", json={"content": "invoice receipts"})
+    graph = client.get(f"/spaces/{space_id}/graph").json()
+    semantic = [edge for edge in graph["edges"] if edge["type"] == "semantic"]
+    assert [(edge["source"], edge["target"]) for edge in semantic] == [
+        (second["id"], third["id"])
+    ]
+
+    client.delete(f"/artifacts/{third['id']}")
+    graph = client.get(f"/spaces/{space_id}/graph").json()
+    assert all(third["id"] not in (edge["source"], edge["target"]) for edge in graph["edges"])
+
+
+def test_similarity_index_is_safe_across_threads():
+    index = SimilarityIndex()
+    vector = {f"term{n}": 1.0 for n in range(50)}
+    errors = []
+
+    def writer(offset):
+        try:
+            for key in range(offset, offset + 300):
+                index.upsert(key, vector)
+                index.remove(key - 5)
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    def reader():
+        try:
+            for _ in range(300):
+                index.query(vector, top_k=5)
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(3)]
+    threads += [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(index) == 15
+
+
+def test_space_versions_and_conditional_get(client):
+    space_id = client.post("/spaces", json={"name": "Versioned"}).json()["id"]
+    first = client.get(f"/spaces/{space_id}")
+    etag = first.headers["etag"]
+    assert first.json()["version"] == 0
+
+    cached = client.get(f"/spaces/{space_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    agent_id = client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Echo", "model": "echo", "provider": "echo"},
+    ).json()["id"]
+    client.post("/artifacts", json={"space_id": space_id, "title": "Note", "content": "x"})
+    db = next(app.dependency_overrides[get_db]())
+    before = space_versions(db, space_id)
+    client.post(f"/agents/{agent_id}/interact", json={"prompt": "hi", "context_limit": 0})
+    db.expire_all()
+    versions = space_versions(db, space_id)
+    db.close()
+    assert before.agents == 1
+    assert before.artifacts >= 1
+    # An interaction only touches the interactions collection.
+    assert versions.interactions == before.interactions + 1
+    assert versions.artifacts == before.artifacts
+    assert versions.version > before.version
+
+    changed = client.get(f"/spaces/{space_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["version"] == versions.version
+
+    page = client.get(f"/ui/spaces/{space_id}")
+    assert page.status_code == 200
+    page_etag = page.headers["etag"]
+    assert client.get(
+        f"/ui/spaces/{space_id}", headers={"If-None-Match": page_etag}
+    ).status_code == 304
+    client.put(f"/spaces/{space_id}", json={"description": "Renamed"})
+    assert client.get(
+        f"/ui/spaces/{space_id}", headers={"If-None-Match": page_etag}
+    ).status_code == 200
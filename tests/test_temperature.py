@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.db import get_db
+from app.main import app
+from app.models import Artifact
+from app.services.temperature import access_tracker, refresh_thermal_state
+from app.thermal import state_for_age, temperature_for_age
+
+
+def test_temperature_closed_form():
+    assert temperature_for_age(0) == 1.0
+    assert temperature_for_age(14) == pytest.approx(0.5)
+    assert [state_for_age(days) for days in (1, 10, 45, 120)] == [
+        "hot",
+        "warm",
+        "cool",
+        "frost",
+    ]
+
+
+def test_artifact_views_are_coalesced_and_flushed(client):
+    space_id = client.post("/spaces", json={"name": "Thermal"}).json()["id"]
+    artifact_id = client.post(
+        "/artifacts", json={"space_id": space_id, "title": "Note", "content": "text"}
+    ).json()["id"]
+
+    for _ in range(3):
+        viewed = client.get(f"/artifacts/{artifact_id}").json()
+    assert viewed["access_count"] == 0
+    assert viewed["temperature_state"] == "hot"
+    assert access_tracker.pending() == 1
+
+    assert access_tracker.flush() == 1
+    assert access_tracker.pending() == 0
+    viewed = client.get(f"/artifacts/{artifact_id}").json()
+    assert viewed["access_count"] == 3
+    assert viewed["last_accessed"] is not None
+
+
+def test_flushed_accesses_change_the_space_etag(client):
+    space_id = client.post("/spaces", json={"name": "Thermal"}).json()["id"]
+    artifact_id = client.post(
+        "/artifacts", json={"space_id": space_id, "title": "Note", "content": "text"}
+    ).json()["id"]
+    etag = client.get(f"/spaces/{space_id}").headers["etag"]
+
+    client.get(f"/artifacts/{artifact_id}")
+    access_tracker.flush()
+
+    changed = client.get(f"/spaces/{space_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["artifacts"][0]["access_count"] == 1
+
+
+def test_refresh_materializes_temperatures_and_entropy(client):
+    space_id = client.post("/spaces", json={"name": "Entropy"}).json()["id"]
+    ids = [
+        client.post("/artifacts", json={"space_id": space_id, **payload}).json()["id"]
+        for payload in (
+            {"title": "Soil", "content": "compost garden soil worms"},
+            {"title": "Beds", "content": "compost garden soil mulch"},
+            {"title": "Taxes", "content": "invoice receipts deadline"},
+        )
+    ]
+
+    entropy = client.get(f"/spaces/{space_id}/entropy").json()
+    assert entropy["fragmentation_index"] == pytest.approx(1 / 3, abs=1e-4)
+    assert entropy["connection_density"] == pytest.approx(1 / 3, abs=1e-4)
+    assert entropy["temporal_coherence"] == pytest.approx(1.0, abs=1e-3)
+    assert entropy["entropy_score"] == pytest.approx(13.33, abs=0.01)
+    assert entropy["entropy_last_calculated"] is not None
+
+    db = next(app.dependency_overrides[get_db]())
+    now = datetime.now(timezone.utc)
+    access_tracker.touch(db, [ids[2]], when=now - timedelta(days=45))
+    refresh_thermal_state(db, now=now)
+    cold = db.get(Artifact, ids[2])
+    assert cold.access_count == 1
+    assert cold._temperature_state == "cool"
+    assert cold._temperature == pytest.approx(temperature_for_age(45), rel=1e-3)
+    assert db.get(Artifact, ids[0])._temperature_state == "hot"
+    db.close()
+
+    drifted = client.get(f"/spaces/{space_id}/entropy").json()
+    assert drifted["temporal_coherence"] < 1.0
+    assert drifted["entropy_score"] > entropy["entropy_score"]
@@ -1,3 +1,11 @@
+import asyncio
+
+from jinja2 import FileSystemBytecodeCache
+
+from app.rendering import FragmentCache, fragment_cache, templates, warm_templates
+from app.services.events import event_bus, event_stream
+
+
 def test_ui_flows(client):
     # No spaces yet, should show empty state text.
     response = client.get("/ui/spaces")
@@ -56,7 +64,11 @@ def test_ui_flows(client):
     detail = client.get(location)
     assert "Hello agent" in detail.text
     assert "Be brief" in detail.text
-    assert "Artifact context" in detail.text
+    # Context is only rendered when its panel is opened.
+    assert "Artifact context" not in detail.text
+    assert f"{location}/interactions/1/context" in detail.text
+    context = client.get(f"{location}/interactions/1/context")
+    assert "Artifact context" in context.text
 
     response = client.post(
         f"{location}/agents/1/summarize",
@@ -145,3 +157,153 @@ def test_ui_flows(client):
 
     detail = client.get(location)
     assert "Updated Agent" not in detail.text
+
+
+def test_space_events_and_fragments(client):
+    space_id = client.post("/spaces", json={"name": "Live"}).json()["id"]
+    agent_id = client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Echo", "model": "echo", "provider": "echo"},
+    ).json()["id"]
+    assert client.get("/ui/spaces/999/events").status_code == 404
+    json_accept = {"Accept": "application/json"}
+
+    async def scenario():
+        stream = event_stream(event_bus.subscribe(space_id), keepalive_seconds=0.01)
+        assert await anext(stream) == "retry: 3000\n\n"
+        assert await anext(stream) == ": keepalive\n\n"
+
+        created = client.post(
+            f"/ui/spaces/{space_id}/artifacts",
+            data={"title": "Live note", "content": "Pushed to the page"},
+            files={"file": ("", b"")},
+            headers=json_accept,
+        ).json()
+        artifact_id = created["artifact_id"]
+        client.post(
+            f"/ui/spaces/{space_id}/artifacts/{artifact_id}/update",
+            data={"title": "Live note", "content": "Edited"},
+            headers=json_accept,
+        )
+        chat = client.post(
+            f"/ui/spaces/{space_id}/agents/{agent_id}/chat",
+            data={"prompt": "Hello", "context_limit": 1},
+            headers=json_accept,
+        ).json()
+        client.post(f"/ui/spaces/{space_id}/artifacts/{artifact_id}/delete", headers=json_accept)
+
+        frames = [await anext(stream) for _ in range(4)]
+        assert [frame.split("\n")[1] for frame in frames] == [
+            "event: artifact.created",
+            "event: artifact.updated",
+            "event: interaction.created",
+            "event: artifact.deleted",
+        ]
+        assert f'"id":{chat["interaction_id"]}' in frames[2]
+        assert f'"agent_id":{agent_id}' in frames[2]
+        await stream.aclose()
+        assert event_bus.subscriber_count(space_id) == 0
+        return artifact_id, chat["interaction_id"]
+
+    artifact_id, interaction_id = asyncio.run(scenario())
+
+    fragment = client.get(f"/ui/spaces/{space_id}/interactions/{interaction_id}/fragment")
+    assert fragment.status_code == 200
+    assert fragment.text.lstrip().startswith(f'<details id="interaction-{interaction_id}"')
+    assert "Hello" in fragment.text
+    assert "<html" not in fragment.text
+
+    gone = client.get(f"/ui/spaces/{space_id}/artifacts/{artifact_id}/fragment")
+    assert gone.status_code == 404
+    kept = client.post(
+        "/artifacts", json={"space_id": space_id, "title": "Kept", "content": "Still here"}
+    ).json()["id"]
+    card = client.get(f"/ui/spaces/{space_id}/artifacts/{kept}/fragment")
+    assert f'id="artifact-{kept}"' in card.text
+    assert "Still here" in card.text
+
+
+def test_slow_subscriber_is_told_to_resync(client):
+    async def scenario():
+        subscription = event_bus.subscribe(1, max_pending=2)
+        for _ in range(3):
+            client.post("/artifacts", json={"space_id": 1, "title": "Note", "content": "x"})
+        await asyncio.sleep(0)
+        event = await subscription.get()
+        subscription.close()
+        return event.type
+
+    client.post("/spaces", json={"name": "Busy"})
+    assert asyncio.run(scenario()) == "resync"
+
+
+def test_space_page_reuses_rendered_fragments(client):
+    space_id = client.post("/spaces", json={"name": "Cached"}).json()["id"]
+    artifact_ids = [
+        client.post(
+            "/artifacts", json={"space_id": space_id, "title": f"Card {n}", "content": "Body"}
+        ).json()["id"]
+        for n in range(3)
+    ]
+    client.get(f"/ui/spaces/{space_id}")
+    assert fragment_cache.stats()[0] == 3
+
+    client.put(f"/artifacts/{artifact_ids[0]}", json={"content": "Rewritten body"})
+    page = client.get(f"/ui/spaces/{space_id}")
+    assert "Rewritten body" in page.text
+    # The edited card got a new entry; the other two were reused.
+    assert fragment_cache.stats()[0] == 4
+
+
+def test_fragment_cache_is_bounded():
+    cache = FragmentCache(max_entries=2, max_bytes=10)
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.get("a")
+    cache.put("c", "cccc")
+    assert cache.get("b") is None
+    assert cache.stats() == (2, 8)
+    cache.put("d", "d" * 11)
+    assert cache.get("d") is None
+
+
+def test_templates_are_compiled_to_bytecode_cache(tmp_path):
+    previous = templates.env.bytecode_cache
+    templates.env.bytecode_cache = FileSystemBytecodeCache(str(tmp_path))
+    templates.env.cache.clear()
+    try:
+        warm_templates()
+    finally:
+        templates.env.bytecode_cache = previous
+        templates.env.cache.clear()
+    assert len(list(tmp_path.iterdir())) == len(templates.env.list_templates(extensions=["html"]))
+
+
+def test_interaction_history_is_paginated(client):
+    space_id = client.post("/spaces", json={"name": "Chatty"}).json()["id"]
+    agent_id = client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Echo", "model": "echo", "provider": "echo"},
+    ).json()["id"]
+    for n in range(25):
+        client.post(
+            f"/agents/{agent_id}/interact", json={"prompt": f"turn-{n:02d}", "context_limit": 0}
+        )
+
+    def shown(html):
+        return [n for n in range(1, 26) if f'id="interaction-{n}"' in html]
+
+    page = client.get(f"/ui/spaces/{space_id}").text
+    assert shown(page) == list(range(6, 26))
+    older_url = f"/ui/spaces/{space_id}/agents/{agent_id}/interactions?before=6"
+    assert older_url in page
+
+    older = client.get(older_url).text
+    assert shown(older) == list(range(1, 6))
+    assert "load-older" not in older
+    api_page = client.get(
+        f"/agents/{agent_id}/interactions", params={"before": 6, "limit": 3}
+    ).json()
+    assert [item["id"] for item in api_page] == [5, 4, 3]
+
+    assert client.get(f"/ui/spaces/{space_id}/agents/999/interactions").status_code == 404
@@ -0,0 +1,100 @@
+import pytest
+
+from app.services.usage import cost_usd
+
+
+@pytest.fixture
+def instant_simulated(monkeypatch):
+    monkeypatch.setenv("SIMULATED_TTFT_SECONDS", "0")
+    monkeypatch.setenv("SIMULATED_TOKENS_PER_SECOND", "0")
+    monkeypatch.setenv("SIMULATED_OUTPUT_TOKENS", "10")
+    monkeypatch.setenv("TOKEN_PRICES", "simulated:*=1000/2000")
+
+
+def _agent(client, space_id, provider="simulated"):
+    return client.post(
+        "/agents",
+        json={"space_id": space_id, "name": "Counter", "model": "sim-1", "provider": provider},
+    ).json()
+
+
+def test_cost_uses_cached_prices_and_env_overrides(monkeypatch):
+    # 1M prompt tokens of which half cached, plus 1M completion tokens.
+    assert cost_usd("openai", "gpt-4o-mini", 1_000_000, 1_000_000, 500_000) == pytest.approx(
+        0.5 * 0.15 + 0.5 * 0.075 + 0.60
+    )
+    assert cost_usd("ollama", "llama3.2", 1_000_000, 1_000_000) == 0
+    monkeypatch.setenv("TOKEN_PRICES", "ollama:*=1/2")
+    assert cost_usd("ollama", "llama3.2", 1_000_000, 1_000_000) == pytest.approx(3)
+
+
+def test_usage_is_recorded_and_rolled_up(client, instant_simulated):
+    space_id = client.post("/spaces", json={"name": "Ledger"}).json()["id"]
+    agent = _agent(client, space_id)
+    for prompt in ("one two three", "four five"):
+        response = client.post(f"/agents/{agent['id']}/interact", json={"prompt": prompt})
+        assert response.status_code == 200
+
+    interactions = client.get(f"/agents/{agent['id']}/interactions").json()
+    assert [i["completion_tokens"] for i in interactions] == [10, 10]
+    assert all(i["prompt_tokens"] > 0 and i["cost_usd"] > 0 for i in interactions)
+
+    usage = client.get(f"/spaces/{space_id}/usage", params={"group_by": "agent"}).json()
+    totals = usage["totals"]
+    assert totals["interactions"] == 2
+    assert totals["prompt_tokens"] == sum(i["prompt_tokens"] for i in interactions)
+    assert totals["cost_usd"] == pytest.approx(sum(i["cost_usd"] for i in interactions))
+    assert usage["rows"] == [{"key": str(agent["id"]), **totals}]
+    assert usage["budget"]["exceeded"] is False
+
+    # Deleting the agent keeps its spend on the ledger.
+    client.delete(f"/agents/{agent['id']}")
+    assert client.get(f"/spaces/{space_id}/usage").json()["totals"] == totals
+
+
+def test_budget_rejects_or_downgrades_once_spent(client, instant_simulated, monkeypatch):
+    space = client.post(
+        "/spaces", json={"name": "Frugal", "daily_token_budget": 20}
+    ).json()
+    agent = _agent(client, space["id"])
+    url = f"/agents/{agent['id']}/interact"
+
+    assert client.post(url, json={"prompt": "Spend it all please"}).status_code == 200
+    rejected = client.post(url, json={"prompt": "And more"})
+    assert rejected.status_code == 429
+    assert "daily budget" in rejected.json()["detail"]
+
+    monkeypatch.setenv("BUDGET_DOWNGRADE_PROVIDERS", "missing,echo")
+    client.put(f"/spaces/{space['id']}", json={"budget_action": "downgrade"})
+    downgraded = client.post(url, json={"prompt": "Cheaper then"})
+    assert downgraded.status_code == 200
+    body = downgraded.json()
+    assert body["provider"] == "echo"
+    assert body["metadata"]["budget"]["exceeded"] is True
+
+    usage = client.get(f"/spaces/{space['id']}/usage", params={"group_by": "provider"}).json()
+    assert [row["key"] for row in usage["rows"]] == ["echo", "simulated"]
+
+
+def test_summaries_are_budgeted_and_recorded(client, instant_simulated):
+    space = client.post("/spaces", json={"name": "Steward", "daily_token_budget": 20}).json()
+    agent = _agent(client, space["id"])
+    summarize = f"/ui/spaces/{space['id']}/agents/{agent['id']}/summarize"
+
+    assert client.post(summarize, follow_redirects=False).status_code == 303
+    totals = client.get(f"/spaces/{space['id']}/usage").json()["totals"]
+    assert totals["interactions"] == 0
+    assert totals["completion_tokens"] == 10
+    assert totals["cost_usd"] > 0
+
+    client.post("/artifacts", json={"space_id": space["id"], "title": "New", "content": "idea"})
+    rejected = client.post(summarize, follow_redirects=False)
+    assert rejected.status_code == 429
+    assert "daily budget" in rejected.json()["detail"]
+
+
+def test_budget_action_cannot_be_cleared(client):
+    space_id = client.post("/spaces", json={"name": "Strict"}).json()["id"]
+    response = client.put(f"/spaces/{space_id}", json={"budget_action": None})
+    assert response.status_code == 422
+    assert client.get(f"/spaces/{space_id}").json()["budget_action"] == "reject"